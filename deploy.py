@@ -8,11 +8,16 @@ Requirements: uv add loguru pyyaml
 """
 
 import argparse
+import contextlib
+import copy
+import hashlib
 import json
 import os
-import shutil
+import re
 import subprocess
 import sys
+import threading
+import time
 from pathlib import Path
 from typing import Optional, Dict, List, Set
 
@@ -22,26 +27,25 @@ except ImportError:
     print("loguru not installed. Run: uv sync")
     sys.exit(1)
 
-try:
-    import yaml
-except ImportError:
-    print("pyyaml not installed. Run: uv sync")
-    sys.exit(1)
-
 # Add libs to path for imports
 sys.path.insert(0, str(Path(__file__).parent.resolve()))
 
-try:
-    from libs.dashboard import DashboardManager
-except ImportError:
-    DashboardManager = None  # Fallback if libs not available
+# libs.docker, libs.dashboard, libs.testing, libs.readiness, PyYAML and the
+# registry client are imported on first use: read-only commands (running,
+# status, --help) must start fast and load only what they actually call.
 
 try:
-    from libs.testing import E2ETest
+    from libs.tracing import span, traced, tracer
 except ImportError:
-    E2ETest = None  # Fallback if libs not available
+    tracer = None  # Fallback: spans are no-ops
+
+    def span(*args, **kwargs):
+        return contextlib.nullcontext({})
+
+    def traced(*args, **kwargs):
+        return lambda fn: fn
 
-# Configure loguru
+# Configure loguru (the file sink is added in main(), see setup_file_logging)
 logger.remove()
 logger.add(
     sys.stderr,
@@ -49,13 +53,6 @@ logger.add(
     level="INFO",
     colorize=True
 )
-logger.add(
-    "logs/deploy.log",
-    rotation="1 MB",
-    retention="7 days",
-    level="DEBUG",
-    format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {message}"
-)
 
 # Base paths
 BASE_DIR = Path(__file__).parent.resolve()
@@ -75,42 +72,126 @@ SERVICES_ENV = CONFIG_DIR / "services.env"
 DASHBOARD_CONFIG = CONFIG_DIR / "dashboard.yaml"
 EXTERNAL_LINKS = CONFIG_DIR / "external-links.yaml"
 STATE_FILE = BASE_DIR / ".state.json"
+CATALOG_FILE = TEMP_DIR / "catalog.json"
+FRAGMENTS_DIR = TEMP_DIR / "fragments"
+COMPOSE_MANIFEST = TEMP_DIR / "docker-compose.manifest.json"
+COMPOSE_APPLIED = TEMP_DIR / "docker-compose.applied.json"
+READINESS_LOG = LOGS_DIR / "readiness.jsonl"
+MEMORY_PEAKS = LOGS_DIR / "memory-peaks.json"
+# How often `probe --serve` samples container memory into MEMORY_PEAKS
+PEAK_SAMPLE_INTERVAL = 60
 
 # Shared network
 NETWORK_NAME = "infra-network"
 PROJECT_NAME = "infra"
 
+# Commands that only read state: no file log sink, no heavy imports
+FAST_COMMANDS = {"running", "status", "list", "info", "deps"}
+
+# Traefik web entrypoint (HTTP readiness probes go through it)
+TRAEFIK_ENTRYPOINT = ("127.0.0.1", 9000)
+DEFAULT_WAIT_TIMEOUT = 180
+
 
 # ============================================================================
 # UTILITIES
 # ============================================================================
 
-def load_yaml(file_path: Path) -> dict:
-    if not file_path.exists():
-        return {}
+def setup_file_logging():
+    """Add the rotating debug log sink (logs/deploy.log)."""
+    logger.add(
+        str(LOGS_DIR / "deploy.log"),
+        rotation="1 MB",
+        retention="7 days",
+        level="DEBUG",
+        format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {message}"
+    )
+
+
+_YAML = None
+
+
+def _yaml():
+    """PyYAML, imported on first use."""
+    global _YAML
+    if _YAML is None:
+        try:
+            import yaml
+        except ImportError:
+            print("pyyaml not installed. Run: uv sync")
+            sys.exit(1)
+        _YAML = yaml
+    return _YAML
+
+
+# Parsed file cache: path -> ((mtime_ns, size), data)
+_PARSE_CACHE: Dict[str, tuple] = {}
+_PARSE_STATS = {"hits": 0, "misses": 0}
+
+
+def _load_parsed(file_path: Path, parse) -> Optional[object]:
+    """Parse a file once per (path, mtime, size) and memoize the result.
+
+    The cached object is shared: callers that mutate it must copy it first.
+    Returns None if the file does not exist.
+    """
+    try:
+        st = file_path.stat()
+    except OSError:
+        return None
+    key = str(file_path)
+    stamp = (st.st_mtime_ns, st.st_size)
+    cached = _PARSE_CACHE.get(key)
+    if cached and cached[0] == stamp:
+        _PARSE_STATS["hits"] += 1
+        return cached[1]
+
+    _PARSE_STATS["misses"] += 1
     with open(file_path, "r", encoding="utf-8") as f:
-        return yaml.safe_load(f) or {}
+        data = parse(f)
+    _PARSE_CACHE[key] = (stamp, data)
+    return data
+
+
+def parse_cache_stats() -> dict:
+    """Hit/miss counters of the parsed file cache."""
+    return dict(_PARSE_STATS, entries=len(_PARSE_CACHE))
+
+
+def load_yaml(file_path: Path) -> dict:
+    yaml = _yaml()
+    # libyaml bindings are several times faster when PyYAML was built with them
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    data = _load_parsed(file_path, lambda f: yaml.load(f, Loader=loader))
+    return data or {}
 
 
 def load_json(file_path: Path) -> dict:
-    if not file_path.exists():
-        return {}
-    with open(file_path, "r", encoding="utf-8") as f:
-        return json.load(f)
+    data = _load_parsed(file_path, json.load)
+    return {} if data is None else data
+
+
+def dump_yaml(data: dict) -> str:
+    yaml = _yaml()
+    dumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+    return yaml.dump(data, Dumper=dumper, default_flow_style=False, allow_unicode=True, sort_keys=False)
 
 
 def save_json(file_path: Path, data: dict):
+    _PARSE_CACHE.pop(str(file_path), None)
     with open(file_path, "w", encoding="utf-8") as f:
         json.dump(data, f, indent=2)
 
 
 def save_yaml(file_path: Path, data: dict):
+    _PARSE_CACHE.pop(str(file_path), None)
     with open(file_path, "w", encoding="utf-8") as f:
-        yaml.dump(data, f, default_flow_style=False, allow_unicode=True, sort_keys=False)
+        f.write(dump_yaml(data))
 
 
 def load_state() -> dict:
-    return load_json(STATE_FILE)
+    # Commands update the state in place before saving it
+    return copy.deepcopy(load_json(STATE_FILE))
 
 
 def save_state(state: dict):
@@ -139,18 +220,38 @@ def load_external_links() -> list:
     return []
 
 
+# CLI options whose value should not end up in a span name
+_OPTIONS_WITH_VALUE = {"-p", "-f", "--env-file", "--format", "--filter", "--hash"}
+
+
+def _command_label(cmd: list) -> str:
+    """Short span name for a command, e.g. 'docker compose up'."""
+    words, skip = [], False
+    for arg in map(str, cmd):
+        if skip:
+            skip = False
+        elif arg in _OPTIONS_WITH_VALUE:
+            skip = True
+        elif not arg.startswith("-"):
+            words.append(arg)
+    return " ".join(words[:3])
+
+
 def run_command(cmd: list, cwd: Optional[Path] = None, capture: bool = False, timeout: int = 300) -> tuple:
     """Run a command with timeout (default 5 minutes)."""
     try:
-        logger.debug(f"Running: {' '.join(str(c) for c in cmd)}")
-        result = subprocess.run(
-            cmd,
-            cwd=cwd,
-            capture_output=capture,
-            text=True,
-            check=False,
-            timeout=timeout
-        )
+        command_line = " ".join(str(c) for c in cmd)
+        logger.debug(f"Running: {command_line}")
+        with span(_command_label(cmd), cat="subprocess", cmd=command_line) as span_args:
+            result = subprocess.run(
+                cmd,
+                cwd=cwd,
+                capture_output=capture,
+                text=True,
+                check=False,
+                timeout=timeout
+            )
+            span_args["returncode"] = result.returncode
         return result.returncode == 0, result.stdout if capture else ""
     except subprocess.TimeoutExpired:
         logger.error(f"Command timed out after {timeout}s")
@@ -160,8 +261,29 @@ def run_command(cmd: list, cwd: Optional[Path] = None, capture: bool = False, ti
         return False, str(e)
 
 
+def docker_api():
+    """Docker Engine API client, or None to fall back to the docker CLI."""
+    try:
+        from libs.docker import get_client
+    except ImportError:
+        return None
+    return get_client()
+
+
+@traced("ensure network")
 def ensure_network():
     """Ensure shared network exists."""
+    client = docker_api()
+    if client:
+        from libs.docker import DockerError
+        try:
+            if not any(n.get("Name") == NETWORK_NAME for n in client.networks(filters={"name": NETWORK_NAME})):
+                logger.info(f"Creating network {NETWORK_NAME}...")
+                client.create_network(NETWORK_NAME)
+            return
+        except DockerError as e:
+            logger.debug(f"Docker API failed, using CLI: {e}")
+
     ok, output = run_command(
         ["docker", "network", "ls", "--format", "{{.Name}}"],
         capture=True
@@ -171,6 +293,22 @@ def ensure_network():
         run_command(["docker", "network", "create", NETWORK_NAME])
 
 
+def restart_container(name: str) -> bool:
+    """Restart a single container by name."""
+    client = docker_api()
+    if client:
+        from libs.docker import DockerError
+        try:
+            with span(f"restart {name}", cat="docker"):
+                client.restart_container(name)
+            return True
+        except DockerError as e:
+            logger.debug(f"Restart of {name} failed: {e}")
+            return False
+    ok, _ = run_command(["docker", "restart", name], capture=True)
+    return ok
+
+
 def ensure_directories():
     """Create required directories."""
     for dir_path in [CONFIG_DIR, PROFILES_DIR, VOLUMES_DIR, TEMP_DIR, LOGS_DIR]:
@@ -181,53 +319,200 @@ def ensure_directories():
 # SERVICE DISCOVERY
 # ============================================================================
 
+# Bump when the catalog entry layout changes so stale indexes are rebuilt
+CATALOG_VERSION = 3
+
+
+def _sha256_file(file_path: Path) -> str:
+    """Content hash of a file."""
+    with open(file_path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _stat_key(file_path: Path) -> Optional[list]:
+    """Cheap change key for a file: [mtime_ns, size], or None if missing."""
+    try:
+        st = file_path.stat()
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _traefik_hosts(labels) -> List[str]:
+    """Extract every Host(`...`) from a service's Traefik labels."""
+    items = labels.values() if isinstance(labels, dict) else (labels or [])
+    hosts = []
+    for label in items:
+        for host in re.findall(r"Host\(`([^`]+)`\)", str(label)):
+            if host not in hosts:
+                hosts.append(host)
+    return hosts
+
+
+def _has_healthcheck(svc_config: dict) -> bool:
+    """True if the compose service defines an enabled healthcheck."""
+    healthcheck = svc_config.get("healthcheck")
+    if not isinstance(healthcheck, dict) or healthcheck.get("disable"):
+        return False
+    return healthcheck.get("test") not in (None, "NONE", ["NONE"])
+
+
+def summarize_compose(compose: dict) -> Dict[str, dict]:
+    """Reduce a module docker-compose.yml to what the CLI needs.
+
+    Returns {compose_service: {container, image, build, healthcheck, hosts,
+    mem_limit}} so later steps (pulls, readiness, memory, status, dashboards)
+    never have to re-open the YAML.
+    """
+    summary = {}
+    for svc_name, svc_config in (compose.get("services") or {}).items():
+        svc_config = svc_config or {}
+        resources = (svc_config.get("deploy") or {}).get("resources") or {}
+        summary[svc_name] = {
+            "container": svc_config.get("container_name"),
+            "image": svc_config.get("image"),
+            "build": "build" in svc_config,
+            "healthcheck": _has_healthcheck(svc_config),
+            "hosts": _traefik_hosts(svc_config.get("labels")),
+            "mem_limit": svc_config.get("mem_limit") or (resources.get("limits") or {}).get("memory"),
+        }
+    return summary
+
+
+def _scan_service_dir(item: Path, group: str, category: str, fingerprint: dict,
+                      previous: Optional[dict]) -> dict:
+    """(Re)build the catalog entry for one module directory.
+
+    Files are only re-parsed when their content hash changed, so a plain
+    `touch` or a git checkout just refreshes the fingerprint.
+    """
+    compose_file = item / "docker-compose.yml"
+    service_file = item / "service.json"
+    hashes = {
+        "compose": _sha256_file(compose_file),
+        "service": _sha256_file(service_file) if fingerprint["service"] else None,
+    }
+    previous = previous or {}
+    old_hashes = previous.get("hashes", {})
+
+    if old_hashes.get("service") == hashes["service"] and "meta" in previous:
+        meta = previous["meta"]
+    else:
+        meta = load_json(service_file) if hashes["service"] else {}
+
+    if old_hashes.get("compose") == hashes["compose"] and "compose" in previous:
+        compose_summary = previous["compose"]
+    else:
+        try:
+            compose_summary = summarize_compose(load_yaml(compose_file))
+        except _yaml().YAMLError as e:
+            logger.warning(f"Invalid compose file {compose_file}: {e}")
+            compose_summary = {}
+
+    return {
+        "path": item.relative_to(BASE_DIR).as_posix(),
+        "group": group,
+        "category": category,
+        "name": item.name,
+        "meta": meta,
+        "compose": compose_summary,
+        "hashes": hashes,
+        "fingerprint": fingerprint,
+    }
+
+
+def _list_module_dirs(parent: Path, listings: dict, old_listings: dict) -> List[str]:
+    """Sorted child directory names of parent, cached by the parent's mtime."""
+    key = parent.relative_to(BASE_DIR).as_posix()
+    mtime = _stat_key(parent)
+    cached = old_listings.get(key)
+    if cached and cached["mtime"] == mtime:
+        names = cached["dirs"]
+    else:
+        names = sorted(p.name for p in parent.iterdir() if p.is_dir())
+    listings[key] = {"mtime": mtime, "dirs": names}
+    return names
+
+
+def _iter_service_dirs(listings: dict, old_listings: dict):
+    """Yield (group, category, module_dir) for every candidate module directory."""
+    if CORE_DIR.exists():
+        for name in _list_module_dirs(CORE_DIR, listings, old_listings):
+            yield "core", "core", CORE_DIR / name
+
+    # Infra and modules are nested one level: <group>/<category>/<service>
+    for group, group_dir in (("infra", INFRA_DIR), ("modules", MODULES_DIR)):
+        if not group_dir.exists():
+            continue
+        for category_name in _list_module_dirs(group_dir, listings, old_listings):
+            category_dir = group_dir / category_name
+            for name in _list_module_dirs(category_dir, listings, old_listings):
+                yield group, f"{group}/{category_name}", category_dir / name
+
+
+def load_catalog() -> dict:
+    """Load the service catalog index, refreshing only changed module directories.
+
+    The index lives in .temp/catalog.json. Category directories are re-listed
+    only when their mtime changes, and a module is re-scanned only when its
+    directory mtime or the stat of docker-compose.yml/service.json changes.
+    """
+    cached = load_json(CATALOG_FILE) if CATALOG_FILE.exists() else {}
+    if cached.get("version") != CATALOG_VERSION or cached.get("base_dir") != str(BASE_DIR):
+        cached = {}
+    old_entries = cached.get("entries", {})
+    old_listings = cached.get("listings", {})
+
+    entries = {}
+    listings = {}
+    rescanned = 0
+    for group, category, item in _iter_service_dirs(listings, old_listings):
+        compose_key = _stat_key(item / "docker-compose.yml")
+        if compose_key is None:
+            continue
+        fingerprint = {
+            "dir": _stat_key(item),
+            "compose": compose_key,
+            "service": _stat_key(item / "service.json"),
+        }
+        key = item.relative_to(BASE_DIR).as_posix()
+        entry = old_entries.get(key)
+        if entry is None or entry.get("fingerprint") != fingerprint:
+            entry = _scan_service_dir(item, group, category, fingerprint, entry)
+            rescanned += 1
+        entries[key] = entry
+
+    catalog = {
+        "version": CATALOG_VERSION,
+        "base_dir": str(BASE_DIR),
+        "listings": listings,
+        "entries": entries,
+    }
+    if rescanned or entries.keys() != old_entries.keys() or listings != old_listings:
+        logger.debug(f"Catalog: re-scanned {rescanned} of {len(entries)} modules")
+        ensure_directories()
+        save_json(CATALOG_FILE, catalog)
+    return catalog
+
+
+@traced("discover")
 def discover_services() -> dict:
-    """Discover all available services."""
+    """Discover all available services (served from the catalog index)."""
     services = {
         "core": {},
         "infra": {},
         "modules": {}
     }
 
-    # Core
-    if CORE_DIR.exists():
-        for item in CORE_DIR.iterdir():
-            if item.is_dir() and (item / "docker-compose.yml").exists():
-                service_json = load_json(item / "service.json") if (item / "service.json").exists() else {}
-                services["core"][item.name] = {
-                    "path": item,
-                    "category": "core",
-                    "name": item.name,
-                    "meta": service_json
-                }
-
-    # Infra (nested)
-    if INFRA_DIR.exists():
-        for category_dir in INFRA_DIR.iterdir():
-            if category_dir.is_dir():
-                for item in category_dir.iterdir():
-                    if item.is_dir() and (item / "docker-compose.yml").exists():
-                        service_json = load_json(item / "service.json") if (item / "service.json").exists() else {}
-                        services["infra"][item.name] = {
-                            "path": item,
-                            "category": f"infra/{category_dir.name}",
-                            "name": item.name,
-                            "meta": service_json
-                        }
-
-    # Modules (nested)
-    if MODULES_DIR.exists():
-        for category_dir in MODULES_DIR.iterdir():
-            if category_dir.is_dir():
-                for item in category_dir.iterdir():
-                    if item.is_dir() and (item / "docker-compose.yml").exists():
-                        service_json = load_json(item / "service.json") if (item / "service.json").exists() else {}
-                        services["modules"][item.name] = {
-                            "path": item,
-                            "category": f"modules/{category_dir.name}",
-                            "name": item.name,
-                            "meta": service_json
-                        }
+    for entry in load_catalog()["entries"].values():
+        services[entry["group"]][entry["name"]] = {
+            "path": BASE_DIR / entry["path"],
+            "category": entry["category"],
+            "name": entry["name"],
+            "meta": entry["meta"],
+            "compose": entry["compose"],
+            "hash": entry["hashes"]["compose"],
+        }
 
     return services
 
@@ -240,25 +525,146 @@ def find_service(name: str, services: dict) -> Optional[dict]:
     return None
 
 
+class DependencyGraph:
+    """Module dependency DAG built from config/dependencies.yaml.
+
+    Usage:
+        graph = DependencyGraph({"outline": ["postgres", "keycloak"], "keycloak": ["postgres"]})
+        graph.closure(["outline"])  # {"outline", "keycloak", "postgres"}
+        graph.waves(["outline", "keycloak", "postgres"])  # [["postgres"], ["keycloak"], ["outline"]]
+    """
+
+    def __init__(self, edges: dict):
+        self.edges: Dict[str, List[str]] = {
+            str(name): [str(dep) for dep in (deps or [])] for name, deps in (edges or {}).items()
+        }
+        self.cycle = self._find_cycle()
+
+    def dependencies(self, name: str) -> List[str]:
+        """Direct dependencies of a module."""
+        return self.edges.get(name, [])
+
+    def closure(self, names) -> Set[str]:
+        """The given modules plus everything they depend on, transitively."""
+        result = set()
+        stack = list(names)
+        while stack:
+            name = stack.pop()
+            if name not in result:
+                result.add(name)
+                stack.extend(self.dependencies(name))
+        return result
+
+    def waves(self, names) -> List[List[str]]:
+        """Group modules into start waves: each one only needs earlier waves.
+
+        Dependencies outside `names` (e.g. already running) are ignored.
+        """
+        names = set(names)
+        level: Dict[str, int] = {}
+
+        def visit(name: str) -> int:
+            if name not in level:
+                level[name] = 0  # guards against cycles
+                deps = [d for d in self.dependencies(name) if d in names]
+                level[name] = 1 + max(map(visit, deps)) if deps else 0
+            return level[name]
+
+        for name in names:
+            visit(name)
+        result = [[] for _ in range(max(level.values(), default=-1) + 1)]
+        for name in sorted(names):
+            result[level[name]].append(name)
+        return result
+
+    def _find_cycle(self) -> Optional[List[str]]:
+        """First dependency cycle found, as a path (a -> ... -> a), or None."""
+        done: Set[str] = set()
+        path: List[str] = []
+
+        def visit(name: str) -> Optional[List[str]]:
+            if name in path:
+                return path[path.index(name):] + [name]
+            if name in done:
+                return None
+            path.append(name)
+            for dep in self.dependencies(name):
+                cycle = visit(dep)
+                if cycle:
+                    return cycle
+            path.pop()
+            done.add(name)
+            return None
+
+        for name in sorted(self.edges):
+            cycle = visit(name)
+            if cycle:
+                return cycle
+        return None
+
+    def to_dot(self, names=None) -> str:
+        """Graphviz DOT for the whole graph or the closure of `names`."""
+        nodes = self.closure(names) if names else set(self.edges).union(*self.edges.values())
+        lines = ["digraph dependencies {", "  rankdir=LR;"]
+        for name in sorted(nodes):
+            deps = [d for d in self.dependencies(name) if d in nodes]
+            if not deps:
+                lines.append(f'  "{name}";')
+            for dep in deps:
+                lines.append(f'  "{name}" -> "{dep}";')
+        lines.append("}")
+        return "\n".join(lines)
+
+
+# Built once per process; rebuilt only if dependencies.yaml changes
+_DEPENDENCY_GRAPH: Dict[str, object] = {"key": None, "graph": None}
+
+
+def get_dependency_graph() -> DependencyGraph:
+    """Dependency graph from dependencies.yaml. Exits on a cycle."""
+    key = _stat_key(DEPENDENCIES_FILE)
+    if _DEPENDENCY_GRAPH["graph"] is None or _DEPENDENCY_GRAPH["key"] != key:
+        graph = DependencyGraph(load_yaml(DEPENDENCIES_FILE))
+        if graph.cycle:
+            logger.error(f"Dependency cycle in {DEPENDENCIES_FILE.name}: {' -> '.join(graph.cycle)}")
+            sys.exit(1)
+        _DEPENDENCY_GRAPH.update(key=key, graph=graph)
+    return _DEPENDENCY_GRAPH["graph"]
+
+
 def get_dependencies(service_name: str) -> list:
-    """Get service dependencies."""
-    deps_config = load_yaml(DEPENDENCIES_FILE)
-    return deps_config.get(service_name, [])
+    """Get service dependencies (transitive), in start order."""
+    graph = get_dependency_graph()
+    deps = graph.closure([service_name]) - {service_name}
+    return [name for wave in graph.waves(deps) for name in wave]
 
 
-def get_running_containers() -> Set[str]:
-    """Get running containers from this project only."""
+def get_project_containers() -> Set[str]:
+    """Get names of all running containers of the compose project."""
+    client = docker_api()
+    if client:
+        from libs.docker import DockerError, container_name
+        try:
+            return {container_name(c) for c in client.containers(
+                filters={"label": f"com.docker.compose.project={PROJECT_NAME}"})}
+        except DockerError as e:
+            logger.debug(f"Docker API failed, using CLI: {e}")
+
     ok, output = run_command(
         ["docker", "compose", "-p", PROJECT_NAME, "ps", "--format", "{{.Name}}"],
         capture=True
     )
     if ok:
-        containers = set(output.strip().split("\n")) if output.strip() else set()
-        # Filter only containers with -infra suffix
-        return {c for c in containers if c.endswith("-infra")}
+        return set(output.strip().split("\n")) if output.strip() else set()
     return set()
 
 
+def get_running_containers() -> Set[str]:
+    """Get running containers from this project only."""
+    # Filter only containers with -infra suffix
+    return {c for c in get_project_containers() if c.endswith("-infra")}
+
+
 def get_running_services() -> List[str]:
     """Get list of running services (without -infra suffix).
 
@@ -311,8 +717,90 @@ def resolve_volume_path(volume_str: str, service_path: Path) -> str:
     return volume_str
 
 
+def normalize_compose_fragment(compose: dict, path: Path) -> dict:
+    """Normalize one module's compose for the unified file.
+
+    Attaches every service to the shared network and turns relative volume
+    and build context paths into absolute ones.
+    """
+    fragment = {"services": {}, "volumes": {}}
+
+    # Merge services
+    for svc_name, svc_config in (compose.get("services") or {}).items():
+        # Ensure all services use shared network
+        if "networks" not in svc_config:
+            svc_config["networks"] = ["infra-network"]
+        elif "infra-network" not in svc_config.get("networks", []):
+            if isinstance(svc_config["networks"], list):
+                svc_config["networks"].append("infra-network")
+
+        # Remove local network config
+        if isinstance(svc_config.get("networks"), dict):
+            svc_config["networks"] = ["infra-network"]
+
+        # Convert relative volume paths to absolute
+        if "volumes" in svc_config:
+            resolved_volumes = []
+            for vol in svc_config["volumes"]:
+                if isinstance(vol, str):
+                    resolved_volumes.append(resolve_volume_path(vol, path))
+                else:
+                    resolved_volumes.append(vol)
+            svc_config["volumes"] = resolved_volumes
+
+        # Resolve build context paths to absolute
+        if "build" in svc_config:
+            build_config = svc_config["build"]
+            if isinstance(build_config, str):
+                # Simple string format: build: ./path
+                svc_config["build"] = str((path / build_config).resolve())
+            elif isinstance(build_config, dict):
+                # Dict format: build: {context: ./path, dockerfile: Dockerfile}
+                if "context" in build_config:
+                    context = build_config["context"]
+                    build_config["context"] = str((path / context).resolve())
+
+        fragment["services"][svc_name] = svc_config
+
+    # Merge volumes
+    for vol_name, vol_config in (compose.get("volumes") or {}).items():
+        fragment["volumes"][vol_name] = vol_config
+
+    return fragment
+
+
+def load_compose_fragment(path: Path) -> Optional[dict]:
+    """Return the normalized fragment for a module, cached by content hash.
+
+    Fragments are stored as JSON in .temp/fragments/, keyed by the module path,
+    the sha256 of its docker-compose.yml and BASE_DIR, so unchanged modules are
+    never re-parsed or re-normalized. BASE_DIR is part of the key because the
+    fragment holds absolute paths: a moved or copied checkout must not reuse it.
+    """
+    compose_file = path / "docker-compose.yml"
+    if not compose_file.exists():
+        return None
+
+    content_hash = hashlib.sha256(f"{BASE_DIR}\0{_sha256_file(compose_file)}".encode()).hexdigest()
+    slug = path.relative_to(BASE_DIR).as_posix().replace("/", "__")
+    fragment_file = FRAGMENTS_DIR / f"{slug}.{content_hash[:16]}.json"
+
+    if fragment_file.exists():
+        return load_json(fragment_file)
+
+    # normalize_compose_fragment edits the services in place
+    fragment = normalize_compose_fragment(copy.deepcopy(load_yaml(compose_file)), path)
+
+    # Drop fragments for older revisions of this module
+    FRAGMENTS_DIR.mkdir(parents=True, exist_ok=True)
+    for stale in FRAGMENTS_DIR.glob(f"{slug}.*.json"):
+        stale.unlink(missing_ok=True)
+    save_json(fragment_file, fragment)
+    return fragment
+
+
 def merge_compose_files(service_paths: List[Path]) -> dict:
-    """Merge multiple docker-compose.yml into one."""
+    """Merge multiple docker-compose.yml into one (from cached fragments)."""
     merged = {
         "services": {},
         "volumes": {},
@@ -324,80 +812,66 @@ def merge_compose_files(service_paths: List[Path]) -> dict:
     }
 
     for path in service_paths:
-        compose_file = path / "docker-compose.yml"
-        if not compose_file.exists():
+        fragment = load_compose_fragment(path)
+        if fragment is None:
             continue
 
-        compose = load_yaml(compose_file)
-
-        # Merge services
-        if "services" in compose:
-            for svc_name, svc_config in compose["services"].items():
-                # Ensure all services use shared network
-                if "networks" not in svc_config:
-                    svc_config["networks"] = ["infra-network"]
-                elif "infra-network" not in svc_config.get("networks", []):
-                    if isinstance(svc_config["networks"], list):
-                        svc_config["networks"].append("infra-network")
-
-                # Remove local network config
-                if isinstance(svc_config.get("networks"), dict):
-                    svc_config["networks"] = ["infra-network"]
-
-                # Convert relative volume paths to absolute
-                if "volumes" in svc_config:
-                    resolved_volumes = []
-                    for vol in svc_config["volumes"]:
-                        if isinstance(vol, str):
-                            resolved_volumes.append(resolve_volume_path(vol, path))
-                        else:
-                            resolved_volumes.append(vol)
-                    svc_config["volumes"] = resolved_volumes
-
-                # Resolve build context paths to absolute
-                if "build" in svc_config:
-                    build_config = svc_config["build"]
-                    if isinstance(build_config, str):
-                        # Simple string format: build: ./path
-                        svc_config["build"] = str((path / build_config).resolve())
-                    elif isinstance(build_config, dict):
-                        # Dict format: build: {context: ./path, dockerfile: Dockerfile}
-                        if "context" in build_config:
-                            context = build_config["context"]
-                            build_config["context"] = str((path / context).resolve())
-
-                merged["services"][svc_name] = svc_config
-
-        # Merge volumes
-        if "volumes" in compose:
-            for vol_name, vol_config in compose["volumes"].items():
-                if vol_name not in merged["volumes"]:
-                    merged["volumes"][vol_name] = vol_config
+        merged["services"].update(fragment["services"])
+        for vol_name, vol_config in fragment["volumes"].items():
+            if vol_name not in merged["volumes"]:
+                merged["volumes"][vol_name] = vol_config
 
     return merged
 
 
-def generate_unified_compose(services_to_start: Set[str], all_services: dict) -> Path:
-    """Generate unified docker-compose.yml in .temp/"""
+def _write_if_changed(file_path: Path, content: str) -> bool:
+    """Write text only when it differs from what is on disk. Returns True if written."""
+    if file_path.exists() and file_path.read_text(encoding="utf-8") == content:
+        return False
+    file_path.write_text(content, encoding="utf-8")
+    return True
+
+
+@traced("generate compose")
+def generate_unified_compose(services_to_start: Set[str], all_services: dict,
+                             output_file: Optional[Path] = None) -> Path:
+    """Generate unified docker-compose.yml in .temp/
+
+    Modules are merged in a stable order so the same selection always yields
+    byte-identical output; the file is only rewritten when its content changes.
+    A manifest next to the default file lists the containers it should run.
+    Pass output_file to render a selection without replacing the active file.
+    """
     ensure_directories()
 
     # Collect service paths
     service_paths = []
-    for name in services_to_start:
+    expected_containers = []
+    for name in sorted(services_to_start):
         service = find_service(name, all_services)
         if service:
             service_paths.append(service["path"])
+            for svc_name, svc_info in service.get("compose", {}).items():
+                expected_containers.append(svc_info.get("container") or f"{PROJECT_NAME}-{svc_name}-1")
 
     # Merge
     merged_compose = merge_compose_files(service_paths)
 
     # Save
-    output_file = TEMP_DIR / "docker-compose.yml"
-    save_yaml(output_file, merged_compose)
+    default_output = output_file is None
+    if default_output:
+        output_file = TEMP_DIR / "docker-compose.yml"
+    content = dump_yaml(merged_compose)
+    if not _write_if_changed(output_file, content):
+        logger.debug("Unified compose unchanged")
+
+    if default_output:
+        save_json(COMPOSE_MANIFEST, {"containers": sorted(expected_containers)})
 
     return output_file
 
 
+@traced("env file")
 def generate_env_file() -> Path:
     """Generate combined .env in .temp/"""
     ensure_directories()
@@ -414,46 +888,59 @@ def generate_env_file() -> Path:
         with open(SERVICES_ENV, "r", encoding="utf-8") as f:
             env_content.append(f"\n# === SERVICES ===\n{f.read()}")
 
-    # Save combined
+    # Save combined (untouched when unchanged)
     output_file = TEMP_DIR / ".env"
-    with open(output_file, "w", encoding="utf-8") as f:
-        f.write("\n".join(env_content))
+    _write_if_changed(output_file, "\n".join(env_content))
 
     return output_file
 
 
-def pull_service_images(compose_file: Path, service_names: List[str], timeout: int = 300) -> tuple:
-    """Pull images for specific services from a compose file.
-
-    Returns (success: bool, failed: list of service names that failed).
-    """
+def compose_config_hash(compose_file: Path) -> str:
+    """Hash of everything `docker compose up` reads: the compose file and .env."""
+    digest = hashlib.sha256(compose_file.read_bytes())
     env_file = TEMP_DIR / ".env"
-    base_cmd = ["docker", "compose", "-p", PROJECT_NAME, "-f", str(compose_file)]
     if env_file.exists():
-        base_cmd.extend(["--env-file", str(env_file)])
+        digest.update(env_file.read_bytes())
+    return digest.hexdigest()
 
-    failed = []
-    for svc in service_names:
-        logger.info(f"  Pulling image for {svc}...")
-        cmd = base_cmd + ["pull", svc]
-        ok, output = run_command(cmd, cwd=TEMP_DIR, capture=True, timeout=timeout)
-        if not ok:
-            logger.error(f"  Failed to pull image for {svc}")
-            failed.append(svc)
 
-    return len(failed) == 0, failed
+def compose_is_current(compose_file: Path) -> bool:
+    """True if compose_file was already applied and all its containers are running.
+
+    Compares the config hash with the one recorded after the last successful
+    `up` and checks the project's live containers, so an unchanged selection
+    skips `docker compose` entirely.
+    """
+    if compose_file != TEMP_DIR / "docker-compose.yml" or not compose_file.exists():
+        return False
+    applied = load_json(COMPOSE_APPLIED)
+    if applied.get("hash") != compose_config_hash(compose_file):
+        return False
+    expected = set(load_json(COMPOSE_MANIFEST).get("containers", []))
+    return expected.issubset(get_project_containers())
+
+
+def _record_applied(compose_file: Path):
+    """Remember the config hash of the compose file that is now running."""
+    if compose_file == TEMP_DIR / "docker-compose.yml":
+        save_json(COMPOSE_APPLIED, {"hash": compose_config_hash(compose_file)})
 
 
 def docker_compose_unified(action: str, compose_file: Path = None, build: bool = False,
-                           no_recreate: bool = False, timeout: int = 300) -> bool:
+                           no_recreate: bool = False, timeout: int = 300, gate: "WaveGate" = None) -> bool:
     """Execute docker compose with unified file.
 
+    'up' is planned against the live containers (see plan_reconcile) and only
+    the services that need to be created, recreated, started or removed are
+    touched.
+
     Args:
         action: The docker compose action (up, down, restart, etc.)
         compose_file: Path to compose file (default: .temp/docker-compose.yml)
         build: Whether to build images on 'up' action (default: False)
         no_recreate: Don't recreate existing containers on 'up' (default: False)
         timeout: Command timeout in seconds (default: 300)
+        gate: Start 'up' in dependency waves gated on readiness (see WaveGate)
     """
     if compose_file is None:
         compose_file = TEMP_DIR / "docker-compose.yml"
@@ -462,22 +949,28 @@ def docker_compose_unified(action: str, compose_file: Path = None, build: bool =
         logger.error(f"File not found: {compose_file}")
         return False
 
-    env_file = TEMP_DIR / ".env"
-
-    cmd = ["docker", "compose", "-p", PROJECT_NAME, "-f", str(compose_file)]
+    cmd = compose_base_cmd(compose_file)
 
-    if env_file.exists():
-        cmd.extend(["--env-file", str(env_file)])
+    if action == "up" and not build and compose_is_current(compose_file):
+        logger.info("Compose config unchanged and all containers running, nothing to do")
+        return True
 
     if action == "up":
-        # Remove stopped containers that might conflict (exited/created status)
-        cleanup_cmd = ["docker", "container", "prune", "-f", "--filter", "label=com.docker.compose.project=" + PROJECT_NAME]
-        run_command(cleanup_cmd, timeout=30)
-        cmd.extend(["up", "-d", "--remove-orphans"])
-        if build:
-            cmd.append("--build")
-        if no_recreate:
-            cmd.append("--no-recreate")
+        # Only touch the services whose containers differ from the compose file
+        plan = plan_reconcile(compose_file)
+        if plan is None:
+            logger.error("Could not read compose configuration")
+            COMPOSE_APPLIED.unlink(missing_ok=True)
+            return False
+        plan.log()
+        ok = apply_plan(plan, compose_file, build=build, no_recreate=no_recreate, timeout=timeout, gate=gate)
+        if ok and not (no_recreate and plan.recreate):
+            _record_applied(compose_file)
+        else:
+            COMPOSE_APPLIED.unlink(missing_ok=True)
+        sys.stdout.flush()
+        sys.stderr.flush()
+        return ok
     elif action == "down":
         cmd.extend(["down", "--remove-orphans"])
     elif action == "restart":
@@ -490,18 +983,641 @@ def docker_compose_unified(action: str, compose_file: Path = None, build: bool =
         cmd.append(action)
 
     ok, _ = run_command(cmd, cwd=TEMP_DIR, timeout=timeout)
+    if action == "down":
+        COMPOSE_APPLIED.unlink(missing_ok=True)
     # Flush output to ensure it's displayed
     sys.stdout.flush()
     sys.stderr.flush()
     return ok
 
 
+# ============================================================================
+# IMAGE PULLING
+# ============================================================================
+
+# Concurrent `docker pull` workers (bandwidth-bound, keep it small)
+PULL_WORKERS = 4
+
+_MANIFEST_ACCEPT = ", ".join([
+    "application/vnd.oci.image.index.v1+json",
+    "application/vnd.docker.distribution.manifest.list.v2+json",
+    "application/vnd.docker.distribution.manifest.v2+json",
+    "application/vnd.oci.image.manifest.v1+json",
+])
+
+
+def parse_image_ref(ref: str) -> tuple:
+    """Split an image reference into (registry, repository, tag, digest).
+
+    Docker Hub short names are expanded (postgres -> library/postgres).
+    """
+    digest = None
+    if "@" in ref:
+        ref, digest = ref.split("@", 1)
+
+    name, tag = ref, None
+    last = ref.rsplit("/", 1)[-1]
+    if ":" in last:
+        name, tag = ref.rsplit(":", 1)
+
+    first, _, rest = name.partition("/")
+    if rest and ("." in first or ":" in first or first == "localhost"):
+        registry, repository = first, rest
+    else:
+        registry, repository = "docker.io", name
+    if registry in ("docker.io", "index.docker.io"):
+        registry = "registry-1.docker.io"
+        if "/" not in repository:
+            repository = f"library/{repository}"
+
+    return registry, repository, tag or ("" if digest else "latest"), digest
+
+
+def _remote_digest(ref: str, timeout: int = 10) -> Optional[str]:
+    """Digest the registry currently serves for ref, or None if unknown.
+
+    Uses a manifest HEAD request and the registry's anonymous token flow, so it
+    costs one or two small HTTP requests instead of a `docker pull`.
+    """
+    import urllib.error
+    import urllib.parse
+    import urllib.request
+
+    registry, repository, tag, digest = parse_image_ref(ref)
+    if digest:
+        return digest
+
+    url = f"https://{registry}/v2/{repository}/manifests/{tag}"
+    headers = {"Accept": _MANIFEST_ACCEPT}
+    for _ in range(2):
+        request = urllib.request.Request(url, method="HEAD", headers=headers)
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                return response.headers.get("Docker-Content-Digest")
+        except urllib.error.HTTPError as e:
+            challenge = e.headers.get("WWW-Authenticate", "")
+            if e.code != 401 or not challenge.lower().startswith("bearer ") or "Authorization" in headers:
+                return None
+            params = dict(re.findall(r'(\w+)="([^"]*)"', challenge))
+            realm = params.pop("realm", None)
+            if not realm:
+                return None
+            params.setdefault("scope", f"repository:{repository}:pull")
+            token_url = f"{realm}?{urllib.parse.urlencode(params)}"
+            try:
+                with urllib.request.urlopen(token_url, timeout=timeout) as response:
+                    token_data = json.load(response)
+            except (OSError, ValueError):
+                return None
+            token = token_data.get("token") or token_data.get("access_token")
+            if not token:
+                return None
+            headers["Authorization"] = f"Bearer {token}"
+        except OSError:
+            return None
+    return None
+
+
+def get_local_image_digests() -> Dict[str, Set[str]]:
+    """Map local image references (repo:tag and repo@digest) to their repo digests."""
+    client = docker_api()
+    if client:
+        from libs.docker import DockerError
+        try:
+            local: Dict[str, Set[str]] = {}
+            for image in client.images():
+                by_repo: Dict[str, Set[str]] = {}
+                for repo_digest in image.get("RepoDigests") or []:
+                    repo, _, digest = repo_digest.partition("@")
+                    by_repo.setdefault(repo, set()).add(digest)
+                    local.setdefault(_local_key(repo_digest), set()).add(digest)
+                for repo_tag in image.get("RepoTags") or []:
+                    if repo_tag == "<none>:<none>":
+                        continue
+                    repo = repo_tag.rsplit(":", 1)[0]
+                    local.setdefault(_local_key(repo_tag), set()).update(by_repo.get(repo, set()))
+            return local
+        except DockerError as e:
+            logger.debug(f"Docker API failed, using CLI: {e}")
+
+    ok, output = run_command(
+        ["docker", "image", "ls", "--digests", "--format", "{{json .}}"],
+        capture=True, timeout=30
+    )
+    local: Dict[str, Set[str]] = {}
+    if not ok:
+        return local
+    for line in output.splitlines():
+        try:
+            image = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        repo, tag, digest = image.get("Repository"), image.get("Tag"), image.get("Digest")
+        if not repo or repo == "<none>":
+            continue
+        digests = {digest} if digest and digest != "<none>" else set()
+        if tag and tag != "<none>":
+            local.setdefault(_local_key(f"{repo}:{tag}"), set()).update(digests)
+        for d in digests:
+            local.setdefault(_local_key(f"{repo}@{d}"), set()).add(d)
+    return local
+
+
+def _local_key(ref: str) -> str:
+    """Normalize a reference to how `docker image ls` reports it.
+
+    Docker Hub names lose their docker.io/ and library/ prefixes, a missing
+    tag becomes :latest and name:tag@digest is keyed by its digest.
+    """
+    registry, repository, tag, digest = parse_image_ref(ref)
+    name = repository if registry == "registry-1.docker.io" else f"{registry}/{repository}"
+    if name.startswith("library/") and name.count("/") == 1:
+        name = name[len("library/"):]
+    return f"{name}@{digest}" if digest else f"{name}:{tag}"
+
+
+@traced("resolve images")
+def resolve_service_images(compose_file: Path, service_names: List[str]) -> Optional[Dict[str, List[str]]]:
+    """Map each unique image reference to the compose services using it.
+
+    Variables are interpolated by `docker compose config`; services that are
+    built locally are left out. Returns None if the compose file is invalid.
+    """
+    ok, output = run_command(compose_base_cmd(compose_file) + ["config", "--format", "json"],
+                             cwd=TEMP_DIR, capture=True, timeout=60)
+    if not ok:
+        return None
+    try:
+        config = json.loads(output)
+    except json.JSONDecodeError:
+        return None
+
+    images: Dict[str, List[str]] = {}
+    for svc in service_names:
+        svc_config = config.get("services", {}).get(svc, {})
+        if "build" in svc_config or not svc_config.get("image"):
+            continue
+        images.setdefault(svc_config["image"], []).append(svc)
+    return images
+
+
+def _format_bytes(size: int) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def _pull_image(ref: str, local_digests: Set[str], timeout: int) -> tuple:
+    """Pull one image unless the local copy already matches the registry.
+
+    Returns (ok, pulled, size_bytes, seconds).
+    """
+    start = time.monotonic()
+    if local_digests:
+        remote = _remote_digest(ref)
+        if remote and remote in local_digests:
+            return True, False, 0, time.monotonic() - start
+
+    ok, _ = run_command(["docker", "pull", "--quiet", ref], capture=True, timeout=timeout)
+    size = 0
+    if ok:
+        client = docker_api()
+        if client:
+            from libs.docker import DockerError
+            try:
+                size = client.inspect_image(ref).get("Size", 0)
+            except DockerError:
+                pass
+        else:
+            inspected, output = run_command(
+                ["docker", "image", "inspect", "--format", "{{.Size}}", ref], capture=True, timeout=30
+            )
+            if inspected and output.strip().isdigit():
+                size = int(output.strip())
+    return ok, True, size, time.monotonic() - start
+
+
+@traced("pull images")
+def pull_service_images(compose_file: Path, service_names: List[str], timeout: int = 300) -> tuple:
+    """Pull images for specific services from a compose file.
+
+    Each unique image is pulled once, images whose local digest matches the
+    registry are skipped, and the rest are pulled by a bounded worker pool.
+
+    Returns (success: bool, failed: list of service names that failed).
+    """
+    images = resolve_service_images(compose_file, service_names)
+    if images is None:
+        logger.error("  Could not resolve images from compose file")
+        return False, list(service_names)
+    if not images:
+        return True, []
+
+    local = get_local_image_digests()
+    logger.info(f"  {len(images)} unique images for {len(service_names)} services")
+
+    failed = []
+    pulled_bytes = 0
+    done = 0
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    with ThreadPoolExecutor(max_workers=min(PULL_WORKERS, len(images))) as pool:
+        futures = {
+            pool.submit(_pull_image, ref, local.get(_local_key(ref), set()), timeout): ref
+            for ref in images
+        }
+        for future in as_completed(futures):
+            ref = futures[future]
+            ok, pulled, size, seconds = future.result()
+            done += 1
+            progress = f"[{done}/{len(images)}]"
+            if not ok:
+                logger.error(f"  {progress} Failed to pull {ref} (used by {', '.join(images[ref])})")
+                failed.extend(images[ref])
+            elif pulled:
+                pulled_bytes += size
+                logger.info(f"  {progress} Pulled {ref} ({_format_bytes(size)}, {seconds:.1f}s)")
+            else:
+                logger.info(f"  {progress} Up to date {ref}")
+
+    if pulled_bytes:
+        logger.info(f"  Pulled {_format_bytes(pulled_bytes)} in total")
+    return len(failed) == 0, sorted(failed)
+
+
+# ============================================================================
+# RECONCILE PLANNING
+# ============================================================================
+
+class ReconcilePlan:
+    """Difference between the desired unified compose and the live project.
+
+    A plain class rather than a dataclass: deploy.py keeps `dataclasses`
+    off the import path of its fast commands.
+    """
+
+    def __init__(self):
+        self.create: List[str] = []     # no container yet
+        self.recreate: List[str] = []   # config-hash changed
+        self.start: List[str] = []      # same config, not running
+        self.stop: List[str] = []       # running but no longer wanted
+        self.remove: List[str] = []     # containers no longer wanted
+        self.unchanged: List[str] = []
+        self.containers: Dict[str, List[str]] = {}
+
+    @property
+    def to_up(self) -> List[str]:
+        return sorted(self.create + self.recreate + self.start)
+
+    @property
+    def empty(self) -> bool:
+        return not (self.to_up or self.stop or self.remove)
+
+    def log(self) -> None:
+        """Log the plan, one line per action."""
+        for label, names in (("create", self.create), ("recreate", self.recreate),
+                             ("start", self.start), ("stop", self.stop), ("remove", self.remove)):
+            if names:
+                logger.info(f"  {label:<9} {', '.join(sorted(names))}")
+        logger.info(f"  {'unchanged':<9} {len(self.unchanged)} services")
+
+
+def compose_base_cmd(compose_file: Path) -> list:
+    """`docker compose` prefix for the unified project."""
+    cmd = ["docker", "compose", "-p", PROJECT_NAME, "-f", str(compose_file)]
+    env_file = TEMP_DIR / ".env"
+    if env_file.exists():
+        cmd.extend(["--env-file", str(env_file)])
+    return cmd
+
+
+def get_desired_hashes(compose_file: Path) -> Optional[Dict[str, str]]:
+    """Config hash Compose would stamp on each service of compose_file."""
+    ok, output = run_command(compose_base_cmd(compose_file) + ["config", "--hash", "*"],
+                             cwd=TEMP_DIR, capture=True, timeout=60)
+    if not ok:
+        return None
+    hashes = {}
+    for line in output.splitlines():
+        parts = line.split()
+        if len(parts) == 2:
+            hashes[parts[0]] = parts[1]
+    return hashes
+
+
+def get_live_services() -> Dict[str, List[dict]]:
+    """Containers of the project (running or not), grouped by compose service."""
+    client = docker_api()
+    if client:
+        from libs.docker import DockerError, container_name
+        try:
+            live: Dict[str, List[dict]] = {}
+            for c in client.containers(all=True, filters={"label": f"com.docker.compose.project={PROJECT_NAME}"}):
+                labels = c.get("Labels") or {}
+                service = labels.get("com.docker.compose.service")
+                if service:
+                    live.setdefault(service, []).append({
+                        "name": container_name(c),
+                        "state": c.get("State", ""),
+                        "hash": labels.get("com.docker.compose.config-hash", ""),
+                    })
+            return live
+        except DockerError as e:
+            logger.debug(f"Docker API failed, using CLI: {e}")
+
+    fmt = "\t".join([
+        "{{.Names}}", "{{.State}}",
+        '{{.Label "com.docker.compose.service"}}',
+        '{{.Label "com.docker.compose.config-hash"}}',
+    ])
+    ok, output = run_command(
+        ["docker", "ps", "-a", "--filter", f"label=com.docker.compose.project={PROJECT_NAME}",
+         "--format", fmt],
+        capture=True, timeout=30
+    )
+    live: Dict[str, List[dict]] = {}
+    if not ok:
+        return live
+    for line in output.splitlines():
+        parts = line.split("\t")
+        if len(parts) != 4 or not parts[2]:
+            continue
+        name, status, service, config_hash = parts
+        live.setdefault(service, []).append({"name": name, "state": status, "hash": config_hash})
+    return live
+
+
+@traced("plan")
+def plan_reconcile(compose_file: Path) -> Optional[ReconcilePlan]:
+    """Compare compose_file with the live containers using config-hash labels."""
+    desired = get_desired_hashes(compose_file)
+    if desired is None:
+        return None
+    live = get_live_services()
+
+    plan = ReconcilePlan()
+    for svc, config_hash in desired.items():
+        containers = live.get(svc, [])
+        plan.containers[svc] = [c["name"] for c in containers]
+        if not containers:
+            plan.create.append(svc)
+        elif any(c["hash"] != config_hash for c in containers):
+            plan.recreate.append(svc)
+        elif any(c["state"] != "running" for c in containers):
+            plan.start.append(svc)
+        else:
+            plan.unchanged.append(svc)
+
+    for svc, containers in live.items():
+        if svc in desired:
+            continue
+        plan.containers[svc] = [c["name"] for c in containers]
+        if any(c["state"] == "running" for c in containers):
+            plan.stop.append(svc)
+        plan.remove.append(svc)
+
+    return plan
+
+
+@traced("apply plan")
+def apply_plan(plan: ReconcilePlan, compose_file: Path, build: bool = False,
+               no_recreate: bool = False, timeout: int = 300, gate: "WaveGate" = None) -> bool:
+    """Issue targeted stop/rm/up calls for just the services in the plan.
+
+    With a gate, services are started wave by wave and each wave waits for
+    the previous one to be ready; a wave whose prerequisites never got ready
+    is not started.
+    """
+    ok = True
+
+    if plan.stop:
+        names = [n for svc in plan.stop for n in plan.containers[svc]]
+        logger.info(f"Stopping: {', '.join(sorted(plan.stop))}")
+        stopped, _ = run_command(["docker", "stop", *names], capture=True, timeout=timeout)
+        ok = ok and stopped
+    if plan.remove:
+        names = [n for svc in plan.remove for n in plan.containers[svc]]
+        removed, _ = run_command(["docker", "rm", "-f", *names], capture=True, timeout=timeout)
+        ok = ok and removed
+
+    to_up = plan.to_up
+    if no_recreate and plan.recreate:
+        logger.info(f"Not recreating (config changed): {', '.join(sorted(plan.recreate))}")
+        to_up = [s for s in to_up if s not in plan.recreate]
+    cmd = compose_base_cmd(compose_file) + ["up", "-d"]
+    if build:
+        cmd.append("--build")
+    if not gate:
+        if to_up:
+            started, _ = run_command(cmd + to_up, cwd=TEMP_DIR, timeout=timeout)
+            ok = ok and started
+        return ok
+
+    waves = gate.compose_waves()
+    # Services outside the waves (core, already active modules) go first
+    waves[0] = sorted(set(waves[0]) | (set(to_up) - {s for wave in waves for s in wave}))
+    for index, wave in enumerate(waves):
+        with span(f"wave {index + 1}", modules=gate.module_waves[index]):
+            wave_up = [s for s in wave if s in to_up]
+            if wave_up:
+                if len(waves) > 1:
+                    logger.info(f"Wave {index + 1}/{len(waves)}: {', '.join(gate.module_waves[index])}")
+                started, _ = run_command(cmd + wave_up, cwd=TEMP_DIR, timeout=timeout)
+                ok = ok and started
+            if index < len(waves) - 1 and not gate(index):
+                logger.error(f"Not starting {', '.join(gate.blocked)}: prerequisites not ready")
+                return False
+
+    return ok
+
+
+# ============================================================================
+# READINESS
+# ============================================================================
+
+def build_readiness_checks(names, all_services: dict) -> list:
+    """One ReadinessCheck per module, covering every container it defines.
+
+    A compose healthcheck gates on Docker health; otherwise the container must
+    be running and, if it has a Traefik host, answer HTTP through Traefik.
+    """
+    from libs.readiness import ContainerProbe, HttpProbe, ReadinessCheck
+
+    checks = []
+    for name in sorted(names):
+        service = find_service(name, all_services)
+        if not service:
+            continue
+        probes = []
+        for svc_name, svc_info in service.get("compose", {}).items():
+            probes.append(ContainerProbe(svc_info.get("container") or f"{PROJECT_NAME}-{svc_name}-1"))
+            if not svc_info.get("healthcheck") and svc_info.get("hosts"):
+                probes.append(HttpProbe(svc_info["hosts"][0], TRAEFIK_ENTRYPOINT))
+        if probes:
+            checks.append(ReadinessCheck(name, probes))
+    return checks
+
+
+def wait_for_services(names, all_services: dict, timeout: float = DEFAULT_WAIT_TIMEOUT,
+                      context: str = "") -> List[str]:
+    """Block until the given modules are ready or the deadline passes.
+
+    Streams each module as it becomes ready, records time-to-ready in
+    logs/readiness.jsonl and returns the modules that were not ready in time.
+    """
+    try:
+        from libs.readiness import record_results, wait_until_ready
+    except ImportError:
+        logger.warning("Readiness checks not available, skipping wait")
+        return []
+    checks = build_readiness_checks(names, all_services)
+    if not checks:
+        return []
+
+    logger.info(f"Waiting for {len(checks)} services (timeout {timeout:.0f}s)...")
+    with span("readiness", services=len(checks)):
+        started = tracer.now() if tracer else 0
+        results = wait_until_ready(
+            checks, timeout,
+            on_ready=lambda r: logger.success(f"  {r.name} ready in {r.seconds:.1f}s"),
+        )
+    if tracer:
+        for r in results:
+            tracer.add(f"ready {r.name}", "readiness", started, r.seconds * 1e6, ready=r.ready)
+    try:
+        record_results(READINESS_LOG, results, context)
+    except OSError as e:
+        logger.debug(f"Could not record readiness times: {e}")
+
+    laggards = [r for r in results if not r.ready]
+    for r in laggards:
+        logger.error(f"  {r.name} not ready after {r.seconds:.0f}s: {r.detail}")
+    return [r.name for r in laggards]
+
+
+class WaveGate:
+    """Readiness gate between dependency waves, sharing one global deadline.
+
+    Usage:
+        gate = WaveGate(get_dependency_graph().waves(modules), services, timeout=180)
+        docker_compose_unified("up", compose_file, gate=gate)
+        laggards = gate.finish(modules)
+    """
+
+    def __init__(self, module_waves: List[List[str]], all_services: dict,
+                 timeout: float = DEFAULT_WAIT_TIMEOUT, context: str = ""):
+        self.module_waves = module_waves or [[]]
+        self.all_services = all_services
+        self.deadline = time.monotonic() + timeout
+        self.context = context
+        self.waited: Set[str] = set()
+        self.laggards: List[str] = []
+        self.blocked: List[str] = []  # never started: prerequisites not ready
+
+    def compose_waves(self) -> List[List[str]]:
+        """The module waves as compose service names."""
+        return [[svc for name in wave for svc in get_compose_service_names(name, self.all_services)]
+                for wave in self.module_waves]
+
+    def wait(self, names) -> List[str]:
+        """Wait for modules not waited for yet; returns the new laggards."""
+        pending = set(names) - self.waited
+        self.waited.update(pending)
+        remaining = max(self.deadline - time.monotonic(), 0)
+        laggards = wait_for_services(pending, self.all_services, remaining, self.context) if pending else []
+        self.laggards.extend(laggards)
+        return laggards
+
+    def __call__(self, index: int) -> bool:
+        """Wait for wave `index`; True if the next wave may start."""
+        if self.wait(self.module_waves[index]):
+            self.blocked = [name for wave in self.module_waves[index + 1:] for name in wave]
+            return False
+        return True
+
+    def finish(self, names) -> List[str]:
+        """Wait for whatever was not gated yet and return all laggards."""
+        self.wait(set(names) - set(self.blocked))
+        return self.laggards + self.blocked
+
+
+# ============================================================================
+# MEMORY ADMISSION
+# ============================================================================
+
+def _module_containers(name: str, all_services: dict) -> Dict[str, dict]:
+    """{container name: compose summary} of a module."""
+    service = find_service(name, all_services) or {}
+    return {info.get("container") or f"{PROJECT_NAME}-{svc_name}-1": info
+            for svc_name, info in service.get("compose", {}).items()}
+
+
+def memory_estimates(names, all_services: dict) -> list:
+    """(module, MemoryEstimate) for the modules that still have containers to start."""
+    from libs.memory import PeakStore, estimate_containers, parse_size
+
+    running = get_project_containers()
+    peaks = PeakStore(MEMORY_PEAKS).load()
+    estimates = []
+    for name in sorted(names):
+        pending = {c: info for c, info in _module_containers(name, all_services).items() if c not in running}
+        if pending:
+            limits = {c: parse_size(info["mem_limit"]) for c, info in pending.items() if info.get("mem_limit")}
+            estimates.append((name, estimate_containers(pending, peaks, limits)))
+    return estimates
+
+
+def check_memory_budget(names, all_services: dict) -> bool:
+    """False (after logging the budget table) if the modules cannot fit in free memory."""
+    from libs.memory import AdmissionController
+
+    admission = AdmissionController()
+    estimates = memory_estimates(names, all_services)
+    if admission.fits(estimates):
+        return True
+    logger.error("Not enough free memory for these services")
+    for line in admission.budget_table(estimates):
+        logger.error(f"  {line}")
+    logger.info("Start fewer services or pass --no-mem-check")
+    return False
+
+
+def record_memory_peaks(names=None, all_services: Optional[dict] = None):
+    """Sample `docker stats` into the peak store, which keeps the highest value seen.
+
+    Samples the running containers of the given modules, or of the whole
+    project without names. One sample right after a start is far from a
+    peak, so `test`, `load` and `probe --serve` sample again under traffic.
+    """
+    from libs.memory import PeakStore, sample_usage
+
+    running = get_project_containers()
+    if names is None:
+        containers = sorted(running)
+    else:
+        containers = [c for name in names for c in _module_containers(name, all_services) if c in running]
+    if containers:
+        PeakStore(MEMORY_PEAKS).update(sample_usage(containers))
+
+
 # ============================================================================
 # DASHBOARD GENERATION
 # ============================================================================
 
+def _dashboard_manager():
+    """DashboardManager class, or None if libs.dashboard is not available."""
+    try:
+        from libs.dashboard import DashboardManager
+    except ImportError:
+        return None  # Fallback if libs not available
+    return DashboardManager
+
+
+@traced("dashy")
 def regenerate_dashy(active_services: List[str], all_services: dict, include_core: bool = True):
     """Regenerate Dashy configuration using DashboardManager."""
+    DashboardManager = _dashboard_manager()
     if DashboardManager is None:
         logger.warning("DashboardManager not available, using legacy method")
         _legacy_regenerate_dashy(active_services, all_services, include_core)
@@ -553,12 +1669,14 @@ def regenerate_dashy(active_services: List[str], all_services: dict, include_cor
     manager.generate_dashy(output_path, base_config)
 
     # Restart Dashy to load new config
-    run_command(["docker", "restart", "dashy-infra"], capture=True)
+    restart_container("dashy-infra")
     logger.success("Dashy updated")
 
 
+@traced("heimdall")
 def regenerate_heimdall(active_services: List[str], all_services: dict):
     """Regenerate Heimdall using DashboardManager."""
+    DashboardManager = _dashboard_manager()
     if DashboardManager is None:
         logger.warning("DashboardManager not available, using legacy method")
         _legacy_regenerate_heimdall(active_services, all_services)
@@ -589,8 +1707,10 @@ def regenerate_heimdall(active_services: List[str], all_services: dict):
         logger.warning("Heimdall database not found (start Heimdall first)")
 
 
+@traced("homepage")
 def regenerate_homepage(active_services: List[str], all_services: dict, include_core: bool = True):
     """Regenerate Homepage configuration using DashboardManager."""
+    DashboardManager = _dashboard_manager()
     if DashboardManager is None:
         logger.warning("DashboardManager not available for Homepage")
         return
@@ -632,10 +1752,11 @@ def regenerate_homepage(active_services: List[str], all_services: dict, include_
     manager.generate_homepage(homepage_dir, base_config)
 
     # Restart Homepage
-    run_command(["docker", "restart", "homepage-infra"], capture=True)
+    restart_container("homepage-infra")
     logger.success("Homepage updated")
 
 
+@traced("dashboards")
 def regenerate_all_dashboards(active_services: List[str], all_services: dict):
     """Regenerate all enabled dashboards."""
     logger.info("Updating dashboards...")
@@ -742,7 +1863,7 @@ def _legacy_regenerate_dashy(active_services: List[str], all_services: dict, inc
     dashy_dir = CORE_DIR / "dashy"
     dashy_dir.mkdir(parents=True, exist_ok=True)
     save_yaml(dashy_dir / "conf.yml", dashy_config)
-    run_command(["docker", "restart", "dashy-infra"], capture=True)
+    restart_container("dashy-infra")
     logger.success("Dashy updated (legacy)")
 
 
@@ -756,7 +1877,7 @@ def _legacy_regenerate_heimdall(active_services: List[str], all_services: dict):
         else:
             logger.warning("Heimdall import had issues")
     else:
-        run_command(["docker", "restart", "heimdall-infra"], capture=True)
+        restart_container("heimdall-infra")
 
 
 # ============================================================================
@@ -775,6 +1896,9 @@ def cmd_core(args):
         core_services = set(services["core"].keys())
         generate_env_file()
         compose_file = generate_unified_compose(core_services, services)
+        if compose_is_current(compose_file):
+            logger.success("Core already running, nothing to do")
+            return
 
         if docker_compose_unified("up", compose_file):
             logger.success("Core started")
@@ -782,6 +1906,9 @@ def cmd_core(args):
             logger.error("Error starting core")
             return
 
+        laggards = [] if getattr(args, "no_wait", False) else wait_for_services(
+            core_services, services, getattr(args, "wait_timeout", DEFAULT_WAIT_TIMEOUT), "core up")
+
         # Regenerate dashboards with core
         regenerate_all_dashboards([], services)
 
@@ -792,6 +1919,10 @@ def cmd_core(args):
         logger.info("  - http://homepage.127.0.0.1.traefik.me:9000 (Homepage)")
         logger.info("  - http://portainer.127.0.0.1.traefik.me:9000 (Portainer)")
 
+        if laggards:
+            logger.error(f"Not ready: {', '.join(laggards)}")
+            sys.exit(1)
+
     elif args.action == "down":
         logger.info("Stopping Core...")
         docker_compose_unified("down")
@@ -843,6 +1974,8 @@ def cmd_up(args):
         logger.info(f"Dependencies: {', '.join(all_to_start - requested)}")
 
     logger.info(f"Starting: {', '.join(all_to_start)}")
+    if not args.no_mem_check and not check_memory_budget(all_to_start, services):
+        sys.exit(1)
 
     # Add core
     core_services = set(services["core"].keys())
@@ -851,6 +1984,9 @@ def cmd_up(args):
     # Generate unified compose
     generate_env_file()
     compose_file = generate_unified_compose(all_to_start, services)
+    if set(state.get("active", [])) == all_to_start - core_services and compose_is_current(compose_file):
+        logger.success("Services already running with this configuration, nothing to do")
+        return
 
     # Pre-pull all images (fail fast if any image doesn't exist)
     logger.info("Pulling images...")
@@ -864,16 +2000,21 @@ def cmd_up(args):
             logger.error("Fix the image references and try again.")
             return
 
-    # Execute
-    if docker_compose_unified("up", compose_file):
+    # Execute in dependency waves, each gated on the previous one being ready
+    gate = None if args.no_wait else WaveGate(
+        get_dependency_graph().waves(all_to_start), services, args.wait_timeout, "up")
+    started = docker_compose_unified("up", compose_file, gate=gate)
+    laggards = gate.finish(all_to_start) if gate else []
+    if started:
         logger.success("Services started")
-    else:
+    elif not laggards:
         logger.error("Error starting services")
         return
 
     # Update state (without core)
     state["active"] = list(all_to_start - core_services)
     save_state(state)
+    record_memory_peaks(all_to_start, services)
 
     # Regenerate dashboards
     regenerate_all_dashboards(state["active"], services)
@@ -885,28 +2026,25 @@ def cmd_up(args):
         for name in active_non_core:
             logger.info(f"  - http://{name}.127.0.0.1.traefik.me:9000")
 
+    if laggards:
+        logger.error(f"Not ready: {', '.join(laggards)}")
+        sys.exit(1)
+
 
 def get_compose_service_names(service_name: str, all_services: dict) -> List[str]:
     """Get the docker-compose service names defined by a module.
 
     A module like 'kroki' may define multiple compose services (kroki, mermaid, bpmn).
-    Returns the list of service names from the module's docker-compose.yml.
+    Returns the list of service names recorded in the catalog index.
     """
     service = find_service(service_name, all_services)
     if not service:
         return []
-    compose_file = service["path"] / "docker-compose.yml"
-    if not compose_file.exists():
-        return []
-    compose = load_yaml(compose_file)
-    if not compose or "services" not in compose:
-        return []
-    return list(compose["services"].keys())
+    return list(service.get("compose", {}).keys())
 
 
 def cmd_add(args):
     """Add services to existing ones."""
-    ensure_network()
     services = discover_services()
     state = load_state()
     current = set(state.get("active", []))
@@ -936,7 +2074,10 @@ def cmd_add(args):
         logger.info("All services are already active")
         return
 
+    ensure_network()
     logger.info(f"Adding: {', '.join(new_to_add)}")
+    if not args.no_mem_check and not check_memory_budget(new_to_add, services):
+        sys.exit(1)
 
     # Combine with existing + core
     all_services_set = current.union(new_to_add)
@@ -962,15 +2103,19 @@ def cmd_add(args):
 
     # Start containers (--no-recreate: don't touch already running services)
     logger.info("Starting containers...")
-    if docker_compose_unified("up", compose_file, no_recreate=True):
+    gate = None if args.no_wait else WaveGate(
+        get_dependency_graph().waves(new_to_add), services, args.wait_timeout, "add")
+    if docker_compose_unified("up", compose_file, no_recreate=True, gate=gate):
         logger.success("Services added")
     else:
         logger.warning("Docker compose had issues starting containers")
+    laggards = gate.finish(new_to_add) if gate else []
 
     # Save state AFTER success
     current.update(new_to_add)
     state["active"] = list(current)
     save_state(state)
+    record_memory_peaks(new_to_add, services)
 
     # Regenerate dashboards
     logger.info("Updating dashboards...")
@@ -981,6 +2126,9 @@ def cmd_add(args):
     for name in sorted(new_to_add):
         logger.info(f"  - http://{name}.127.0.0.1.traefik.me:9000")
 
+    if laggards:
+        logger.error(f"Not ready: {', '.join(laggards)}")
+        sys.exit(1)
     logger.success("Done")
 
 
@@ -1057,6 +2205,38 @@ def cmd_restart(args):
         logger.error("Error restarting")
 
 
+def cmd_plan(args):
+    """Show what would change for the active (or given) services, without applying it."""
+    services = discover_services()
+    state = load_state()
+
+    if args.services:
+        not_found = [n for n in args.services if not find_service(n, services)]
+        if not_found:
+            logger.error(f"Services not found: {', '.join(not_found)}")
+            return
+        desired = set()
+        for service_name in args.services:
+            desired.add(service_name)
+            desired.update(get_dependencies(service_name))
+    else:
+        desired = set(state.get("active", []))
+    desired.update(services["core"].keys())
+
+    generate_env_file()
+    compose_file = generate_unified_compose(desired, services, output_file=TEMP_DIR / "docker-compose.plan.yml")
+    plan = plan_reconcile(compose_file)
+    if plan is None:
+        logger.error("Could not read compose configuration")
+        return
+
+    logger.info(f"Plan for: {', '.join(sorted(desired))}")
+    if plan.empty:
+        logger.success("Nothing to do")
+    else:
+        plan.log()
+
+
 def cmd_status(args):
     """Show current status."""
     state = load_state()
@@ -1064,10 +2244,25 @@ def cmd_status(args):
     logger.info("Current status")
 
     # Running containers
-    ok, output = run_command(
-        ["docker", "compose", "-p", PROJECT_NAME, "ps", "--format", "table {{.Name}}\t{{.Status}}"],
-        capture=True
-    )
+    ok, output = False, ""
+    client = docker_api()
+    if client:
+        from libs.docker import DockerError, container_name
+        try:
+            rows = sorted(
+                (container_name(c), c.get("Status", ""))
+                for c in client.containers(filters={"label": f"com.docker.compose.project={PROJECT_NAME}"})
+            )
+            width = max([len(name) for name, _ in rows] + [4])
+            output = "\n".join([f"{'NAME':<{width}}   STATUS"] + [f"{n:<{width}}   {s}" for n, s in rows]) if rows else ""
+            ok = True
+        except DockerError as e:
+            logger.debug(f"Docker API failed, using CLI: {e}")
+    if not ok:
+        ok, output = run_command(
+            ["docker", "compose", "-p", PROJECT_NAME, "ps", "--format", "table {{.Name}}\t{{.Status}}"],
+            capture=True
+        )
 
     if ok and output.strip():
         logger.info(output)
@@ -1164,6 +2359,30 @@ def cmd_info(args):
             logger.info(f.read()[:2000])
 
 
+def cmd_deps(args):
+    """Show resolved dependencies and start waves."""
+    graph = get_dependency_graph()
+    names = args.services or sorted(graph.edges)
+
+    if args.graph:
+        print(graph.to_dot(args.services or None))
+        return
+
+    for name in names:
+        deps = get_dependencies(name)
+        direct = graph.dependencies(name)
+        indirect = [d for d in deps if d not in direct]
+        line = f"  {name}: {', '.join(direct) or '-'}"
+        if indirect:
+            line += f" (via: {', '.join(indirect)})"
+        logger.info(line)
+
+    if args.services:
+        logger.info("Start waves:")
+        for index, wave in enumerate(graph.waves(graph.closure(args.services)), 1):
+            logger.info(f"  {index}. {', '.join(wave)}")
+
+
 def cmd_profile(args):
     """Manage profiles."""
     if args.action == "list" or not args.name:
@@ -1198,6 +2417,9 @@ def cmd_profile(args):
     class UpArgs:
         services = profile_services
         force = False
+        no_wait = args.no_wait
+        wait_timeout = args.wait_timeout
+        no_mem_check = args.no_mem_check
 
     cmd_up(UpArgs())
 
@@ -1224,6 +2446,7 @@ def cmd_clean(args):
 
     # Clean temp
     if TEMP_DIR.exists():
+        import shutil
         shutil.rmtree(TEMP_DIR)
 
     logger.success("Cleanup completed")
@@ -1232,7 +2455,17 @@ def cmd_clean(args):
 
 def cmd_test(args):
     """Run E2E tests on services."""
-    if E2ETest is None:
+    if args.category == "startup":
+        from libs.testing.startup import check_startup
+        commands = [["running"], ["status"], ["--help"]]
+        if not check_startup(BASE_DIR / "deploy.py", commands, args.budget):
+            logger.error("Startup import time over budget")
+            sys.exit(1)
+        return
+
+    try:
+        from libs.testing import E2ETest
+    except ImportError:
         logger.error("E2ETest not available. Check libs/testing module.")
         return
 
@@ -1242,20 +2475,24 @@ def cmd_test(args):
     state_services = state.get("active", [])
     active_services = list(set(running + state_services))
 
-    tester = E2ETest()
-
-    if args.category == "core":
-        report = tester.test_core()
-    elif args.category == "infra":
-        report = tester.test_infra()
-    elif args.category == "data":
-        report = tester.test_data()
-    elif args.category == "fragments":
-        # Test all services from fragment files
-        report = tester.test_from_fragments(BASE_DIR)
-    else:
-        # Test all - pass active services to filter tests
-        report = tester.test_all(active_services=active_services)
+    tester = E2ETest(concurrency=args.concurrency, deadline=args.deadline or None)
+
+    with span("e2e tests", category=args.category or "all"):
+        if args.category == "core":
+            report = tester.test_core()
+        elif args.category == "infra":
+            report = tester.test_infra()
+        elif args.category == "data":
+            report = tester.test_data()
+        elif args.category == "fragments":
+            # Test all services from fragment files
+            report = tester.test_from_fragments(BASE_DIR)
+        else:
+            # Test all - pass active services to filter tests
+            report = tester.test_all(active_services=active_services)
+
+    regressions = benchmark_report(tester, report, args) if args.bench or args.compare else 0
+    record_memory_peaks()
 
     # Exit with error if tests failed
     if report.failed > 0:
@@ -1263,12 +2500,118 @@ def cmd_test(args):
         sys.exit(1)
     else:
         logger.success("All tests passed")
+    if regressions:
+        logger.error(f"{regressions} latency regressions against {args.compare}")
+        sys.exit(1)
+
+
+def benchmark_report(tester, report, args) -> int:
+    """Benchmark the services that passed, save a baseline, optionally compare.
+
+    Returns the number of latency regressions found (0 without --compare).
+    """
+    from libs.testing.bench import compare, load_baseline, log_bench, log_comparison, run_bench, save_baseline
+
+    baseline = None
+    if args.compare:
+        try:
+            baseline = load_baseline(args.compare)
+        except (OSError, ValueError) as e:
+            logger.error(f"Cannot read baseline: {e}")
+            sys.exit(1)
+    requests = args.bench or baseline.get("requests", 20)
+
+    with span("e2e bench", requests=requests):
+        bench = run_bench(tester, report.results, requests)
+    log_bench(bench)
+    path = save_baseline(bench, requests, LOGS_DIR)
+    logger.info(f"Baseline written to {path.relative_to(BASE_DIR)}")
+
+    if baseline is None:
+        return 0
+    return log_comparison(compare(bench, baseline), baseline)
+
+
+def cmd_probe(args):
+    """Probe active services continuously and export Prometheus metrics."""
+    from libs.testing import E2ETest
+    from libs.testing.prober import ProbeDaemon, serve_metrics
+
+    tester = E2ETest(concurrency=args.concurrency, deadline=None)
+
+    def discover():
+        # Same selection as `deploy.py test`: running containers + state file
+        return tester.plan(list(set(get_running_services() + load_state().get("active", []))))
+
+    daemon = ProbeDaemon(discover, interval=args.interval, window=args.window,
+                         concurrency=args.concurrency, max_rate=args.max_rate)
+    if not args.serve:
+        daemon.run_once()
+        print(daemon.metrics(), end="")
+        return
+
+    daemon.start()
+    stopped = threading.Event()
+
+    def sample_peaks():
+        while not stopped.wait(PEAK_SAMPLE_INTERVAL):
+            record_memory_peaks()
+
+    threading.Thread(target=sample_peaks, name="memory-peaks", daemon=True).start()
+    try:
+        serve_metrics(daemon, (args.bind, args.port))
+    except OSError as e:
+        logger.error(f"Cannot listen on {args.bind}:{args.port}: {e}")
+        sys.exit(1)
+    except KeyboardInterrupt:
+        logger.info("Probe daemon stopped")
+    finally:
+        stopped.set()
+        daemon.stop()
+
+
+def cmd_load(args):
+    """Drive constant-rate, open-loop traffic through Traefik."""
+    from libs.testing import E2ETest
+    from libs.testing.load import log_load, resolve_routes, run_load
+
+    if args.rate <= 0 or args.duration <= 0:
+        logger.error("--rate and --duration must be positive")
+        sys.exit(1)
+    try:
+        routes = resolve_routes(E2ETest(), args.routes, BASE_DIR)
+    except ValueError as e:
+        logger.error(f"Invalid route weight: {e}")
+        sys.exit(1)
+    for route in routes:
+        logger.info(f"{route.name} (weight {route.weight:g}) -> {route.url}")
+
+    with span("load test", rate=args.rate, duration=args.duration):
+        report = run_load(routes, args.rate, args.duration, args.max_in_flight, args.timeout, args.seed)
+    record_memory_peaks()
+    log_load(report)
+    if report.completed and report.errors / report.completed > args.max_errors / 100:
+        logger.error(f"Error rate over {args.max_errors:g}%")
+        sys.exit(1)
 
 
 # ============================================================================
 # MAIN
 # ============================================================================
 
+def add_wait_arguments(parser: argparse.ArgumentParser):
+    """Readiness flags shared by the commands that start containers."""
+    parser.add_argument("--wait-timeout", type=float, default=DEFAULT_WAIT_TIMEOUT, metavar="SECONDS",
+                        help=f"Max time to wait for services to be ready (default: {DEFAULT_WAIT_TIMEOUT})")
+    parser.add_argument("--no-wait", action="store_true", help="Don't wait for readiness")
+
+
+def add_memory_arguments(parser: argparse.ArgumentParser):
+    """Admission flag for the commands that start modules."""
+    parser.add_argument("--no-mem-check", action="store_true",
+                        help="Start even if the services don't fit in free memory")
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Docker Infrastructure CLI",
@@ -1281,30 +2624,43 @@ Examples:
   python deploy.py down grafana         # Stop service
   python deploy.py down --all           # Stop all
   python deploy.py profile monitoring   # Use profile
+  python deploy.py plan                 # Show pending changes
+  python deploy.py deps outline         # Dependencies and start waves
+  python deploy.py deps --graph | dot -Tsvg > deps.svg
   python deploy.py status               # Show status
   python deploy.py running              # Show running services only
   python deploy.py list                 # List services
   python deploy.py test                 # Run all E2E tests
   python deploy.py test core            # Test core services only
+  python deploy.py test startup         # Check CLI import time budget
+  python deploy.py --trace up.json --timings up n8n   # Trace a bring-up
 """
     )
 
+    parser.add_argument("--trace", metavar="FILE", help="Write a Chrome/Perfetto trace (trace-event JSON)")
+    parser.add_argument("--timings", action="store_true", help="Print a table of phase timings")
+
     subparsers = parser.add_subparsers(dest="command", help="Commands")
 
     # core
     core_parser = subparsers.add_parser("core", help="Manage core")
     core_parser.add_argument("action", choices=["up", "down", "restart"])
+    add_wait_arguments(core_parser)
     core_parser.set_defaults(func=cmd_core)
 
     # up
     up_parser = subparsers.add_parser("up", help="Start services")
     up_parser.add_argument("services", nargs="+", help="Services")
     up_parser.add_argument("-f", "--force", action="store_true", help="Don't ask")
+    add_wait_arguments(up_parser)
+    add_memory_arguments(up_parser)
     up_parser.set_defaults(func=cmd_up)
 
     # add
     add_parser = subparsers.add_parser("add", help="Add services")
     add_parser.add_argument("services", nargs="+", help="Services")
+    add_wait_arguments(add_parser)
+    add_memory_arguments(add_parser)
     add_parser.set_defaults(func=cmd_add)
 
     # down
@@ -1318,6 +2674,11 @@ Examples:
     restart_parser.add_argument("services", nargs="*", help="Services")
     restart_parser.set_defaults(func=cmd_restart)
 
+    # plan
+    plan_parser = subparsers.add_parser("plan", help="Show changes without applying")
+    plan_parser.add_argument("services", nargs="*", help="Services (default: active)")
+    plan_parser.set_defaults(func=cmd_plan)
+
     # status
     status_parser = subparsers.add_parser("status", help="Status")
     status_parser.set_defaults(func=cmd_status)
@@ -1336,10 +2697,18 @@ Examples:
     info_parser.add_argument("service", help="Name")
     info_parser.set_defaults(func=cmd_info)
 
+    # deps
+    deps_parser = subparsers.add_parser("deps", help="Show dependencies")
+    deps_parser.add_argument("services", nargs="*", help="Services (default: all)")
+    deps_parser.add_argument("--graph", action="store_true", help="Print Graphviz DOT")
+    deps_parser.set_defaults(func=cmd_deps)
+
     # profile
     profile_parser = subparsers.add_parser("profile", help="Use profile")
     profile_parser.add_argument("name", nargs="?", help="Name")
     profile_parser.add_argument("--list", dest="action", action="store_const", const="list")
+    add_wait_arguments(profile_parser)
+    add_memory_arguments(profile_parser)
     profile_parser.set_defaults(func=cmd_profile)
 
     # logs
@@ -1353,10 +2722,53 @@ Examples:
 
     # test
     test_parser = subparsers.add_parser("test", help="Run E2E tests")
-    test_parser.add_argument("category", nargs="?", choices=["core", "infra", "data", "fragments", "all"],
-                             default="all", help="Test category (default: all)")
+    test_parser.add_argument("category", nargs="?", choices=["core", "infra", "data", "fragments", "all", "startup"],
+                             default="all", help="Test category (default: all; startup: import-time budget)")
+    test_parser.add_argument("--budget", type=float, metavar="MS",
+                             help="Absolute import-time budget for 'test startup' "
+                                  "(default: 40 ms over a bare 'import loguru')")
+    test_parser.add_argument("--concurrency", type=int, default=16, metavar="N",
+                             help="Probes in flight at once (default: 16)")
+    test_parser.add_argument("--deadline", type=float, default=60.0, metavar="SECONDS",
+                             help="Time budget for the whole run; 0 disables it (default: 60)")
+    test_parser.add_argument("--bench", type=int, metavar="N",
+                             help="Then time N warm requests per passing service and save a baseline in logs/")
+    test_parser.add_argument("--compare", type=Path, metavar="BASELINE",
+                             help="Compare the benchmark with a saved baseline; exit 1 on latency regressions")
     test_parser.set_defaults(func=cmd_test)
 
+    # probe
+    probe_parser = subparsers.add_parser("probe", help="Synthetic probes of active services as Prometheus metrics")
+    probe_parser.add_argument("--serve", action="store_true",
+                              help="Keep probing and serve /metrics (default: probe once and print the metrics)")
+    probe_parser.add_argument("--bind", default="0.0.0.0", help="Address for /metrics (default: 0.0.0.0)")
+    probe_parser.add_argument("--port", type=int, default=9470, help="Port for /metrics (default: 9470)")
+    probe_parser.add_argument("--interval", type=float, default=30, metavar="SECONDS",
+                              help="Time between probes of each service (default: 30)")
+    probe_parser.add_argument("--window", type=float, default=300, metavar="SECONDS",
+                              help="Rolling window for probe_success_ratio (default: 300)")
+    probe_parser.add_argument("--concurrency", type=int, default=4, metavar="N",
+                              help="Probes in flight at once (default: 4)")
+    probe_parser.add_argument("--max-rate", type=float, default=2, metavar="PER_SECOND",
+                              help="Cap on probes per second; the interval stretches past it (default: 2)")
+    probe_parser.set_defaults(func=cmd_probe)
+
+    # load
+    load_parser = subparsers.add_parser("load", help="Open-loop load test through Traefik")
+    load_parser.add_argument("routes", nargs="+", metavar="TARGET[=WEIGHT]",
+                             help="Service name, module with a dashy fragment, or URL; WEIGHT sets the mix")
+    load_parser.add_argument("--rate", type=float, default=10, help="Requests per second (default: 10)")
+    load_parser.add_argument("--duration", type=float, default=30, metavar="SECONDS",
+                             help="How long to send (default: 30)")
+    load_parser.add_argument("--max-in-flight", type=int, default=256, metavar="N",
+                             help="Concurrent requests/connections cap (default: 256)")
+    load_parser.add_argument("--timeout", type=float, default=10, metavar="SECONDS",
+                             help="Per-request socket timeout (default: 10)")
+    load_parser.add_argument("--seed", type=int, help="Seed for the route mix")
+    load_parser.add_argument("--max-errors", type=float, default=100, metavar="PCT",
+                             help="Exit 1 if the error rate exceeds this percentage (default: 100)")
+    load_parser.set_defaults(func=cmd_load)
+
     args = parser.parse_args()
 
     if not args.command:
@@ -1365,8 +2777,25 @@ Examples:
 
     # Create directories
     ensure_directories()
+    if args.command not in FAST_COMMANDS:
+        setup_file_logging()
 
-    args.func(args)
+    if tracer and (args.trace or args.timings):
+        tracer.enable(args.trace)
+
+    try:
+        with span(f"deploy.py {args.command}", cat="command"):
+            args.func(args)
+    finally:
+        stats = parse_cache_stats()
+        logger.debug(f"Parse cache: {stats['hits']} hits, {stats['misses']} misses")
+        if tracer and tracer.enabled:
+            tracer.counter("parse cache", **stats)
+            if tracer.write():
+                logger.info(f"Trace written to {tracer.output}")
+            if args.timings:
+                for line in tracer.timings_table():
+                    logger.info(line)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,43 @@
+"""
+Docker Engine API client.
+
+Speaks HTTP directly to the daemon over /var/run/docker.sock (or a unix://
+DOCKER_HOST) instead of forking the docker CLI per query:
+- DockerClient: synchronous client with per-thread keep-alive connections
+- AsyncDockerClient: asyncio facade over the same client
+
+Usage:
+    from libs.docker import get_client
+
+    client = get_client()  # None if the socket is not reachable
+    if client:
+        running = [container_name(c) for c in client.containers()]
+"""
+
+from libs.docker.client import (
+    DEFAULT_SOCKET,
+    DockerClient,
+    DockerError,
+    container_name,
+    get_client,
+    image_rows,
+    network_row,
+    ps_row,
+    stats_summary,
+    volume_row,
+)
+from libs.docker.aio import AsyncDockerClient
+
+__all__ = [
+    "DEFAULT_SOCKET",
+    "DockerClient",
+    "AsyncDockerClient",
+    "DockerError",
+    "container_name",
+    "get_client",
+    "image_rows",
+    "network_row",
+    "ps_row",
+    "stats_summary",
+    "volume_row",
+]
@@ -0,0 +1,104 @@
+"""
+Async facade over DockerClient.
+
+Each call runs the synchronous client in a worker thread; threads keep their
+own keep-alive connection, so concurrent awaits do not serialize on one socket.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from libs.docker.client import DockerClient
+
+
+class AsyncDockerClient:
+    """
+    Asynchronous Docker Engine API client.
+
+    Usage:
+        client = AsyncDockerClient()
+        containers = await client.containers(all=True)
+        async for event in client.events(filters={"type": "container"}):
+            ...
+    """
+
+    def __init__(self, socket_path: Optional[str] = None, timeout: float = 30):
+        self.sync = DockerClient(socket_path, timeout=timeout)
+
+    async def _run(self, fn, *args, **kwargs) -> Any:
+        return await asyncio.to_thread(functools.partial(fn, *args, **kwargs))
+
+    async def available(self) -> bool:
+        return await self._run(self.sync.available)
+
+    async def version(self) -> dict:
+        return await self._run(self.sync.version)
+
+    # === Containers ===
+
+    async def containers(self, all: bool = False, filters: Optional[Dict[str, Any]] = None) -> List[dict]:
+        return await self._run(self.sync.containers, all=all, filters=filters)
+
+    async def inspect_container(self, container: str) -> dict:
+        return await self._run(self.sync.inspect_container, container)
+
+    async def start_container(self, container: str) -> None:
+        await self._run(self.sync.start_container, container)
+
+    async def stop_container(self, container: str, timeout: int = 10) -> None:
+        await self._run(self.sync.stop_container, container, timeout=timeout)
+
+    async def restart_container(self, container: str, timeout: int = 10) -> None:
+        await self._run(self.sync.restart_container, container, timeout=timeout)
+
+    async def remove_container(self, container: str, force: bool = False) -> None:
+        await self._run(self.sync.remove_container, container, force=force)
+
+    async def container_logs(self, container: str, tail: int = 100) -> str:
+        return await self._run(self.sync.container_logs, container, tail=tail)
+
+    async def stats(self, container: str) -> dict:
+        return await self._run(self.sync.stats, container)
+
+    # === Networks / images / volumes ===
+
+    async def networks(self, filters: Optional[Dict[str, Any]] = None) -> List[dict]:
+        return await self._run(self.sync.networks, filters=filters)
+
+    async def create_network(self, name: str, driver: str = "bridge") -> dict:
+        return await self._run(self.sync.create_network, name, driver=driver)
+
+    async def images(self, all: bool = False, filters: Optional[Dict[str, Any]] = None) -> List[dict]:
+        return await self._run(self.sync.images, all=all, filters=filters)
+
+    async def inspect_image(self, image: str) -> dict:
+        return await self._run(self.sync.inspect_image, image)
+
+    async def volumes(self, filters: Optional[Dict[str, Any]] = None) -> List[dict]:
+        return await self._run(self.sync.volumes, filters=filters)
+
+    # === Events ===
+
+    async def events(
+        self,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[dict]:
+        """Async iterator over daemon events."""
+        stream = self.sync.events(since=since, until=until, filters=filters)
+        done = object()
+        try:
+            while True:
+                event = await asyncio.to_thread(next, stream, done)
+                if event is done:
+                    break
+                yield event
+        finally:
+            try:
+                stream.close()
+            except ValueError:
+                pass  # a read is still blocked in its worker thread
@@ -0,0 +1,457 @@
+"""
+Docker Engine API client over the unix socket.
+
+Talks HTTP/1.1 to the daemon directly instead of forking the docker CLI
+for every query. Connections are kept alive and reused per thread.
+"""
+
+from __future__ import annotations
+
+import http.client
+import json
+import os
+import socket
+import struct
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+from urllib.parse import quote, urlencode
+
+DEFAULT_SOCKET = "/var/run/docker.sock"
+
+
+class DockerError(RuntimeError):
+    """Error response (or transport failure) from the Docker daemon."""
+
+    def __init__(self, message: str, status: int = 0):
+        super().__init__(message)
+        self.status = status
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTPConnection that connects to a unix domain socket."""
+
+    def __init__(self, socket_path: str, timeout: Optional[float] = None):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self) -> None:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        self.sock = sock
+
+
+def default_socket_path() -> Optional[str]:
+    """Socket from DOCKER_HOST (unix:// only) or the default location."""
+    docker_host = os.environ.get("DOCKER_HOST", "")
+    if docker_host.startswith("unix://"):
+        return docker_host[len("unix://"):]
+    if docker_host:
+        return None  # tcp:// or npipe:// - not handled here
+    return DEFAULT_SOCKET
+
+
+def _filters(filters: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Encode {"label": "a=b"} / {"label": ["a=b"]} as the API's JSON filter map."""
+    if not filters:
+        return None
+    encoded = {}
+    for key, value in filters.items():
+        encoded[key] = value if isinstance(value, list) else [value]
+    return json.dumps(encoded)
+
+
+def demux_logs(data: bytes) -> str:
+    """Decode the multiplexed stdout/stderr stream of a non-TTY container."""
+    chunks = []
+    pos = 0
+    while pos + 8 <= len(data) and data[pos] in (0, 1, 2):
+        size = struct.unpack(">I", data[pos + 4:pos + 8])[0]
+        chunks.append(data[pos + 8:pos + 8 + size])
+        pos += 8 + size
+    if pos == 0:
+        return data.decode("utf-8", errors="replace")  # TTY: raw stream
+    return b"".join(chunks).decode("utf-8", errors="replace")
+
+
+class DockerClient:
+    """
+    Synchronous Docker Engine API client.
+
+    Usage:
+        client = DockerClient()
+        if client.available():
+            names = [c["Names"][0] for c in client.containers()]
+    """
+
+    def __init__(self, socket_path: Optional[str] = None, timeout: float = 30):
+        self.socket_path = socket_path or default_socket_path() or DEFAULT_SOCKET
+        self.timeout = timeout
+        self._local = threading.local()
+
+    # === Transport ===
+
+    def available(self) -> bool:
+        """True if the daemon socket exists and answers /_ping."""
+        if not os.path.exists(self.socket_path):
+            return False
+        try:
+            return self.ping()
+        except DockerError:
+            return False
+
+    def _connection(self) -> UnixHTTPConnection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = UnixHTTPConnection(self.socket_path, timeout=self.timeout)
+            self._local.conn = conn
+        return conn
+
+    def close(self) -> None:
+        """Close this thread's keep-alive connection."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    @staticmethod
+    def _url(path: str, params: Optional[Dict[str, Any]] = None) -> str:
+        if params:
+            params = {k: v for k, v in params.items() if v is not None}
+            if params:
+                return f"{path}?{urlencode(params)}"
+        return path
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        body: Any = None,
+        timeout: Optional[float] = None,
+    ) -> tuple:
+        """Send one request on the keep-alive connection. Returns (status, bytes)."""
+        url = self._url(path, params)
+        headers = {"Host": "docker"}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+
+        # A reused connection may have been closed by the daemon: retry once
+        for attempt in range(2):
+            conn = self._connection()
+            if timeout is not None:
+                conn.timeout = timeout
+                if conn.sock is not None:
+                    conn.sock.settimeout(timeout)
+            try:
+                conn.request(method, url, body=payload, headers=headers)
+                response = conn.getresponse()
+                data = response.read()
+                if response.will_close:
+                    self.close()
+                return response.status, data
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                self.close()
+                if attempt:
+                    raise DockerError(f"{method} {path}: connection lost")
+            except OSError as e:
+                self.close()
+                raise DockerError(f"{method} {path}: {e}")
+            finally:
+                if timeout is not None:
+                    conn.timeout = self.timeout
+        raise DockerError(f"{method} {path}: connection lost")
+
+    def _call(self, method: str, path: str, params=None, body=None, timeout=None, raw: bool = False) -> Any:
+        status, data = self.request(method, path, params=params, body=body, timeout=timeout)
+        if status not in (200, 201, 204, 304):
+            try:
+                message = json.loads(data).get("message", data.decode())
+            except (ValueError, AttributeError):
+                message = data.decode(errors="replace")
+            raise DockerError(f"{method} {path}: {status} {message}", status=status)
+        if raw:
+            return data
+        if not data:
+            return None
+        try:
+            return json.loads(data)
+        except ValueError:
+            return data
+
+    def _stream(self, path: str, params: Optional[Dict[str, Any]] = None) -> Iterator[dict]:
+        """Yield JSON objects from a streaming endpoint on a dedicated connection."""
+        conn = UnixHTTPConnection(self.socket_path, timeout=None)
+        try:
+            conn.request("GET", self._url(path, params), headers={"Host": "docker"})
+            response = conn.getresponse()
+            if response.status != 200:
+                raise DockerError(f"GET {path}: {response.status} {response.read().decode(errors='replace')}",
+                                  status=response.status)
+            while True:
+                line = response.readline()
+                if not line:
+                    break
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+        except OSError as e:
+            raise DockerError(f"GET {path}: {e}")
+        finally:
+            conn.close()
+
+    # === System ===
+
+    def ping(self) -> bool:
+        status, data = self.request("GET", "/_ping", timeout=5)
+        return status == 200 and data.strip() == b"OK"
+
+    def version(self) -> dict:
+        return self._call("GET", "/version")
+
+    def info(self) -> dict:
+        return self._call("GET", "/info")
+
+    # === Containers ===
+
+    def containers(self, all: bool = False, filters: Optional[Dict[str, Any]] = None) -> List[dict]:
+        """List containers (GET /containers/json)."""
+        return self._call("GET", "/containers/json", params={
+            "all": "1" if all else None,
+            "filters": _filters(filters),
+        })
+
+    def inspect_container(self, container: str) -> dict:
+        return self._call("GET", f"/containers/{quote(container)}/json")
+
+    def start_container(self, container: str) -> None:
+        self._call("POST", f"/containers/{quote(container)}/start")
+
+    def stop_container(self, container: str, timeout: int = 10) -> None:
+        self._call("POST", f"/containers/{quote(container)}/stop", params={"t": timeout},
+                   timeout=timeout + self.timeout)
+
+    def restart_container(self, container: str, timeout: int = 10) -> None:
+        self._call("POST", f"/containers/{quote(container)}/restart", params={"t": timeout},
+                   timeout=timeout + self.timeout)
+
+    def remove_container(self, container: str, force: bool = False) -> None:
+        self._call("DELETE", f"/containers/{quote(container)}", params={"force": "1" if force else None})
+
+    def container_logs(self, container: str, tail: int = 100) -> str:
+        data = self._call("GET", f"/containers/{quote(container)}/logs", params={
+            "stdout": "1", "stderr": "1", "tail": tail,
+        }, raw=True)
+        return demux_logs(data)
+
+    def stats(self, container: str) -> dict:
+        """One stats sample for a container (no streaming)."""
+        return self._call("GET", f"/containers/{quote(container)}/stats", params={
+            "stream": "0", "one-shot": "1",
+        })
+
+    def stream_stats(self, container: str) -> Iterator[dict]:
+        """Continuous stats samples (one per second) for a container."""
+        return self._stream(f"/containers/{quote(container)}/stats", params={"stream": "1"})
+
+    # === Networks ===
+
+    def networks(self, filters: Optional[Dict[str, Any]] = None) -> List[dict]:
+        return self._call("GET", "/networks", params={"filters": _filters(filters)})
+
+    def inspect_network(self, network: str) -> dict:
+        return self._call("GET", f"/networks/{quote(network)}")
+
+    def create_network(self, name: str, driver: str = "bridge") -> dict:
+        return self._call("POST", "/networks/create", body={"Name": name, "Driver": driver})
+
+    # === Images ===
+
+    def images(self, all: bool = False, filters: Optional[Dict[str, Any]] = None) -> List[dict]:
+        return self._call("GET", "/images/json", params={
+            "all": "1" if all else None,
+            "filters": _filters(filters),
+        })
+
+    def inspect_image(self, image: str) -> dict:
+        return self._call("GET", f"/images/{quote(image, safe='/:@')}/json")
+
+    # === Volumes ===
+
+    def volumes(self, filters: Optional[Dict[str, Any]] = None) -> List[dict]:
+        data = self._call("GET", "/volumes", params={"filters": _filters(filters)})
+        return (data or {}).get("Volumes") or []
+
+    # === Events ===
+
+    def events(
+        self,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> Iterator[dict]:
+        """Stream daemon events (blocks until `until`, or forever)."""
+        return self._stream("/events", params={
+            "since": since,
+            "until": until,
+            "filters": _filters(filters),
+        })
+
+
+# === CLI-compatible summaries ===
+
+def container_name(container: dict) -> str:
+    """Primary name of a container from /containers/json or inspect output."""
+    names = container.get("Names")
+    if names:
+        return names[0].lstrip("/")
+    return container.get("Name", "").lstrip("/")
+
+
+def _labels(labels: Optional[Dict[str, str]]) -> str:
+    return ",".join(f"{k}={v}" for k, v in (labels or {}).items())
+
+
+def ps_row(container: dict) -> dict:
+    """Shape a /containers/json entry like a `docker ps --format json` line."""
+    ports = []
+    for p in container.get("Ports") or []:
+        if p.get("PublicPort"):
+            ports.append(f"{p.get('IP', '')}:{p['PublicPort']}->{p['PrivatePort']}/{p.get('Type', 'tcp')}")
+        else:
+            ports.append(f"{p['PrivatePort']}/{p.get('Type', 'tcp')}")
+    return {
+        "ID": container.get("Id", "")[:12],
+        "Image": container.get("Image", ""),
+        "Command": container.get("Command", ""),
+        "Names": ",".join(n.lstrip("/") for n in container.get("Names") or []),
+        "State": container.get("State", ""),
+        "Status": container.get("Status", ""),
+        "Ports": ", ".join(ports),
+        "Labels": _labels(container.get("Labels")),
+    }
+
+
+def _format_size(size: float) -> str:
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if size < 1024 or unit == "GiB":
+            return f"{size:.1f}{unit}" if unit != "B" else f"{size:.0f}B"
+        size /= 1024
+    return f"{size:.1f}GiB"
+
+
+def stats_summary(stats: dict) -> dict:
+    """Reduce a raw stats sample to the `docker stats --format json` fields."""
+    cpu = stats.get("cpu_stats", {})
+    precpu = stats.get("precpu_stats", {})
+    cpu_delta = cpu.get("cpu_usage", {}).get("total_usage", 0) - precpu.get("cpu_usage", {}).get("total_usage", 0)
+    system_delta = cpu.get("system_cpu_usage", 0) - precpu.get("system_cpu_usage", 0)
+    online = cpu.get("online_cpus") or len(cpu.get("cpu_usage", {}).get("percpu_usage") or []) or 1
+    cpu_percent = (cpu_delta / system_delta) * online * 100 if system_delta > 0 and cpu_delta > 0 else 0.0
+
+    memory = stats.get("memory_stats", {})
+    # Like the CLI, exclude page cache from usage
+    cache = memory.get("stats", {}).get("inactive_file", memory.get("stats", {}).get("cache", 0))
+    mem_used = max(memory.get("usage", 0) - cache, 0)
+    mem_limit = memory.get("limit", 0)
+
+    rx = sum(n.get("rx_bytes", 0) for n in (stats.get("networks") or {}).values())
+    tx = sum(n.get("tx_bytes", 0) for n in (stats.get("networks") or {}).values())
+    blk_read = blk_write = 0
+    for entry in (stats.get("blkio_stats", {}).get("io_service_bytes_recursive") or []):
+        if entry.get("op", "").lower() == "read":
+            blk_read += entry.get("value", 0)
+        elif entry.get("op", "").lower() == "write":
+            blk_write += entry.get("value", 0)
+
+    return {
+        "ID": stats.get("id", "")[:12],
+        "Name": stats.get("name", "").lstrip("/"),
+        "CPUPerc": f"{cpu_percent:.2f}%",
+        "MemUsage": f"{_format_size(mem_used)} / {_format_size(mem_limit)}",
+        "MemPerc": f"{(mem_used / mem_limit * 100) if mem_limit else 0:.2f}%",
+        "MemBytes": mem_used,
+        "NetIO": f"{_format_size(rx)} / {_format_size(tx)}",
+        "BlockIO": f"{_format_size(blk_read)} / {_format_size(blk_write)}",
+        "PIDs": str(stats.get("pids_stats", {}).get("current", 0)),
+    }
+
+
+def _human_size(size: float) -> str:
+    """Decimal size with 3 significant digits, like `docker images` ("187MB")."""
+    for unit in ("B", "kB", "MB", "GB"):
+        if size < 1000 or unit == "GB":
+            return f"{size:.3g}{unit}"
+        size /= 1000
+    return f"{size:.3g}GB"
+
+
+def image_rows(image: dict) -> List[dict]:
+    """Shape an /images/json entry like `docker images --format json` lines (one per tag)."""
+    tags = [t for t in image.get("RepoTags") or [] if t != "<none>:<none>"]
+    digests = image.get("RepoDigests") or []
+    created = image.get("Created", 0)
+    base = {
+        "ID": image.get("Id", "").split(":", 1)[-1][:12],
+        "Digest": digests[0].split("@", 1)[-1] if digests else "<none>",
+        "CreatedAt": time.strftime("%Y-%m-%d %H:%M:%S +0000 UTC", time.gmtime(created)),
+        "Size": _human_size(image.get("Size", 0)),
+    }
+    if not tags:
+        return [{"Repository": "<none>", "Tag": "<none>", **base}]
+    return [{"Repository": tag.rsplit(":", 1)[0], "Tag": tag.rsplit(":", 1)[1], **base} for tag in tags]
+
+
+def network_row(network: dict) -> dict:
+    """Shape a /networks entry like a `docker network ls --format json` line."""
+    return {
+        "ID": network.get("Id", "")[:12],
+        "Name": network.get("Name", ""),
+        "Driver": network.get("Driver", ""),
+        "Scope": network.get("Scope", ""),
+        "IPv6": str(bool(network.get("EnableIPv6"))).lower(),
+        "Internal": str(bool(network.get("Internal"))).lower(),
+        "Labels": _labels(network.get("Labels")),
+    }
+
+
+def volume_row(volume: dict) -> dict:
+    """Shape a /volumes entry like a `docker volume ls --format json` line."""
+    return {
+        "Name": volume.get("Name", ""),
+        "Driver": volume.get("Driver", ""),
+        "Scope": volume.get("Scope", ""),
+        "Mountpoint": volume.get("Mountpoint", ""),
+        "Labels": _labels(volume.get("Labels")),
+    }
+
+
+_shared_client: Optional[DockerClient] = None
+_shared_checked = False
+_shared_lock = threading.Lock()
+
+
+def get_client() -> Optional[DockerClient]:
+    """Shared client if the daemon socket is reachable, else None (use the CLI).
+
+    The probe runs once per process; concurrent first callers wait for it.
+    """
+    global _shared_client, _shared_checked
+    if _shared_checked:
+        return _shared_client
+    with _shared_lock:
+        if not _shared_checked:
+            socket_path = default_socket_path()
+            if socket_path and os.path.exists(socket_path):
+                client = DockerClient(socket_path)
+                if client.available():
+                    _shared_client = client
+            _shared_checked = True
+    return _shared_client
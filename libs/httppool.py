@@ -0,0 +1,252 @@
+"""
+Pooled keep-alive HTTP client for health checks.
+
+Connections are kept open and reused across requests to the same address,
+so checking many virtual hosts behind one reverse proxy costs one TCP
+handshake per pooled connection instead of one per request. Host names are
+resolved once and cached, redirects can be followed in-process, and each
+result carries DNS/connect/TTFB/total timings. Thread-safe; the number of
+open connections per address is capped.
+
+Usage:
+    from libs.httppool import HttpPool
+
+    pool = HttpPool(max_connections=16, connect_to=("127.0.0.1", 9000))
+    result = pool.request("http://grafana.127.0.0.1.traefik.me:9000/", follow_redirects=True)
+    print(result.status, result.ms, result.ttfb_ms, result.redirects)
+    pool.close()
+"""
+
+from __future__ import annotations
+
+import http.client
+import socket
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+# Errors that mean a reused keep-alive connection was closed by the server
+_STALE = (http.client.RemoteDisconnected, http.client.BadStatusLine, BrokenPipeError, ConnectionResetError)
+# Hops followed before giving up on a redirect chain
+MAX_REDIRECTS = 10
+# Body bytes read per socket wait (the deadline is checked between reads)
+_CHUNK = 64 * 1024
+
+# (scheme, host or IP, port): https keeps the host name for SNI and certificate checks
+_Address = Tuple[str, str, int]
+
+
+@dataclass
+class HttpResult:
+    """Outcome of one request (or redirect chain). status is -1 when no response arrived.
+
+    Timings follow curl's -w semantics over the whole chain: dns_ms and
+    connect_ms add up name lookups and TCP handshakes (0 when cached or
+    reused), ttfb_ms is the time until the final response's headers and ms
+    the total. redirects lists (status, absolute Location) per hop followed.
+    """
+    url: str
+    status: int
+    ms: float
+    error: str = ""
+    reused: bool = False
+    dns_ms: float = 0.0
+    connect_ms: float = 0.0
+    ttfb_ms: float = 0.0
+    redirects: List[Tuple[int, str]] = field(default_factory=list)
+
+    @property
+    def location(self) -> str:
+        """Where the first response redirected to, "" if it did not."""
+        return self.redirects[0][1] if self.redirects else ""
+
+
+class HttpPool:
+    """Keep-alive connection pool keyed by (host, port).
+
+    With connect_to, every request goes to that address and the URL's host
+    only sets the Host header (reverse proxy entrypoint).
+    """
+
+    def __init__(self, max_connections: int = 8, timeout: float = 5.0,
+                 connect_to: Optional[Tuple[str, int]] = None):
+        self.max_connections = max(1, max_connections)
+        self.timeout = timeout
+        self.connect_to = connect_to
+        self._idle: Dict[_Address, List[http.client.HTTPConnection]] = {}
+        self._slots: Dict[_Address, threading.BoundedSemaphore] = {}
+        self._resolved: Dict[Tuple[str, int], str] = {}
+        self._lock = threading.Lock()
+
+    def _resolve(self, host: str, port: int) -> Tuple[str, float]:
+        """(IP, ms spent resolving); cached, so only the first lookup costs time."""
+        with self._lock:
+            if (host, port) in self._resolved:
+                return self._resolved[(host, port)], 0.0
+        t0 = time.perf_counter()
+        ip = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)[0][4][0]
+        with self._lock:
+            self._resolved[(host, port)] = ip
+        return ip, (time.perf_counter() - t0) * 1000
+
+    def _address(self, url) -> Tuple[_Address, float]:
+        """Pool key for a URL and the DNS time it took."""
+        if self.connect_to:
+            return ("http", *self.connect_to), 0.0
+        scheme = url.scheme or "http"
+        port = url.port or (443 if scheme == "https" else 80)
+        host = url.hostname or "localhost"
+        if scheme == "https":
+            return (scheme, host, port), 0.0
+        ip, dns_ms = self._resolve(host, port)
+        return (scheme, ip, port), dns_ms
+
+    def _slot(self, address: _Address) -> threading.BoundedSemaphore:
+        with self._lock:
+            if address not in self._slots:
+                self._slots[address] = threading.BoundedSemaphore(self.max_connections)
+            return self._slots[address]
+
+    @staticmethod
+    def _connection(address: _Address, timeout: float) -> http.client.HTTPConnection:
+        scheme, host, port = address
+        if scheme == "https":
+            return http.client.HTTPSConnection(host, port, timeout=timeout)
+        return http.client.HTTPConnection(host, port, timeout=timeout)
+
+    def _checkout(self, address: _Address, timeout: float) -> Tuple[http.client.HTTPConnection, bool]:
+        with self._lock:
+            idle = self._idle.get(address)
+            conn = idle.pop() if idle else None
+        if conn is None:
+            return self._connection(address, timeout), False
+        conn.timeout = timeout
+        if conn.sock:
+            conn.sock.settimeout(timeout)
+        return conn, True
+
+    def _checkin(self, address: _Address, conn: http.client.HTTPConnection) -> None:
+        with self._lock:
+            self._idle.setdefault(address, []).append(conn)
+
+    @staticmethod
+    def _limit(conn: http.client.HTTPConnection, timeout: float, deadline: Optional[float]) -> float:
+        """Apply min(timeout, time left before deadline) to the connection's socket."""
+        if deadline is not None:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                raise socket.timeout("deadline exceeded")
+            timeout = min(timeout, remaining)
+        conn.timeout = timeout
+        if conn.sock:
+            conn.sock.settimeout(timeout)
+        return timeout
+
+    def _send(self, url: str, method: str, headers: Optional[dict], timeout: float,
+              result: HttpResult, t0: float, deadline: Optional[float] = None) -> Optional[http.client.HTTPResponse]:
+        """One hop on a pooled connection; timings and errors go into `result`.
+
+        With a deadline (perf_counter time) every wait of the hop - free
+        slot, connect, response headers, each body chunk - ends by then.
+        """
+        try:
+            parts = urlsplit(url)
+            address, dns_ms = self._address(parts)
+        except (OSError, ValueError, UnicodeError) as e:  # bad port, bad IDNA label, no such host
+            result.error = str(e) or type(e).__name__
+            return None
+        result.dns_ms += dns_ms
+        path = parts.path or "/"
+        if parts.query:
+            path += f"?{parts.query}"
+        send_headers = {"Host": parts.netloc, "User-Agent": "infra-healthcheck", **(headers or {})}
+
+        slot = self._slot(address)
+        wait = timeout if deadline is None else min(timeout, deadline - time.perf_counter())
+        if wait <= 0 or not slot.acquire(timeout=wait):
+            result.error = "timed out waiting for a connection"
+            return None
+        try:
+            conn, reused = self._checkout(address, timeout)
+            for attempt in range(2):
+                try:
+                    if conn.sock is None:
+                        self._limit(conn, timeout, deadline)
+                        t_connect = time.perf_counter()
+                        conn.connect()
+                        result.connect_ms += (time.perf_counter() - t_connect) * 1000
+                    self._limit(conn, timeout, deadline)
+                    conn.request(method, path, headers=send_headers)
+                    response = conn.getresponse()
+                    result.ttfb_ms = (time.perf_counter() - t0) * 1000
+                    while not response.isclosed():
+                        self._limit(conn, timeout, deadline)
+                        if not response.read1(_CHUNK):
+                            response.read()  # marks an empty/finished body as consumed
+                except _STALE as e:
+                    conn.close()
+                    if reused and attempt == 0:
+                        # The server dropped an idle connection: retry once on a fresh one
+                        conn, reused = self._connection(address, timeout), False
+                        continue
+                    result.error = str(e) or type(e).__name__
+                    return None
+                except (OSError, ValueError, http.client.HTTPException) as e:
+                    conn.close()
+                    result.error = str(e) or type(e).__name__
+                    return None
+                if response.will_close:
+                    conn.close()
+                else:
+                    self._checkin(address, conn)
+                result.reused = result.reused or reused
+                return response
+        finally:
+            slot.release()
+        result.error = "unreachable"
+        return None
+
+    def request(self, url: str, method: str = "HEAD", headers: Optional[dict] = None,
+                timeout: Optional[float] = None, follow_redirects: bool = False,
+                total_timeout: Optional[float] = None) -> HttpResult:
+        """Send a request on a pooled connection; the body is read and discarded.
+
+        With follow_redirects, 3xx answers with a Location are followed with
+        GET (like a browser after 301/302/303) up to MAX_REDIRECTS hops.
+        `timeout` bounds each socket wait; `total_timeout` bounds the whole
+        chain, like curl --max-time.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        result = HttpResult(url, -1, 0.0)
+        t0 = time.perf_counter()
+        deadline = t0 + total_timeout if total_timeout is not None else None
+        current = url
+        while True:
+            response = self._send(current, method, headers, timeout, result, t0, deadline)
+            if response is None:
+                result.status = -1
+                break
+            result.status = response.status
+            location = response.getheader("Location")
+            if not (300 <= response.status < 400 and location):
+                break
+            current = urljoin(current, location)
+            result.redirects.append((response.status, current))
+            if not follow_redirects:
+                break
+            if len(result.redirects) > MAX_REDIRECTS:
+                result.error = "too many redirects"
+                break
+            method = "GET"
+        result.ms = (time.perf_counter() - t0) * 1000
+        return result
+
+    def close(self) -> None:
+        """Close every idle connection."""
+        with self._lock:
+            for conns in self._idle.values():
+                for conn in conns:
+                    conn.close()
+            self._idle.clear()
@@ -11,6 +11,7 @@ from typing import Any, Dict, List, Optional, Tuple
 
 from loguru import logger
 
+from libs.docker import AsyncDockerClient, image_rows, network_row, ps_row, stats_summary, volume_row
 from libs.mcp.container.base import ContainerMCP
 
 
@@ -18,12 +19,15 @@ class DockerMCP(ContainerMCP):
     """
     Docker MCP server.
 
-    Provides Docker container management via CLI.
-    No additional dependencies required (uses docker CLI).
+    Queries the Docker Engine API over the socket; falls back to the docker
+    CLI when the socket is not reachable. `exec` and compose logs always use
+    the CLI. No additional dependencies required.
     """
 
     def __init__(self, timeout: int = 30):
         self.timeout = timeout
+        self.api = AsyncDockerClient(timeout=timeout)
+        self._use_api = False
         super().__init__()
 
     @property
@@ -32,13 +36,18 @@ class DockerMCP(ContainerMCP):
 
     async def setup(self) -> None:
         """Verify Docker is available and register tools."""
-        # Check Docker is available
-        ok, output = await self._run_docker(["version", "--format", "json"])
-        if not ok:
-            raise RuntimeError(f"Docker not available: {output}")
-
-        version_info = json.loads(output)
-        logger.info(f"Docker version: {version_info.get('Client', {}).get('Version', 'unknown')}")
+        # Check Docker is available (API first, CLI as fallback)
+        self._use_api = await self.api.available()
+        if self._use_api:
+            version_info = await self.api.version()
+            logger.info(f"Docker version: {version_info.get('Version', 'unknown')} (Engine API)")
+        else:
+            ok, output = await self._run_docker(["version", "--format", "json"])
+            if not ok:
+                raise RuntimeError(f"Docker not available: {output}")
+
+            version_info = json.loads(output)
+            logger.info(f"Docker version: {version_info.get('Client', {}).get('Version', 'unknown')}")
 
         # Register tools from parent
         await super().setup()
@@ -107,15 +116,18 @@ class DockerMCP(ContainerMCP):
     # Implement abstract methods
     async def _list_containers(self, all: bool = False, filter: Optional[str] = None) -> List[Dict[str, Any]]:
         """List Docker containers."""
-        args = ["ps", "--format", "json"]
-        if all:
-            args.insert(1, "-a")
+        if self._use_api:
+            containers = [ps_row(c) for c in await self.api.containers(all=all)]
+        else:
+            args = ["ps", "--format", "json"]
+            if all:
+                args.insert(1, "-a")
 
-        ok, output = await self._run_docker(args)
-        if not ok:
-            raise RuntimeError(output)
+            ok, output = await self._run_docker(args)
+            if not ok:
+                raise RuntimeError(output)
 
-        containers = self._parse_json_lines(output)
+            containers = self._parse_json_lines(output)
 
         if filter:
             filter_lower = filter.lower()
@@ -125,6 +137,8 @@ class DockerMCP(ContainerMCP):
 
     async def _get_logs(self, container: str, tail: int = 100) -> str:
         """Get container logs."""
+        if self._use_api:
+            return await self.api.container_logs(container, tail=tail)
         ok, output = await self._run_docker(["logs", "--tail", str(tail), container])
         if not ok:
             raise RuntimeError(output)
@@ -132,6 +146,14 @@ class DockerMCP(ContainerMCP):
 
     async def _get_stats(self, container: Optional[str] = None) -> List[Dict[str, Any]]:
         """Get container stats."""
+        if self._use_api:
+            if container:
+                names = [container]
+            else:
+                names = [c["Id"] for c in await self.api.containers()]
+            samples = await asyncio.gather(*(self.api.stats(n) for n in names))
+            return [stats_summary(s) for s in samples]
+
         args = ["stats", "--no-stream", "--format", "json"]
         if container:
             args.append(container)
@@ -144,6 +166,8 @@ class DockerMCP(ContainerMCP):
 
     async def _inspect(self, container: str) -> Dict[str, Any]:
         """Inspect a container."""
+        if self._use_api:
+            return [await self.api.inspect_container(container)]
         ok, output = await self._run_docker(["inspect", container])
         if not ok:
             raise RuntimeError(output)
@@ -151,6 +175,9 @@ class DockerMCP(ContainerMCP):
 
     async def _restart(self, container: str) -> str:
         """Restart a container."""
+        if self._use_api:
+            await self.api.restart_container(container)
+            return f"Restarted: {container}"
         ok, output = await self._run_docker(["restart", container])
         if not ok:
             raise RuntimeError(output)
@@ -163,30 +190,39 @@ class DockerMCP(ContainerMCP):
             raise RuntimeError(output)
         return output
 
-    async def _list_images(self) -> List[Dict[str, Any]]:
-        """List Docker images."""
-        ok, output = await self._run_docker(["images", "--format", "json"])
+    async def _list_cli(self, args: List[str], fields) -> List[Dict[str, Any]]:
+        """CLI JSON lines cut down to the fields the Engine API path returns."""
+        ok, output = await self._run_docker(args)
         if not ok:
             raise RuntimeError(output)
-        return self._parse_json_lines(output)
+        return [{k: row.get(k, "") for k in fields} for row in self._parse_json_lines(output)]
+
+    async def _list_images(self) -> List[Dict[str, Any]]:
+        """List Docker images (one entry per tag, like `docker images`)."""
+        if self._use_api:
+            return [row for image in await self.api.images() for row in image_rows(image)]
+        return await self._list_cli(["images", "--format", "json"], image_rows({})[0])
 
     async def _list_networks(self) -> List[Dict[str, Any]]:
         """List Docker networks."""
-        ok, output = await self._run_docker(["network", "ls", "--format", "json"])
-        if not ok:
-            raise RuntimeError(output)
-        return self._parse_json_lines(output)
+        if self._use_api:
+            return [network_row(n) for n in await self.api.networks()]
+        return await self._list_cli(["network", "ls", "--format", "json"], network_row({}))
 
     async def _list_volumes(self) -> List[Dict[str, Any]]:
         """List Docker volumes."""
-        ok, output = await self._run_docker(["volume", "ls", "--format", "json"])
-        if not ok:
-            raise RuntimeError(output)
-        return self._parse_json_lines(output)
+        if self._use_api:
+            return [volume_row(v) for v in await self.api.volumes()]
+        return await self._list_cli(["volume", "ls", "--format", "json"], volume_row({}))
 
     # Docker Compose specific tools
     async def _tool_compose_ps(self, project: str) -> List[Dict[str, Any]]:
         """List containers from a compose project."""
+        if self._use_api:
+            containers = await self.api.containers(
+                filters={"label": f"com.docker.compose.project={project}"}
+            )
+            return [ps_row(c) for c in containers]
         ok, output = await self._run_docker([
             "compose", "-p", project, "ps", "--format", "json"
         ])
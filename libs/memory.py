@@ -0,0 +1,257 @@
+"""
+Memory admission control for starting services.
+
+Estimates what each service needs (declared `mem_limit`, else the peak
+observed by `docker stats`, else a default) and compares it with
+MemAvailable from /proc/meminfo before starting it. Memory of services
+admitted in the last few seconds is counted as already used, since a fresh
+container has not reached its working set yet.
+
+Usage:
+    from libs.memory import AdmissionController, PeakStore, estimate_containers
+
+    peaks = PeakStore(Path("logs/memory-peaks.json"))
+    need = estimate_containers(["postgres-infra"], peaks.load(), limits)
+    admission = AdmissionController()
+    if not admission.fits([("postgres", need)]):
+        print("\n".join(admission.budget_table([("postgres", need)])))
+    admission.wait_admit(need.bytes, timeout=300)
+"""
+
+from __future__ import annotations
+
+import json
+import re
+import subprocess
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+try:
+    from libs.docker import DockerError, get_client, stats_summary
+except ImportError:
+    get_client = None
+
+MIB = 1024 * 1024
+# Per container, when nothing was declared or observed
+DEFAULT_ESTIMATE = 256 * MIB
+# Kept free for the host itself
+DEFAULT_RESERVE = 512 * MIB
+# Seconds a newly admitted service counts against the budget
+SETTLE_SECONDS = 30
+
+_SIZE = re.compile(r"^\s*([\d.]+)\s*([kmgt]?)(i?b?)\s*$", re.I)
+_UNITS = {"": 1, "k": 1024, "m": MIB, "g": 1024 * MIB, "t": 1024 * 1024 * MIB}
+
+
+def parse_size(value) -> Optional[int]:
+    """Bytes from a compose/docker size ("512m", "1.5g", "2GiB", 1073741824)."""
+    if isinstance(value, (int, float)):
+        return int(value)
+    match = _SIZE.match(str(value or ""))
+    if not match:
+        return None
+    return int(float(match.group(1)) * _UNITS[match.group(2).lower()])
+
+
+def format_size(size: float) -> str:
+    if size >= 1024 * MIB:
+        return f"{size / (1024 * MIB):.1f} GiB"
+    return f"{size / MIB:.0f} MiB"
+
+
+def read_meminfo(path: str = "/proc/meminfo") -> Optional[Dict[str, int]]:
+    """MemTotal/MemAvailable/... in bytes, or None where /proc is not available."""
+    try:
+        with open(path, encoding="ascii") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return None
+    info = {}
+    for line in lines:
+        key, _, rest = line.partition(":")
+        fields = rest.split()
+        if fields and fields[0].isdigit():
+            info[key] = int(fields[0]) * (1024 if fields[1:] == ["kB"] else 1)
+    return info
+
+
+def compose_limits(compose: dict) -> Dict[str, int]:
+    """{container name: bytes} declared in a compose file.
+
+    Uses mem_limit, deploy.resources.limits.memory or, failing those,
+    deploy.resources.reservations.memory. Keyed by container_name, or by the
+    service name when there is none.
+    """
+    limits = {}
+    for name, svc in (compose.get("services") or {}).items():
+        resources = (svc.get("deploy") or {}).get("resources") or {}
+        value = (svc.get("mem_limit")
+                 or (resources.get("limits") or {}).get("memory")
+                 or (resources.get("reservations") or {}).get("memory"))
+        size = parse_size(value) if value else None
+        if size:
+            limits[svc.get("container_name") or name] = size
+    return limits
+
+
+@dataclass
+class MemoryEstimate:
+    """Expected memory of one service and where the number comes from."""
+    bytes: int
+    source: str  # mem_limit, peak, default or a mix like "peak+default"
+
+
+def estimate_containers(containers: Iterable[str], peaks: Dict[str, int],
+                        limits: Optional[Dict[str, int]] = None) -> MemoryEstimate:
+    """Sum over a service's containers: declared limit, else observed peak, else default."""
+    total, sources = 0, []
+    for container in containers:
+        if limits and container in limits:
+            total += limits[container]
+            sources.append("mem_limit")
+        elif container in peaks:
+            total += peaks[container]
+            sources.append("peak")
+        else:
+            total += DEFAULT_ESTIMATE
+            sources.append("default")
+    return MemoryEstimate(total, "+".join(sorted(set(sources))) or "default")
+
+
+class PeakStore:
+    """Highest memory use seen per container, as JSON."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+    def load(self) -> Dict[str, int]:
+        try:
+            return json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def update(self, usage: Dict[str, int]) -> Dict[str, int]:
+        """Merge new samples, keeping the maximum per container."""
+        peaks = self.load()
+        changed = False
+        for container, used in usage.items():
+            if used > peaks.get(container, 0):
+                peaks[container] = used
+                changed = True
+        if changed:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(peaks, indent=2, sort_keys=True), encoding="utf-8")
+            tmp.replace(self.path)
+        return peaks
+
+
+def sample_usage(containers: Iterable[str]) -> Dict[str, int]:
+    """Current memory use (page cache excluded) of the running containers given."""
+    names = list(containers)
+    client = get_client() if get_client else None
+    usage = {}
+    if client:
+        for name in names:
+            try:
+                usage[name] = stats_summary(client.stats(name))["MemBytes"]
+            except DockerError:
+                continue
+        return usage
+    try:
+        r = subprocess.run(["docker", "stats", "--no-stream", "--format", "{{json .}}", *names],
+                           capture_output=True, text=True, timeout=60)
+    except (OSError, subprocess.TimeoutExpired):
+        return usage
+    for line in r.stdout.splitlines():
+        try:
+            row = json.loads(line)
+        except ValueError:
+            continue
+        used = parse_size(row.get("MemUsage", "").split("/")[0])
+        if used is not None:
+            usage[row.get("Name", "")] = used
+    return usage
+
+
+class AdmissionController:
+    """Admits services while MemAvailable minus recent admissions covers them."""
+
+    def __init__(self, reserve: int = DEFAULT_RESERVE, settle: float = SETTLE_SECONDS,
+                 meminfo: Callable[[], Optional[Dict[str, int]]] = read_meminfo):
+        self.reserve = reserve
+        self.settle = settle
+        self._meminfo = meminfo
+        self._recent: List[Tuple[float, int]] = []
+        self._lock = threading.Lock()
+
+    def available(self) -> Optional[int]:
+        """MemAvailable minus the reserve; None if unknown (no admission control)."""
+        info = self._meminfo()
+        if not info or "MemAvailable" not in info:
+            return None
+        return info["MemAvailable"] - self.reserve
+
+    def _headroom(self) -> Optional[int]:
+        """headroom() for callers that already hold the lock."""
+        available = self.available()
+        if available is None:
+            return None
+        now = time.monotonic()
+        self._recent = [(t, b) for t, b in self._recent if now - t < self.settle]
+        return available - sum(b for _, b in self._recent)
+
+    def headroom(self) -> Optional[int]:
+        """Available memory minus what was admitted in the last `settle` seconds."""
+        with self._lock:
+            return self._headroom()
+
+    def try_admit(self, need: int, keep: int = 0) -> bool:
+        """Reserve `need` bytes if they fit now, leaving `keep` bytes free."""
+        with self._lock:
+            headroom = self._headroom()
+            if headroom is not None and need + keep > headroom:
+                return False
+            self._recent.append((time.monotonic(), need))
+            return True
+
+    def admit(self, need: int) -> None:
+        """Reserve `need` bytes unconditionally (required services)."""
+        with self._lock:
+            self._recent.append((time.monotonic(), need))
+
+    def wait_admit(self, need: int, timeout: float, interval: float = 2.0,
+                   keep: Optional[Callable[[], int]] = None) -> bool:
+        """Block until `need` fits (leaving keep() bytes free) or timeout expires."""
+        deadline = time.monotonic() + timeout
+        while not self.try_admit(need, keep() if keep else 0):
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(interval)
+        return True
+
+    def fits(self, estimates: List[Tuple[str, MemoryEstimate]]) -> bool:
+        available = self.available()
+        return available is None or sum(e.bytes for _, e in estimates) <= available
+
+    def budget_table(self, estimates: List[Tuple[str, MemoryEstimate]]) -> List[str]:
+        """Per-service estimates against the available memory, as printable lines."""
+        info = self._meminfo() or {}
+        width = max([len(n) for n, _ in estimates] + [10])
+        lines = [f"{'SERVICE':<{width}}  {'ESTIMATE':>10}  SOURCE"]
+        for name, estimate in sorted(estimates, key=lambda e: e[1].bytes, reverse=True):
+            lines.append(f"{name:<{width}}  {format_size(estimate.bytes):>10}  {estimate.source}")
+        total = sum(e.bytes for _, e in estimates)
+        lines.append(f"{'total':<{width}}  {format_size(total):>10}")
+        if info:
+            available = info.get("MemAvailable", 0) - self.reserve
+            lines.append(f"{'available':<{width}}  {format_size(available):>10}"
+                         f"  MemAvailable {format_size(info.get('MemAvailable', 0))}"
+                         f" - reserve {format_size(self.reserve)}"
+                         f" (MemTotal {format_size(info.get('MemTotal', 0))})")
+            if total > available:
+                lines.append(f"{'missing':<{width}}  {format_size(total - available):>10}")
+        return lines
@@ -0,0 +1,361 @@
+"""
+Readiness engine for started services.
+
+Watches many services concurrently until each one passes all of its probes
+or a global deadline expires. Failed rounds back off exponentially with
+jitter. Probes:
+- ContainerProbe: container running, and healthy if it has a healthcheck
+- HttpProbe: HTTP response (optionally through a reverse proxy, Host header)
+- TcpProbe: TCP connect
+- PostgresProbe: startup packet answered without "starting up" (pg_isready)
+- RedisProbe: PING answered (not LOADING)
+- MysqlProbe: server handshake received
+
+Usage:
+    from libs.readiness import ReadinessCheck, ContainerProbe, probe_from_config, wait_until_ready
+
+    checks = [
+        ReadinessCheck("postgres", [ContainerProbe("postgres-infra")]),
+        ReadinessCheck("redis", [probe_from_config({"host": "redis-infra", "port": 6379, "probe": "redis"})]),
+    ]
+    results = wait_until_ready(checks, timeout=120)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+import struct
+import time
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
+
+try:
+    from libs.docker import AsyncDockerClient, DockerError, get_client
+except ImportError:
+    get_client = None
+
+
+class Probe:
+    """One readiness condition. Subclasses implement check()."""
+
+    async def check(self) -> bool:
+        raise NotImplementedError
+
+    def describe(self) -> str:
+        return self.__class__.__name__
+
+
+class ContainerProbe(Probe):
+    """Container is running (healthy if it defines a healthcheck), or exited 0."""
+
+    _api: Optional["AsyncDockerClient"] = None
+
+    def __init__(self, container: str):
+        self.container = container
+        self.last_state = "unknown"
+
+    @classmethod
+    def _client(cls) -> Optional["AsyncDockerClient"]:
+        if cls._api is None and get_client and get_client():
+            cls._api = AsyncDockerClient(get_client().socket_path)
+        return cls._api
+
+    async def _state(self) -> Optional[dict]:
+        api = self._client()
+        if api:
+            try:
+                return (await api.inspect_container(self.container)).get("State", {})
+            except DockerError:
+                return None
+        proc = await asyncio.create_subprocess_exec(
+            "docker", "inspect", "--format", "{{json .State}}", self.container,
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL,
+        )
+        stdout, _ = await proc.communicate()
+        if proc.returncode != 0:
+            return None
+        try:
+            return json.loads(stdout)
+        except ValueError:
+            return None
+
+    async def check(self) -> bool:
+        state = await self._state()
+        if state is None:
+            self.last_state = "missing"
+            return False
+        health = (state.get("Health") or {}).get("Status")
+        if state.get("Status") == "exited" and state.get("ExitCode") == 0:
+            self.last_state = "completed"
+            return True  # one-shot init containers
+        if not state.get("Running"):
+            self.last_state = state.get("Status", "not running")
+            return False
+        self.last_state = health or "running"
+        return health in (None, "healthy")
+
+    def describe(self) -> str:
+        return f"{self.container} ({self.last_state})"
+
+
+class HttpProbe(Probe):
+    """HTTP GET through an entrypoint with a Host header.
+
+    Ready on `expect` if given, otherwise on any routed, non-5xx answer.
+    """
+
+    def __init__(self, hostname: str, entrypoint: tuple = ("127.0.0.1", 80), path: str = "/",
+                 timeout: float = 5, expect: Optional[int] = None):
+        self.hostname = hostname
+        self.entrypoint = entrypoint
+        self.path = path
+        self.timeout = timeout
+        self.expect = expect
+        self.last_status = 0
+
+    async def check(self) -> bool:
+        host, port = self.entrypoint
+        try:
+            reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), self.timeout)
+        except (OSError, asyncio.TimeoutError):
+            self.last_status = 0
+            return False
+        try:
+            writer.write(
+                f"GET {self.path} HTTP/1.1\r\nHost: {self.hostname}\r\n"
+                f"User-Agent: readiness-probe\r\nConnection: close\r\n\r\n".encode()
+            )
+            await writer.drain()
+            line = await asyncio.wait_for(reader.readline(), self.timeout)
+            parts = line.decode("latin-1").split()
+            self.last_status = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 0
+        except (OSError, asyncio.TimeoutError):
+            self.last_status = 0
+        finally:
+            writer.close()
+        if self.expect:
+            return self.last_status == self.expect
+        # 404 means the proxy has no route yet; 5xx means the backend is not up
+        return 0 < self.last_status < 500 and self.last_status != 404
+
+    def describe(self) -> str:
+        return f"http://{self.hostname}{self.path} ({self.last_status or 'no answer'})"
+
+
+class TcpProbe(Probe):
+    """host:port accepts a TCP connection."""
+
+    def __init__(self, host: str, port: int, timeout: float = 2):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+
+    async def check(self) -> bool:
+        try:
+            _, writer = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), self.timeout)
+        except (OSError, asyncio.TimeoutError):
+            return False
+        writer.close()
+        return True
+
+    def describe(self) -> str:
+        return f"tcp {self.host}:{self.port}"
+
+
+class _ProtocolProbe(Probe):
+    """Connect, run one request/response exchange, close."""
+
+    protocol = "tcp"
+
+    def __init__(self, host: str, port: int, timeout: float = 3):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.last_state = "no answer"
+
+    async def exchange(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> bool:
+        raise NotImplementedError
+
+    async def check(self) -> bool:
+        try:
+            reader, writer = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), self.timeout)
+        except (OSError, asyncio.TimeoutError):
+            self.last_state = "no answer"
+            return False
+        try:
+            return await asyncio.wait_for(self.exchange(reader, writer), self.timeout)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, struct.error):
+            self.last_state = "no answer"
+            return False
+        finally:
+            writer.close()
+
+    def describe(self) -> str:
+        return f"{self.protocol} {self.host}:{self.port} ({self.last_state})"
+
+
+class PostgresProbe(_ProtocolProbe):
+    """Send a startup packet like pg_isready.
+
+    Any answer means the server accepts connections (an auth request or even
+    an auth error), except SQLSTATE 57P03: starting up, shutting down or in
+    recovery.
+    """
+
+    protocol = "postgres"
+
+    def __init__(self, host: str, port: int = 5432, timeout: float = 3, user: str = "postgres"):
+        super().__init__(host, port, timeout)
+        self.user = user
+
+    async def exchange(self, reader, writer) -> bool:
+        params = f"user\0{self.user}\0database\0postgres\0\0".encode()
+        writer.write(struct.pack("!ii", 8 + len(params), 196608) + params)  # protocol 3.0
+        await writer.drain()
+        kind = await reader.readexactly(1)
+        if kind != b"E":
+            self.last_state = "accepting connections"
+            return True
+        (length,) = struct.unpack("!i", await reader.readexactly(4))
+        fields = await reader.readexactly(length - 4)
+        code = next((f[1:].decode() for f in fields.split(b"\0") if f.startswith(b"C")), "")
+        self.last_state = f"SQLSTATE {code}"
+        return code != "57P03"
+
+
+class RedisProbe(_ProtocolProbe):
+    """PING; ready on PONG or an auth error, not while LOADING the dataset."""
+
+    protocol = "redis"
+
+    async def exchange(self, reader, writer) -> bool:
+        writer.write(b"*1\r\n$4\r\nPING\r\n")
+        await writer.drain()
+        line = (await reader.readline()).decode("latin-1").strip()
+        self.last_state = line or "no answer"
+        return line.startswith("+PONG") or line.startswith("-NOAUTH")
+
+
+class MysqlProbe(_ProtocolProbe):
+    """Ready when the server sends its handshake instead of an error packet."""
+
+    protocol = "mysql"
+
+    async def exchange(self, reader, writer) -> bool:
+        header = await reader.readexactly(4)
+        length = int.from_bytes(header[:3], "little")
+        payload = await reader.readexactly(length)
+        if payload[:1] == b"\xff":
+            self.last_state = payload[9:].decode("utf-8", "replace") or "error packet"
+            return False
+        self.last_state = "handshake"
+        return True
+
+
+_PROTOCOL_PROBES = {
+    "tcp": TcpProbe,
+    "postgres": PostgresProbe,
+    "redis": RedisProbe,
+    "mysql": MysqlProbe,
+}
+
+
+def probe_from_config(cfg: dict) -> Probe:
+    """Build a probe from a {host, port, probe, path, expect} mapping.
+
+    `probe` is one of tcp (default), postgres, redis, mysql or http; http
+    requests `path` (default /) and expects `expect` (default 200).
+    """
+    kind = cfg.get("probe", "tcp")
+    host, port = cfg["host"], int(cfg["port"])
+    if kind == "http":
+        return HttpProbe(host, (host, port), cfg.get("path", "/"), expect=int(cfg.get("expect", 200)))
+    if kind not in _PROTOCOL_PROBES:
+        raise ValueError(f"Unknown probe '{kind}' (expected http, {', '.join(_PROTOCOL_PROBES)})")
+    return _PROTOCOL_PROBES[kind](host, port)
+
+
+@dataclass
+class ReadinessCheck:
+    """A service is ready when all of its probes pass."""
+    name: str
+    probes: List[Probe] = field(default_factory=list)
+
+
+@dataclass
+class ReadinessResult:
+    """Outcome of waiting for one service."""
+    name: str
+    ready: bool
+    seconds: float
+    detail: str = ""
+
+
+async def _watch(check: ReadinessCheck, started: float, deadline: float, interval: float,
+                 max_interval: float, on_ready: Optional[Callable[[ReadinessResult], None]]) -> ReadinessResult:
+    loop = asyncio.get_running_loop()
+    pending = list(check.probes)
+    delay = interval
+    while True:
+        outcomes = await asyncio.gather(*(p.check() for p in pending), return_exceptions=True)
+        pending = [p for p, ok in zip(pending, outcomes) if ok is not True]
+        now = loop.time()
+        if not pending:
+            result = ReadinessResult(check.name, True, now - started)
+            if on_ready:
+                on_ready(result)
+            return result
+        if now >= deadline:
+            return ReadinessResult(check.name, False, now - started,
+                                   "; ".join(p.describe() for p in pending))
+        # Exponential backoff with jitter: retries of many watchers spread out
+        await asyncio.sleep(min(delay * random.uniform(0.5, 1.0), deadline - now))
+        delay = min(delay * 2, max_interval)
+
+
+async def wait_until_ready_async(
+    checks: List[ReadinessCheck],
+    timeout: float,
+    interval: float = 0.25,
+    on_ready: Optional[Callable[[ReadinessResult], None]] = None,
+    max_interval: float = 2.0,
+) -> List[ReadinessResult]:
+    """Watch all checks concurrently under one global deadline.
+
+    Probing starts every `interval` seconds and backs off up to `max_interval`.
+    """
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    deadline = started + timeout
+    return list(await asyncio.gather(*(
+        _watch(check, started, deadline, interval, max_interval, on_ready) for check in checks
+    )))
+
+
+def wait_until_ready(
+    checks: List[ReadinessCheck],
+    timeout: float,
+    interval: float = 0.25,
+    on_ready: Optional[Callable[[ReadinessResult], None]] = None,
+    max_interval: float = 2.0,
+) -> List[ReadinessResult]:
+    """Blocking wrapper around wait_until_ready_async()."""
+    if not checks:
+        return []
+    return asyncio.run(wait_until_ready_async(checks, timeout, interval, on_ready, max_interval))
+
+
+def record_results(log_file, results: List[ReadinessResult], context: str = "") -> None:
+    """Append time-to-ready samples as JSON lines."""
+    stamp = time.strftime("%Y-%m-%dT%H:%M:%S")
+    with open(log_file, "a", encoding="utf-8") as f:
+        for r in results:
+            f.write(json.dumps({
+                "time": stamp,
+                "context": context,
+                "service": r.name,
+                "ready": r.ready,
+                "seconds": round(r.seconds, 2),
+            }) + "\n")
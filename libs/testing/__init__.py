@@ -1,5 +1,6 @@
 """E2E Testing module for infrastructure services."""
 
 from .e2e import E2ETest, TestResult
+from .startup import check_startup, measure_import_time
 
-__all__ = ["E2ETest", "TestResult"]
+__all__ = ["E2ETest", "TestResult", "check_startup", "measure_import_time"]
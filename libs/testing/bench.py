@@ -0,0 +1,243 @@
+"""Latency benchmark of E2E services, JSON baselines and regression checks."""
+
+import json
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .e2e import E2ETest, TestResult, TestStatus, logger
+
+BASELINE_VERSION = 1
+# A service regresses when its median gets this much slower...
+REGRESSION_RATIO = 1.25
+# ...and the slowdown is significant (one-sided Mann-Whitney U test)
+SIGNIFICANCE = 0.01
+# Fewer samples than this per side cannot show significance
+MIN_SAMPLES = 5
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile; 0 for no values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+@dataclass
+class BenchResult:
+    """Warm latencies of one service (successful requests only)."""
+    name: str
+    url: str
+    samples_ms: List[float] = field(default_factory=list)
+    errors: int = 0
+    elapsed_s: float = 0.0
+
+    @property
+    def rps(self) -> float:
+        """Sequential requests per second on one keep-alive connection."""
+        return len(self.samples_ms) / self.elapsed_s if self.elapsed_s else 0.0
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "min": min(self.samples_ms, default=0.0),
+            "p50": percentile(self.samples_ms, 50),
+            "p95": percentile(self.samples_ms, 95),
+            "p99": percentile(self.samples_ms, 99),
+            "max": max(self.samples_ms, default=0.0),
+            "rps": self.rps,
+        }
+
+
+def run_bench(tester: E2ETest, results: List[TestResult], requests: int) -> List[BenchResult]:
+    """Benchmark every service that passed its E2E check, in report order.
+
+    Each service gets one unrecorded warm-up request, then `requests` GETs
+    one after another (redirects followed, like a page load). Services run
+    in parallel, at most `tester.concurrency` at a time.
+    """
+    targets = [r for r in results if r.status in (TestStatus.PASS, TestStatus.REDIRECT)]
+
+    def _bench(result: TestResult) -> BenchResult:
+        tester.measure(result.url, 1)
+        t0 = time.perf_counter()
+        samples, errors = tester.measure(result.url, requests)
+        return BenchResult(result.name, result.url, samples, errors, time.perf_counter() - t0)
+
+    logger.info(f"Benchmark: {requests} warm requests x {len(targets)} services")
+    with ThreadPoolExecutor(max_workers=tester.concurrency, thread_name_prefix="bench") as executor:
+        return list(executor.map(_bench, targets))
+
+
+def log_bench(bench: List[BenchResult]) -> None:
+    width = max([len(b.name) for b in bench] + [7])
+    logger.info(f"{'SERVICE':<{width}}  {'min':>7} {'p50':>7} {'p95':>7} {'p99':>7} {'max':>7}  {'req/s':>7}  err")
+    for b in bench:
+        s = b.summary()
+        line = (f"{b.name:<{width}}  {s['min']:7.1f} {s['p50']:7.1f} {s['p95']:7.1f} "
+                f"{s['p99']:7.1f} {s['max']:7.1f}  {s['rps']:7.1f}  {b.errors}")
+        if b.errors:
+            logger.warning(line)
+        else:
+            logger.info(line)
+
+
+def save_baseline(bench: List[BenchResult], requests: int, logs_dir: Path) -> Path:
+    """Write logs/bench-<timestamp>.json with raw samples and their summary."""
+    stamp = datetime.now()
+    path = logs_dir / f"bench-{stamp:%Y%m%d-%H%M%S}.json"
+    data = {
+        "version": BASELINE_VERSION,
+        "timestamp": stamp.isoformat(timespec="seconds"),
+        "requests": requests,
+        "services": {
+            b.name: {
+                "url": b.url,
+                "errors": b.errors,
+                **{k: round(v, 2) for k, v in b.summary().items()},
+                "samples_ms": [round(v, 2) for v in b.samples_ms],
+            }
+            for b in bench
+        },
+    }
+    logs_dir.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+    return path
+
+
+def load_baseline(path: Path) -> dict:
+    data = json.loads(Path(path).read_text(encoding="utf-8"))
+    if data.get("version") != BASELINE_VERSION:
+        raise ValueError(f"{path}: unsupported baseline version {data.get('version')}")
+    return data
+
+
+def mann_whitney_greater(current: List[float], baseline: List[float]) -> float:
+    """One-sided p-value that `current` tends to be larger than `baseline`.
+
+    Mann-Whitney U with tie correction and the normal approximation (with
+    continuity correction), fine from about 5 samples per side.
+    """
+    n1, n2 = len(current), len(baseline)
+    ranked = sorted([(v, 0) for v in current] + [(v, 1) for v in baseline])
+    ranks = [0.0] * len(ranked)
+    ties = 0.0
+    i = 0
+    while i < len(ranked):
+        j = i
+        while j + 1 < len(ranked) and ranked[j + 1][0] == ranked[i][0]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[k] = (i + j) / 2 + 1
+        t = j - i + 1
+        ties += t ** 3 - t
+        i = j + 1
+    u = sum(r for r, (_, side) in zip(ranks, ranked) if side == 0) - n1 * (n1 + 1) / 2
+    n = n1 + n2
+    variance = n1 * n2 / 12 * ((n + 1) - ties / (n * (n - 1)))
+    if variance <= 0:
+        return 1.0
+    z = (u - n1 * n2 / 2 - 0.5) / math.sqrt(variance)
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def fisher_greater(errors: int, total: int, base_errors: int, base_total: int) -> float:
+    """One-sided p-value that the error rate errors/total is above base_errors/base_total.
+
+    Fisher's exact test: the chance, with the errors of both runs shuffled
+    between them at random, that the current run gets `errors` or more.
+    """
+    n, k = total + base_total, errors + base_errors
+    if not total or not base_total or not k:
+        return 1.0
+    ways = math.comb(n, total)
+    return sum(math.comb(k, x) * math.comb(n - k, total - x)
+               for x in range(errors, min(k, total) + 1)) / ways
+
+
+@dataclass
+class Comparison:
+    """Current run of one service against its baseline."""
+    name: str
+    verdict: str  # regression, more errors, ok, faster, new, missing or too few samples
+    base_p50: float = 0.0
+    p50: float = 0.0
+    p_value: Optional[float] = None
+    base_error_rate: float = 0.0
+    error_rate: float = 0.0
+
+    @property
+    def ratio(self) -> float:
+        return self.p50 / self.base_p50 if self.base_p50 else 0.0
+
+    @property
+    def failing(self) -> bool:
+        return self.verdict in ("regression", "more errors")
+
+
+def compare(bench: List[BenchResult], baseline: dict, ratio: float = REGRESSION_RATIO,
+            alpha: float = SIGNIFICANCE) -> List[Comparison]:
+    """Flag services whose median slowed by `ratio` or more with p < alpha,
+    or whose error rate rose with p < alpha.
+    """
+    services = baseline.get("services", {})
+    comparisons = []
+    for b in bench:
+        base = services.get(b.name)
+        total = len(b.samples_ms) + b.errors
+        if base is None:
+            comparisons.append(Comparison(b.name, "new", p50=percentile(b.samples_ms, 50),
+                                          error_rate=b.errors / total if total else 0.0))
+            continue
+        base_samples = base.get("samples_ms", [])
+        base_errors = base.get("errors", 0)
+        base_total = len(base_samples) + base_errors
+        c = Comparison(b.name, "ok", percentile(base_samples, 50), percentile(b.samples_ms, 50),
+                       base_error_rate=base_errors / base_total if base_total else 0.0,
+                       error_rate=b.errors / total if total else 0.0)
+        if (c.error_rate > c.base_error_rate
+                and fisher_greater(b.errors, total, base_errors, base_total) < alpha):
+            c.verdict = "more errors"
+        elif min(len(base_samples), len(b.samples_ms)) < MIN_SAMPLES:
+            c.verdict = "too few samples"
+        else:
+            c.p_value = mann_whitney_greater(b.samples_ms, base_samples)
+            if c.ratio >= ratio and c.p_value < alpha:
+                c.verdict = "regression"
+            elif c.ratio and c.ratio <= 1 / ratio and mann_whitney_greater(base_samples, b.samples_ms) < alpha:
+                c.verdict = "faster"
+        comparisons.append(c)
+    seen = {b.name for b in bench}
+    comparisons += [Comparison(name, "missing", base_p50=s.get("p50", 0.0))
+                    for name, s in services.items() if name not in seen]
+    return comparisons
+
+
+def log_comparison(comparisons: List[Comparison], baseline: dict) -> int:
+    """Log the comparison table; returns the number of regressions (latency or errors)."""
+    logger.info(f"Against baseline {baseline.get('timestamp', '?')} "
+                f"(regression: p50 x{REGRESSION_RATIO:g} or more, or a higher error rate; p < {SIGNIFICANCE:g})")
+    width = max([len(c.name) for c in comparisons] + [7])
+    logger.info(f"{'SERVICE':<{width}}  {'base p50':>8} {'p50':>8} {'ratio':>6} {'p-value':>8}  "
+                f"{'err % (base)':>12}  verdict")
+    regressions = 0
+    for c in comparisons:
+        ratio = f"x{c.ratio:.2f}" if c.ratio else "-"
+        p_value = f"{c.p_value:.4f}" if c.p_value is not None else "-"
+        errors = f"{100 * c.error_rate:.0f} ({100 * c.base_error_rate:.0f})"
+        line = (f"{c.name:<{width}}  {c.base_p50:8.1f} {c.p50:8.1f} {ratio:>6} {p_value:>8}  "
+                f"{errors:>12}  {c.verdict}")
+        if c.failing:
+            regressions += 1
+            logger.error(line)
+        elif c.verdict in ("missing", "too few samples"):
+            logger.warning(line)
+        elif c.verdict == "faster":
+            logger.success(line)
+        else:
+            logger.info(line)
+    return regressions
@@ -1,14 +1,19 @@
 """E2E Test class for testing infrastructure services."""
 
-import subprocess
+import asyncio
+import contextlib
+import functools
 import json
-import re
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from enum import Enum
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import Callable, List, Optional, Tuple
 from datetime import datetime
 
+from libs.httppool import HttpPool, HttpResult
+
 try:
     from loguru import logger
 except ImportError:
@@ -21,6 +26,25 @@ except ImportError:
         def debug(self, msg): pass
     logger = SimpleLogger()
 
+try:
+    from libs.tracing import span
+except ImportError:
+    # Fallback: no tracing
+    def span(*args, **kwargs):
+        return contextlib.nullcontext({})
+
+# Probes in flight at once during a test_* run
+DEFAULT_CONCURRENCY = 16
+# Seconds a whole test_* run may take; probes still pending then fail
+DEFAULT_DEADLINE = 60.0
+# Client errors that still prove the service is up (it rejects the probe's method/format)
+UP_CODES = (400, 405, 406)
+
+
+def is_up(status: int) -> bool:
+    """Success rule of every probe, benchmark sample included: 2xx or UP_CODES."""
+    return 200 <= status < 300 or status in UP_CODES
+
 
 class TestStatus(Enum):
     """Test result status."""
@@ -40,6 +64,10 @@ class TestResult:
     response_time_ms: float
     message: str = ""
     redirect_url: Optional[str] = None
+    # Phases of response_time_ms (see libs.httppool.HttpResult)
+    dns_ms: float = 0.0
+    connect_ms: float = 0.0
+    ttfb_ms: float = 0.0
 
     def log(self) -> None:
         """Log the result using loguru."""
@@ -89,63 +117,53 @@ class TestReport:
 class E2ETest:
     """E2E Test class for infrastructure services."""
 
-    def __init__(self, base_domain: str = "127.0.0.1.traefik.me", port: int = 9000):
+    def __init__(self, base_domain: str = "127.0.0.1.traefik.me", port: int = 9000,
+                 concurrency: int = DEFAULT_CONCURRENCY, deadline: Optional[float] = DEFAULT_DEADLINE):
         self.base_domain = base_domain
         self.port = port
+        self.concurrency = max(1, concurrency)
+        self.deadline = deadline
         self._results: List[TestResult] = []
+        self._deadline_at: Optional[float] = None
+        # Every probe goes through Traefik: keep-alive connections are shared across vhosts
+        self._pool = HttpPool(max_connections=self.concurrency, timeout=10)
+
+    def _remaining(self) -> Optional[float]:
+        """Seconds left before the run deadline, or None outside a bounded run."""
+        if self._deadline_at is None:
+            return None
+        return self._deadline_at - time.monotonic()
 
     def _build_url(self, service: str) -> str:
         """Build URL for a service."""
         return f"http://{service}.{self.base_domain}:{self.port}"
 
-    def _curl_test(self, url: str, follow_redirects: bool = False, timeout: int = 10, use_get: bool = False) -> Tuple[int, float, str]:
-        """Execute curl test and return (status_code, response_time_ms, redirect_url)."""
-        try:
-            cmd = [
-                "curl", "-s",
-                "-w", "%{http_code}|%{time_total}|%{redirect_url}",
-                "-o", "nul" if subprocess.sys.platform == "win32" else "/dev/null",
-                "--max-time", str(timeout),
-            ]
-            if not use_get:
-                cmd.insert(1, "-I")
-            if follow_redirects:
-                cmd.append("-L")
-            cmd.append(url)
-
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=timeout + 5
-            )
-
-            output = result.stdout.strip()
-
-            if "|" in output:
-                parts = output.split("|")
-                if len(parts) >= 3:
-                    http_code = int(parts[-3].split()[-1]) if parts[-3] else 0
-                    time_total = float(parts[-2]) * 1000 if parts[-2] else 0
-                    redirect_url = parts[-1] if parts[-1] else ""
-                    return http_code, time_total, redirect_url
-
-            for line in output.split("\n"):
-                if line.startswith("HTTP/"):
-                    match = re.search(r"HTTP/[\d.]+ (\d+)", line)
-                    if match:
-                        return int(match.group(1)), 0, ""
-
-            return 0, 0, ""
-
-        except subprocess.TimeoutExpired:
-            return 0, timeout * 1000, ""
-        except Exception:
-            return 0, 0, ""
+    def _probe(self, url: str, use_get: bool = False, follow_redirects: bool = False,
+               timeout: float = 10) -> HttpResult:
+        """One request chain on the shared keep-alive pool (GET or HEAD).
+
+        `timeout` bounds the whole chain, redirects included (like curl
+        --max-time), and never runs past the deadline of the current run.
+        """
+        remaining = self._remaining()
+        if remaining is not None:
+            timeout = max(0.1, min(timeout, remaining))
+        method = "GET" if use_get else "HEAD"
+        with span(f"{method} {url}", cat="e2e", follow_redirects=follow_redirects):
+            return self._pool.request(url, method, timeout=timeout, follow_redirects=follow_redirects,
+                                      total_timeout=timeout)
 
     def _test_service(self, name: str, url: str, accept_redirects: bool = True, use_get: bool = False) -> TestResult:
         """Test a single service."""
-        http_code, response_time, redirect_url = self._curl_test(url, use_get=use_get)
+        remaining = self._remaining()
+        if remaining is not None and remaining <= 0:
+            return TestResult(name=name, url=url, status=TestStatus.FAIL, http_code=0,
+                              response_time_ms=0, message="Not run - test deadline exceeded")
+
+        probe = self._probe(url, use_get=use_get, follow_redirects=accept_redirects)
+        http_code = max(probe.redirects[0][0] if probe.redirects else probe.status, 0)
+        response_time = probe.ms
+        redirect_url = probe.location
 
         if http_code == 0:
             status = TestStatus.FAIL
@@ -155,16 +173,15 @@ class E2ETest:
             message = "OK"
         elif 300 <= http_code < 400:
             if accept_redirects:
-                # Follow redirect and check final destination
-                final_code, final_time, _ = self._curl_test(url, follow_redirects=True, use_get=True)
+                # The redirect chain was followed in the same probe: check the final destination
+                final_code = max(probe.status, 0)
                 dest = redirect_url or "?"
                 if final_code == 0:
                     status = TestStatus.FAIL
                     message = f"Redirect destination unreachable (→ {dest})"
-                elif 200 <= final_code < 300 or final_code in (400, 405, 406):
+                elif is_up(final_code):
                     status = TestStatus.PASS
                     message = f"OK (→ {dest})"
-                    response_time = final_time or response_time
                 else:
                     status = TestStatus.FAIL
                     message = f"Redirect destination HTTP {final_code} (→ {dest})"
@@ -199,7 +216,10 @@ class E2ETest:
             http_code=http_code,
             response_time_ms=response_time,
             message=message,
-            redirect_url=redirect_url if redirect_url else None
+            redirect_url=redirect_url if redirect_url else None,
+            dns_ms=probe.dns_ms,
+            connect_ms=probe.connect_ms,
+            ttfb_ms=probe.ttfb_ms,
         )
 
     # === Private test methods ===
@@ -389,6 +409,53 @@ class E2ETest:
     def _test_thingsboard(self) -> TestResult:
         return self._test_service("ThingsBoard", self._build_url("thingsboard"))
 
+    # === Runner ===
+
+    @staticmethod
+    def _guarded(test: Callable[[], TestResult]) -> TestResult:
+        """Run one probe; an exception becomes a FAIL result instead of aborting the run."""
+        try:
+            return test()
+        except Exception as e:
+            if isinstance(test, functools.partial) and len(test.args) >= 2:
+                name, url = test.args[0], test.args[1]
+            else:
+                name, url = getattr(test, "__name__", "probe").replace("_test_", "", 1), ""
+            return TestResult(name=name, url=url, status=TestStatus.FAIL, http_code=0,
+                              response_time_ms=0, message=f"Probe error: {type(e).__name__}: {e}")
+
+    async def _run_async(self, categories: List[Tuple[str, List[Callable[[], TestResult]]]],
+                         on_category: Optional[Callable[[str], None]],
+                         on_result: Callable[[TestResult], None]) -> None:
+        """Start every probe at once (at most `concurrency` in flight) and hand
+        results back in category order as soon as their predecessors are done."""
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="e2e") as executor:
+            pending = [(category, [loop.run_in_executor(executor, self._guarded, test) for test in tests])
+                       for category, tests in categories]
+            for category, futures in pending:
+                if on_category:
+                    on_category(category)
+                for future in futures:
+                    on_result(await future)
+
+    def _run(self, categories: List[Tuple[str, List[Callable[[], TestResult]]]],
+             on_category: Optional[Callable[[str], None]] = None, verbose: bool = True) -> TestReport:
+        """Run [(category, [probe])] concurrently under the deadline; report in input order."""
+        report = TestReport()
+
+        def _collect(result: TestResult) -> None:
+            report.results.append(result)
+            if verbose:
+                result.log()
+
+        self._deadline_at = time.monotonic() + self.deadline if self.deadline else None
+        try:
+            asyncio.run(self._run_async(categories, on_category, _collect))
+        finally:
+            self._deadline_at = None
+        return report
+
     # === Public methods ===
 
     def test_service(self, service_name: str) -> TestResult:
@@ -400,11 +467,23 @@ class E2ETest:
         """Test a specific URL."""
         return self._test_service(name, url)
 
+    def measure(self, url: str, requests: int, timeout: float = 10) -> Tuple[List[float], int]:
+        """Issue `requests` sequential GETs (redirects followed) on the pool.
+
+        Returns the latencies in ms of the successful ones (see is_up, the
+        rule of the E2E checks) and the number of failed ones.
+        """
+        samples, errors = [], 0
+        for _ in range(requests):
+            result = self._pool.request(url, "GET", timeout=timeout, follow_redirects=True)
+            if is_up(result.status):
+                samples.append(result.ms)
+            else:
+                errors += 1
+        return samples, errors
+
     def test_core(self) -> TestReport:
         """Test all core services."""
-        report = TestReport()
-        logger.info("Testing CORE services...")
-
         tests = [
             self._test_traefik,
             self._test_dashy,
@@ -412,59 +491,35 @@ class E2ETest:
             self._test_heimdall,
             self._test_homepage,
         ]
-
-        for test in tests:
-            result = test()
-            report.results.append(result)
-            result.log()
-
-        return report
+        return self._run([("CORE", tests)],
+                         lambda category: logger.info(f"Testing {category} services..."))
 
     def test_infra(self) -> TestReport:
         """Test all infrastructure services."""
-        report = TestReport()
-        logger.info("Testing INFRA services...")
-
         tests = [
             self._test_pgadmin,
             self._test_redis,
         ]
-
-        for test in tests:
-            result = test()
-            report.results.append(result)
-            result.log()
-
-        return report
+        return self._run([("INFRA", tests)],
+                         lambda category: logger.info(f"Testing {category} services..."))
 
     def test_data(self) -> TestReport:
         """Test all data services."""
-        report = TestReport()
-        logger.info("Testing DATA services...")
-
         tests = [
             self._test_airflow,
             self._test_dagster,
             self._test_trino,
         ]
+        return self._run([("DATA", tests)],
+                         lambda category: logger.info(f"Testing {category} services..."))
 
-        for test in tests:
-            result = test()
-            report.results.append(result)
-            result.log()
-
-        return report
-
-    def test_all(self, verbose: bool = True, active_services: Optional[List[str]] = None) -> TestReport:
-        """Run all tests and return a complete report.
+    def plan(self, active_services: Optional[List[str]] = None) -> List[Tuple[str, List[Callable[[], TestResult]]]]:
+        """The probes test_all() runs, as [(category, [probe])] in report order.
 
         Args:
-            verbose: Print detailed output
             active_services: List of active service names from .state.json.
                             If None, all services are tested.
         """
-        report = TestReport()
-
         # Map service names (from .state.json) to test functions
         service_tests = {
             # CORE - always tested (core infra)
@@ -720,20 +775,25 @@ class E2ETest:
             if iot_tests:
                 tests_to_run.append(("IOT", iot_tests))
 
+        return tests_to_run
+
+    def test_all(self, verbose: bool = True, active_services: Optional[List[str]] = None) -> TestReport:
+        """Run all tests and return a complete report.
+
+        Args:
+            verbose: Print detailed output
+            active_services: List of active service names from .state.json.
+                            If None, all services are tested.
+        """
+        tests_to_run = self.plan(active_services)
+
         if verbose:
             logger.info("=" * 50)
             logger.info("E2E Infrastructure Tests")
             logger.info("=" * 50)
 
-        for category, tests in tests_to_run:
-            if verbose:
-                logger.info(f"--- {category} ---")
-
-            for test in tests:
-                result = test()
-                report.results.append(result)
-                if verbose:
-                    result.log()
+        on_category = (lambda category: logger.info(f"--- {category} ---")) if verbose else None
+        report = self._run(tests_to_run, on_category, verbose)
 
         if verbose:
             logger.info("=" * 50)
@@ -743,8 +803,7 @@ class E2ETest:
 
     def test_from_fragments(self, fragments_dir: Path) -> TestReport:
         """Discover and test all services from dashy.fragment.json files."""
-        report = TestReport()
-
+        tests = []
         fragment_files = list(fragments_dir.rglob("dashy.fragment.json"))
 
         logger.info(f"Found {len(fragment_files)} service fragments")
@@ -759,13 +818,12 @@ class E2ETest:
                 url = data.get("url", "")
 
                 if url and url.startswith("http"):
-                    result = self._test_service(name, url)
-                    report.results.append(result)
-                    result.log()
+                    tests.append(functools.partial(self._test_service, name, url))
 
             except Exception as e:
                 logger.warning(f"{fragment_file.parent.name}: Error reading fragment - {e}")
 
+        report = self._run([("fragments", tests)])
         logger.info("=" * 50)
         report.log_summary()
 
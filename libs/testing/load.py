@@ -0,0 +1,258 @@
+"""Open-loop load generation through Traefik, with HDR-style latency histograms.
+
+Requests are sent on a fixed schedule (rate x duration) whether or not
+earlier ones have answered, so a slow service builds a backlog instead of
+slowing the generator down. Latency is measured from each request's
+scheduled send time, which corrects coordinated omission: time a request
+spent waiting behind a stalled one counts against the service.
+"""
+
+import json
+import math
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+from libs.httppool import HttpPool
+
+from .e2e import E2ETest, logger
+
+# Percentiles shown in the latency distribution
+REPORT_PERCENTILES = (50, 75, 90, 99, 99.9, 99.99, 100)
+
+
+class LatencyHistogram:
+    """Log-linear buckets of microsecond values, like HdrHistogram.
+
+    Values below `2 * 10**digits` (rounded up to a power of two) get their
+    own bucket; above that every power of two is split into half as many
+    linear sub-buckets, so any recorded value is kept within 10**-digits
+    relative precision at constant memory, whatever the range.
+    """
+
+    def __init__(self, digits: int = 2):
+        self.sub_buckets = 1 << math.ceil(math.log2(2 * 10 ** digits))
+        self._sub_bits = self.sub_buckets.bit_length() - 1
+        self._half = self.sub_buckets // 2
+        self.counts: Dict[int, int] = {}
+        self.total = 0
+        self.min = 0
+        self.max = 0
+        self._sum = 0
+
+    def _index(self, value: int) -> int:
+        if value < self.sub_buckets:
+            return value
+        shift = value.bit_length() - self._sub_bits
+        return self.sub_buckets + (shift - 1) * self._half + (value >> shift) - self._half
+
+    def _highest(self, index: int) -> int:
+        """Largest value that lands in bucket `index`."""
+        if index < self.sub_buckets:
+            return index
+        shift, top = divmod(index - self.sub_buckets, self._half)
+        shift += 1
+        return ((top + self._half + 1) << shift) - 1
+
+    def record(self, value_us: int, count: int = 1) -> None:
+        value_us = max(0, int(value_us))
+        index = self._index(value_us)
+        self.counts[index] = self.counts.get(index, 0) + count
+        self.min = value_us if not self.total else min(self.min, value_us)
+        self.max = max(self.max, value_us)
+        self.total += count
+        self._sum += value_us * count
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        if other.total:
+            self.min = other.min if not self.total else min(self.min, other.min)
+            self.max = max(self.max, other.max)
+        self.total += other.total
+        self._sum += other._sum
+
+    @property
+    def mean(self) -> float:
+        return self._sum / self.total if self.total else 0.0
+
+    def percentile(self, pct: float) -> int:
+        """Value at or below which `pct` percent of the recorded values fall."""
+        if not self.total:
+            return 0
+        rank = max(1, math.ceil(pct / 100 * self.total))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(self._highest(index), self.max)
+        return self.max
+
+
+@dataclass
+class Route:
+    """One target of the mix; weight is its share of the requests."""
+    name: str
+    url: str
+    weight: float = 1.0
+
+
+@dataclass
+class RouteStats:
+    """What one route got during a run."""
+    route: Route
+    latency: LatencyHistogram = field(default_factory=LatencyHistogram)
+    service: LatencyHistogram = field(default_factory=LatencyHistogram)
+    sent: int = 0
+    errors: int = 0
+    codes: Dict[int, int] = field(default_factory=dict)
+
+    def record(self, status: int, latency_us: int, service_us: int) -> None:
+        self.latency.record(latency_us)
+        self.service.record(service_us)
+        self.codes[status] = self.codes.get(status, 0) + 1
+        if not 0 < status < 400:
+            self.errors += 1
+
+
+@dataclass
+class LoadReport:
+    """Outcome of one run. Latency is from the scheduled send time."""
+    rate: float
+    duration: float
+    routes: List[RouteStats]
+    elapsed: float = 0.0
+    max_lag_ms: float = 0.0  # worst delay between schedule and actual send
+
+    @property
+    def completed(self) -> int:
+        return sum(r.latency.total for r in self.routes)
+
+    @property
+    def errors(self) -> int:
+        return sum(r.errors for r in self.routes)
+
+    @property
+    def achieved_rps(self) -> float:
+        return self.completed / self.elapsed if self.elapsed else 0.0
+
+    def latency(self, service_time: bool = False) -> LatencyHistogram:
+        """All routes merged; service_time measures from the actual send instead."""
+        total = LatencyHistogram()
+        for r in self.routes:
+            total.merge(r.service if service_time else r.latency)
+        return total
+
+
+def resolve_routes(tester: E2ETest, specs: List[str], fragments_dir: Optional[Path] = None) -> List[Route]:
+    """Routes from "target[=weight]" specs.
+
+    A target is a URL, the name of a module with a dashy.fragment.json (its
+    url is used) or a service name for the E2E URL scheme. Raises ValueError
+    for a weight that is not a positive number.
+    """
+    fragment_urls = {}
+    if fragments_dir:
+        for fragment_file in fragments_dir.rglob("dashy.fragment.json"):
+            try:
+                url = json.loads(fragment_file.read_text(encoding="utf-8")).get("url", "")
+            except (OSError, ValueError):
+                continue
+            if url.startswith("http"):
+                fragment_urls[fragment_file.parent.name] = url
+    routes = []
+    for spec in specs:
+        target, _, weight = spec.partition("=")
+        if target.startswith("http"):
+            parts = urlsplit(target)
+            host = parts.hostname or ""
+            # Traefik vhost -> its first label; bare address -> host:port
+            name = parts.netloc if host.replace(".", "").isdigit() or "." not in host else host.split(".")[0]
+            url, name = target, name + parts.path.rstrip("/")
+        else:
+            url, name = fragment_urls.get(target) or tester._build_url(target), target
+        value = float(weight) if weight else 1.0  # ValueError for non-numbers
+        if not 0 < value < math.inf:
+            raise ValueError(f"{spec}: weight must be a positive number")
+        routes.append(Route(name, url, value))
+    return routes
+
+
+def run_load(routes: List[Route], rate: float, duration: float, max_in_flight: int = 256,
+             timeout: float = 10, seed: Optional[int] = None) -> LoadReport:
+    """Send `rate` requests per second for `duration` seconds, spread over `routes`.
+
+    Each request is a GET (redirects followed) on a keep-alive pool of up to
+    `max_in_flight` connections. The route of each request is drawn by weight.
+    """
+    stats = [RouteStats(r) for r in routes]
+    lock = threading.Lock()
+    pool = HttpPool(max_connections=max_in_flight, timeout=timeout)
+    rng = random.Random(seed)
+    weights = [r.weight for r in routes]
+    interval = 1 / rate
+    report = LoadReport(rate, duration, stats)
+
+    def _fire(route_stats: RouteStats, intended: float) -> None:
+        sent = time.perf_counter()
+        result = pool.request(route_stats.route.url, "GET", follow_redirects=True)
+        done = time.perf_counter()
+        with lock:
+            route_stats.record(result.status, int((done - intended) * 1e6), int((done - sent) * 1e6))
+            report.max_lag_ms = max(report.max_lag_ms, (sent - intended) * 1000)
+
+    start = time.perf_counter() + 0.05
+    with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="load") as executor:
+        for i in range(int(rate * duration)):
+            intended = start + i * interval
+            delay = intended - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            target = rng.choices(stats, weights)[0]
+            target.sent += 1
+            executor.submit(_fire, target, intended)
+    report.elapsed = time.perf_counter() - start
+    pool.close()
+    return report
+
+
+def _ms(value_us: float) -> str:
+    return f"{value_us / 1000:8.1f}"
+
+
+def log_load(report: LoadReport) -> None:
+    """Per-route throughput and errors, then the overall latency distribution."""
+    logger.info(f"Open-loop load: {report.rate:g} req/s for {report.duration:g}s "
+                f"({report.completed} requests in {report.elapsed:.1f}s)")
+    width = max([len(r.route.name) for r in report.routes] + [7])
+    logger.info(f"{'ROUTE':<{width}}  {'sent':>6} {'req/s':>7} {'err %':>6}  "
+                f"{'p50':>8} {'p90':>8} {'p99':>8} {'max':>8}  codes")
+    for r in report.routes:
+        done = r.latency.total
+        error_pct = 100 * r.errors / done if done else 0.0
+        codes = " ".join(f"{'failed' if c == -1 else c}:{n}" for c, n in sorted(r.codes.items()))
+        line = (f"{r.route.name:<{width}}  {r.sent:6d} {done / report.elapsed if report.elapsed else 0:7.1f} "
+                f"{error_pct:6.1f}  {_ms(r.latency.percentile(50))} {_ms(r.latency.percentile(90))} "
+                f"{_ms(r.latency.percentile(99))} {_ms(r.latency.max)}  {codes}")
+        if r.errors:
+            logger.warning(line)
+        else:
+            logger.info(line)
+
+    total = report.latency()
+    logger.info(f"Achieved {report.achieved_rps:.1f} req/s of {report.rate:g} target, "
+                f"errors {report.errors}/{report.completed}, mean {total.mean / 1000:.1f} ms")
+    logger.info("Latency distribution (ms, from scheduled send time):")
+    for pct in REPORT_PERCENTILES:
+        logger.info(f"  {pct:>6g}%  {_ms(total.percentile(pct))}")
+    service = report.latency(service_time=True)
+    logger.info(f"Service time alone (from actual send): p50 {service.percentile(50) / 1000:.1f} ms, "
+                f"p99 {service.percentile(99) / 1000:.1f} ms")
+    if report.max_lag_ms > 1000 * 2 / report.rate:
+        logger.warning(f"Sends fell up to {report.max_lag_ms:.0f} ms behind schedule: "
+                       f"raise --max-in-flight or lower --rate")
@@ -0,0 +1,262 @@
+"""Continuous synthetic probing of E2E services, exported as Prometheus metrics.
+
+Every probe of E2ETest.plan() runs on its own jittered schedule, so checks
+spread over the interval instead of firing in bursts. Cost is bounded:
+at most `concurrency` probes run at once and, with many services, the
+interval stretches so the whole catalog never exceeds `max_rate` probes
+per second. The probe list is re-discovered every `refresh` seconds.
+
+Usage:
+    from libs.testing import E2ETest
+    from libs.testing.prober import ProbeDaemon, serve_metrics
+
+    tester = E2ETest()
+    daemon = ProbeDaemon(lambda: tester.plan(["grafana"]))
+    daemon.start()
+    serve_metrics(daemon, ("0.0.0.0", 9470))
+"""
+
+import heapq
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from .e2e import TestResult, TestStatus, logger
+
+DEFAULT_PORT = 9470
+# Upper bounds (seconds) of the probe_duration_seconds histogram
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+Plan = List[Tuple[str, List[Callable[[], TestResult]]]]
+
+
+@dataclass
+class ProbeSeries:
+    """Results of one probe: a rolling window plus counters since start."""
+    category: str
+    probe: Callable[[], TestResult]
+    name: str = ""
+    url: str = ""
+    window: Deque[Tuple[float, bool, float, int]] = field(default_factory=deque)  # (time, ok, seconds, code)
+    last: Optional[TestResult] = None
+    last_time: float = 0.0
+    buckets: List[int] = field(default_factory=lambda: [0] * len(DURATION_BUCKETS))
+    count: int = 0
+    total_seconds: float = 0.0
+    failures: int = 0
+
+    def add(self, result: TestResult, now: float, window: float) -> None:
+        ok = result.status in (TestStatus.PASS, TestStatus.REDIRECT)
+        seconds = result.response_time_ms / 1000
+        self.name, self.url, self.last, self.last_time = result.name, result.url, result, now
+        self.window.append((now, ok, seconds, result.http_code))
+        while self.window and self.window[0][0] < now - window:
+            self.window.popleft()
+        for i, bound in enumerate(DURATION_BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+        self.count += 1
+        self.total_seconds += seconds
+        self.failures += not ok
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class ProbeDaemon:
+    """Runs the probes of a plan forever on a jittered, rate-capped schedule."""
+
+    def __init__(self, discover: Callable[[], Plan], interval: float = 30,
+                 window: float = 300, concurrency: int = 4, max_rate: float = 2.0, refresh: float = 60):
+        self.discover = discover
+        self.interval = interval
+        self.window = window
+        self.concurrency = max(1, concurrency)
+        self.max_rate = max_rate
+        self.refresh = refresh
+        self.series: Dict[str, ProbeSeries] = {}
+        self._due: List[Tuple[float, str]] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._slots = threading.BoundedSemaphore(self.concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="probe")
+        self.started = time.time()
+
+    @property
+    def effective_interval(self) -> float:
+        """Interval per probe, stretched so the catalog stays under max_rate probes/s."""
+        return max(self.interval, len(self.series) / self.max_rate if self.max_rate else 0)
+
+    def _sync(self) -> None:
+        """Add newly discovered probes (at a random offset) and drop vanished ones."""
+        try:
+            plan = self.discover()
+        except Exception as e:  # keep serving the previous plan
+            logger.warning(f"Probe discovery failed: {e}")
+            return
+        wanted = {test.__name__: (category, test) for category, tests in plan for test in tests}
+        now = time.monotonic()
+        with self._lock:
+            for key in set(self.series) - set(wanted):
+                del self.series[key]
+            for key, (category, test) in wanted.items():
+                if key not in self.series:
+                    self.series[key] = ProbeSeries(category, test)
+                    heapq.heappush(self._due, (now + random.uniform(0, self.effective_interval), key))
+            self._due = [(t, k) for t, k in self._due if k in self.series]
+            heapq.heapify(self._due)
+
+    def _probe(self, key: str) -> Optional[TestResult]:
+        """Run one probe and record its result; None if it vanished or crashed."""
+        with self._lock:
+            series = self.series.get(key)
+        if series is None:
+            return None
+        try:
+            result = series.probe()
+        except Exception as e:  # a broken probe must not stop the daemon
+            logger.error(f"Probe {key} crashed: {e}")
+            return None
+        with self._lock:
+            was_ok = series.last is None or series.last.status in (TestStatus.PASS, TestStatus.REDIRECT)
+            series.add(result, time.time(), self.window)
+        ok = result.status in (TestStatus.PASS, TestStatus.REDIRECT)
+        if was_ok and not ok:
+            logger.warning(f"{result.name} is failing: {result.message} -> {result.url}")
+        elif not was_ok and ok:
+            logger.success(f"{result.name} recovered -> {result.url}")
+        return result
+
+    def _run(self, key: str) -> None:
+        try:
+            self._probe(key)
+        finally:
+            with self._lock:
+                if key in self.series:
+                    # Next run one interval later, +-10% so probes do not line up again
+                    delay = self.effective_interval * random.uniform(0.9, 1.1)
+                    heapq.heappush(self._due, (time.monotonic() + delay, key))
+            self._slots.release()
+
+    def run_once(self) -> None:
+        """Discover and run every probe once (at most `concurrency` at a time)."""
+        self._sync()
+        with self._lock:
+            keys = list(self.series)
+            self._due.clear()
+        list(self._executor.map(self._probe, keys))
+
+    def _loop(self) -> None:
+        next_sync = 0.0
+        while not self._stop.is_set():
+            now = time.monotonic()
+            if now >= next_sync:
+                self._sync()
+                next_sync = now + self.refresh
+            with self._lock:
+                due = self._due[0][0] if self._due else now + 1
+            if due > now:
+                self._stop.wait(min(due - now, max(0.0, next_sync - now), 1.0))
+                continue
+            self._slots.acquire()  # never more than `concurrency` probes in flight
+            with self._lock:
+                _, key = heapq.heappop(self._due) if self._due else (0, None)
+            if key is None:
+                self._slots.release()
+                continue
+            self._executor.submit(self._run, key)
+
+    def start(self) -> threading.Thread:
+        thread = threading.Thread(target=self._loop, name="probe-scheduler", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def metrics(self) -> str:
+        """Prometheus text exposition (format 0.0.4) of every probe."""
+        now = time.time()
+        lines = [
+            "# HELP probe_success Whether the last probe succeeded.",
+            "# TYPE probe_success gauge",
+        ]
+        with self._lock:
+            series = sorted((s for s in self.series.values() if s.last), key=lambda s: (s.category, s.name))
+            rows = [(s, f'service="{_label(s.name)}",category="{_label(s.category)}",url="{_label(s.url)}"')
+                    for s in series]
+            for s, labels in rows:
+                lines.append(f"probe_success{{{labels}}} {int(s.window[-1][1])}")
+            lines += ["# HELP probe_http_status_code HTTP status of the last probe (0: no answer).",
+                      "# TYPE probe_http_status_code gauge"]
+            for s, labels in rows:
+                lines.append(f"probe_http_status_code{{{labels}}} {s.last.http_code}")
+            lines += ["# HELP probe_last_run_timestamp_seconds When the last probe finished.",
+                      "# TYPE probe_last_run_timestamp_seconds gauge"]
+            for s, labels in rows:
+                lines.append(f"probe_last_run_timestamp_seconds{{{labels}}} {s.last_time:.3f}")
+            lines += [f"# HELP probe_success_ratio Share of successful probes over the last {self.window:g}s.",
+                      "# TYPE probe_success_ratio gauge"]
+            for s, labels in rows:
+                ratio = sum(ok for _, ok, _, _ in s.window) / len(s.window)
+                lines.append(f"probe_success_ratio{{{labels}}} {ratio:.4f}")
+            lines += ["# HELP probe_failures_total Failed probes since the daemon started.",
+                      "# TYPE probe_failures_total counter"]
+            for s, labels in rows:
+                lines.append(f"probe_failures_total{{{labels}}} {s.failures}")
+            lines += ["# HELP probe_duration_seconds Probe response time, redirects included.",
+                      "# TYPE probe_duration_seconds histogram"]
+            for s, labels in rows:
+                for bound, count in zip(DURATION_BUCKETS, s.buckets):
+                    lines.append(f'probe_duration_seconds_bucket{{{labels},le="{bound:g}"}} {count}')
+                lines.append(f'probe_duration_seconds_bucket{{{labels},le="+Inf"}} {s.count}')
+                lines.append(f"probe_duration_seconds_sum{{{labels}}} {s.total_seconds:.6f}")
+                lines.append(f"probe_duration_seconds_count{{{labels}}} {s.count}")
+            probes = len(self.series)
+            interval = self.effective_interval
+        lines += [
+            "# HELP probe_targets Probes currently scheduled.",
+            "# TYPE probe_targets gauge",
+            f"probe_targets {probes}",
+            "# HELP probe_interval_seconds Interval between runs of each probe.",
+            "# TYPE probe_interval_seconds gauge",
+            f"probe_interval_seconds {interval:g}",
+            "# HELP probe_daemon_uptime_seconds Seconds since the daemon started.",
+            "# TYPE probe_daemon_uptime_seconds gauge",
+            f"probe_daemon_uptime_seconds {now - self.started:.0f}",
+        ]
+        return "\n".join(lines) + "\n"
+
+
+def serve_metrics(daemon: ProbeDaemon, address: Tuple[str, int]) -> None:
+    """Serve /metrics until interrupted."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404, "Try /metrics")
+                return
+            body = daemon.metrics().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logger.debug(f"metrics {self.address_string()} {format % args}")
+
+    server = ThreadingHTTPServer(address, Handler)
+    server.daemon_threads = True
+    logger.info(f"Serving probe metrics on http://{address[0]}:{address[1]}/metrics")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
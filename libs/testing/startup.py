@@ -0,0 +1,112 @@
+"""Startup-time regression check based on `python -X importtime`."""
+
+import re
+import subprocess
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+try:
+    from loguru import logger
+except ImportError:
+    from .e2e import logger
+
+# Import time a read-only command may add on top of BASELINE_CODE, in
+# milliseconds. Relative, so it holds on slow and fast machines: running and
+# status measure 20-30 ms over the baseline (argparse, the Docker API client),
+# while pulling in PyYAML or libs.testing would exceed it.
+DEFAULT_ALLOWANCE_MS = 40.0
+# What every command pays anyway: the interpreter, site and loguru
+BASELINE_CODE = "import loguru"
+
+# "import time: <self us> | <cumulative us> | <indent><module>"
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)")
+
+
+@dataclass
+class StartupResult:
+    """Import time of one command (best of N runs)."""
+    command: List[str]
+    total_ms: float
+    heaviest: List[Tuple[str, float]] = field(default_factory=list)
+    baseline_ms: Optional[float] = None  # BASELINE_CODE, measured alongside
+
+    def within(self, budget_ms: float) -> bool:
+        return self.total_ms <= budget_ms
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, float]]:
+    """Top-level imports and their cumulative time (ms) from -X importtime output."""
+    imports = []
+    for line in stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match and len(match.group(3)) == 1:
+            imports.append((match.group(4), int(match.group(2)) / 1000))
+    return imports
+
+
+def _best_runs(argvs: List[List[str]], cwd: Path, runs: int) -> List[List[Tuple[str, float]]]:
+    """Top-level imports of the fastest run of each `python -X importtime <argv>`.
+
+    The argvs take turns run after run, so drift in machine load hits all
+    of them alike.
+    """
+    best: List[Optional[List[Tuple[str, float]]]] = [None] * len(argvs)
+    for _ in range(runs):
+        for i, argv in enumerate(argvs):
+            result = subprocess.run(
+                [sys.executable, "-X", "importtime", *argv],
+                capture_output=True,
+                text=True,
+                cwd=cwd,
+                timeout=60,
+            )
+            imports = parse_importtime(result.stderr)
+            if best[i] is None or sum(t for _, t in imports) < sum(t for _, t in best[i]):
+                best[i] = imports
+    return [b or [] for b in best]
+
+
+def measure_import_time(script: Path, args: List[str], runs: int = 5, top: int = 5,
+                        baseline: bool = False) -> StartupResult:
+    """Run `python -X importtime <script> <args>` and keep the fastest run.
+
+    With `baseline`, BASELINE_CODE is measured in alternation with it.
+    """
+    argvs = [[str(script), *args]] + ([["-c", BASELINE_CODE]] if baseline else [])
+    measured = _best_runs(argvs, script.parent, runs)
+    best = measured[0]
+    heaviest = sorted(best, key=lambda i: i[1], reverse=True)[:top]
+    result = StartupResult(args, sum(t for _, t in best), heaviest)
+    if baseline:
+        result.baseline_ms = sum(t for _, t in measured[1])
+    return result
+
+
+def check_startup(script: Path, commands: List[List[str]], budget_ms: Optional[float] = None,
+                  runs: int = 5, allowance_ms: float = DEFAULT_ALLOWANCE_MS) -> bool:
+    """Measure each command and log whether it stays within the import budget.
+
+    Without an absolute `budget_ms`, each command may take at most
+    `allowance_ms` more than BASELINE_CODE measured next to it.
+    """
+    if budget_ms is None:
+        logger.info(f"Startup import time (budget: '{BASELINE_CODE}' + {allowance_ms:.0f} ms, best of {runs})")
+    else:
+        logger.info(f"Startup import time (budget {budget_ms:.0f} ms, best of {runs})")
+    ok = True
+    for command in commands:
+        result = measure_import_time(script, command, runs, baseline=budget_ms is None)
+        heaviest = ", ".join(f"{name} {ms:.0f}" for name, ms in result.heaviest)
+        line = f"{' '.join(command):<12} {result.total_ms:6.1f} ms"
+        if result.baseline_ms is not None:
+            line += f" = baseline {result.baseline_ms:.1f} {result.total_ms - result.baseline_ms:+.1f}"
+        line += f"  ({heaviest})"
+        limit = budget_ms if budget_ms is not None else result.baseline_ms + allowance_ms
+        if result.within(limit):
+            logger.success(line)
+        else:
+            logger.error(f"{line}  over budget")
+            ok = False
+    return ok
@@ -0,0 +1,194 @@
+"""
+Lightweight span tracing with Chrome trace-event export.
+
+Spans are recorded only when tracing is enabled, so instrumented code costs
+a flag check otherwise. Traces open in chrome://tracing or ui.perfetto.dev.
+
+Usage:
+    from libs.tracing import span, traced, tracer
+
+    @traced("discover")
+    def discover_services():
+        ...
+
+    tracer.enable("out.json")
+    with span("pull images", cat="phase", count=12):
+        ...
+    tracer.write()
+    for line in tracer.timings_table():
+        print(line)
+
+Setting INFRA_TRACE=<file> enables tracing in every process that imports
+this module and appends to the same file, so a `stack.py up` followed by
+`deploy.py up` and `deploy.py test` ends up in one trace.
+"""
+
+from __future__ import annotations
+
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+TRACE_ENV = "INFRA_TRACE"
+
+
+class Tracer:
+    """Collects complete ("X") trace events for one process."""
+
+    def __init__(self):
+        self.enabled = False
+        self.output: Optional[Path] = None
+        self.events: List[dict] = []
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._threads: Dict[int, str] = {}
+
+    def enable(self, output=None, append: bool = False) -> None:
+        """Start recording. Without append, an existing output file is replaced."""
+        self.enabled = True
+        if output:
+            self.output = Path(output)
+            if not append:
+                self.output.unlink(missing_ok=True)
+
+    def enable_from_env(self) -> None:
+        """Enable in append mode if INFRA_TRACE is set."""
+        if os.environ.get(TRACE_ENV):
+            self.enable(os.environ[TRACE_ENV], append=True)
+
+    @staticmethod
+    def now() -> float:
+        """Wall-clock timestamp in microseconds (comparable across processes)."""
+        return time.time_ns() / 1000
+
+    def _tid(self) -> int:
+        thread = threading.current_thread()
+        tid = thread.ident or 0
+        if tid not in self._threads:
+            self._threads[tid] = thread.name
+        return tid
+
+    def add(self, name: str, cat: str, start_us: float, dur_us: float, **args) -> None:
+        """Record a span whose timing was measured elsewhere."""
+        if not self.enabled:
+            return
+        event = {
+            "name": name, "cat": cat, "ph": "X",
+            "ts": start_us, "dur": dur_us,
+            "pid": self._pid, "tid": self._tid(),
+        }
+        if args:
+            event["args"] = args
+        with self._lock:
+            self.events.append(event)
+
+    @contextmanager
+    def span(self, name: str, cat: str = "phase", **args) -> Iterator[dict]:
+        """Time the enclosed block. The yielded dict can be filled with more args."""
+        if not self.enabled:
+            yield args
+            return
+        start_us = self.now()
+        start = time.perf_counter()
+        try:
+            yield args
+        finally:
+            self.add(name, cat, start_us, (time.perf_counter() - start) * 1e6, **args)
+
+    def traced(self, name: Optional[str] = None, cat: str = "phase"):
+        """Decorator: run the whole function inside a span."""
+        def decorator(fn):
+            label = name or fn.__name__
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                with self.span(label, cat):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def counter(self, name: str, **values) -> None:
+        """Record counter values (shown as a track in the trace viewer)."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self.events.append({
+                "name": name, "ph": "C", "ts": self.now(),
+                "pid": self._pid, "tid": self._tid(), "args": values,
+            })
+
+    def _metadata(self) -> List[dict]:
+        meta = [{
+            "name": "process_name", "ph": "M", "pid": self._pid, "tid": 0,
+            "args": {"name": f"{Path(sys.argv[0]).name} {' '.join(sys.argv[1:])}".strip()},
+        }]
+        for tid, thread_name in self._threads.items():
+            meta.append({"name": "thread_name", "ph": "M", "pid": self._pid, "tid": tid,
+                         "args": {"name": thread_name}})
+        return meta
+
+    def write(self, output=None) -> Optional[Path]:
+        """Write (or append to) the Chrome trace-event JSON file."""
+        path = Path(output) if output else self.output
+        if not self.enabled or not path:
+            return None
+        events = []
+        if path.exists():
+            try:
+                with open(path, encoding="utf-8") as f:
+                    events = json.load(f).get("traceEvents", [])
+            except (OSError, ValueError, AttributeError):
+                events = []
+        with self._lock:
+            events.extend(self._metadata() + self.events)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        os.replace(tmp, path)
+        return path
+
+    def summary(self) -> List[Tuple[str, str, int, float]]:
+        """(name, cat, calls, total seconds) per span name, slowest first."""
+        totals: Dict[Tuple[str, str], List[float]] = {}
+        with self._lock:
+            for event in self.events:
+                if event["ph"] == "X":
+                    entry = totals.setdefault((event["name"], event["cat"]), [0, 0.0])
+                    entry[0] += 1
+                    entry[1] += event["dur"] / 1e6
+        rows = [(name, cat, int(calls), total) for (name, cat), (calls, total) in totals.items()]
+        return sorted(rows, key=lambda r: r[3], reverse=True)
+
+    def timings_table(self, limit: int = 40) -> List[str]:
+        """Sorted phase table as printable lines."""
+        rows = self.summary()
+        if not rows:
+            return []
+        with self._lock:
+            spans = [e for e in self.events if e["ph"] == "X"]
+        wall = (max(e["ts"] + e["dur"] for e in spans) - min(e["ts"] for e in spans)) / 1e6
+        width = min(max(len(r[0]) for r in rows), 60)
+        lines = [f"{'SPAN':<{width}}  {'CAT':<10} {'CALLS':>5} {'TOTAL':>9} {'WALL%':>6}"]
+        for name, cat, calls, total in rows[:limit]:
+            pct = 100 * total / wall if wall else 0
+            lines.append(f"{name[:width]:<{width}}  {cat:<10} {calls:>5} {total:>8.2f}s {pct:>5.0f}%")
+        if len(rows) > limit:
+            lines.append(f"... {len(rows) - limit} more")
+        lines.append(f"{'wall clock':<{width}}  {'':<10} {'':>5} {wall:>8.2f}s")
+        return lines
+
+
+# Process-wide tracer
+tracer = Tracer()
+tracer.enable_from_env()
+span = tracer.span
+traced = tracer.traced
@@ -6,29 +6,55 @@ Reads stack.yaml and manages startup order with dependency waits.
 Usage:
   python stack.py up              Arranca toda la infra (excluye optional)
   python stack.py up <grupo>      Arranca solo ese grupo
+  python stack.py up --with-optional  Incluye los grupos optional (en cola hasta
+                                  que haya memoria libre)
+  python stack.py up --resume     Continúa el último `up` incompleto
   python stack.py down            Para toda la infra (orden inverso)
   python stack.py down <grupo>    Para solo ese grupo
   python stack.py restart <grupo> Para y arranca un grupo
+  python stack.py restart <grupo> --rolling [--batch-size N] [--only-changed]
+                                  Reinicia de N en N (dependientes primero),
+                                  esperando a que cada lote esté listo
   python stack.py status          Estado de cada grupo
+  python stack.py status --watch  Estado en vivo (eventos de Docker)
   python stack.py list            Lista grupos y servicios con sus deps
   python stack.py deps <servicio> Muestra de que depende un servicio
+  python stack.py plan [grupo]    Camino crítico y ETA previstos según el histórico
+  python stack.py stats [servicio] p50/p95 por servicio de las ejecuciones pasadas
   python stack.py test            Health check solo de servicios desplegados
   python stack.py test <grupo>    Health check de un grupo (solo desplegados)
+                                  [--concurrency N] [--deadline S]
   python stack.py add <path>      Añade un servicio a stack.yaml desde su docker-compose
   python stack.py remove <svc>    Elimina un servicio de stack.yaml
+
+Opciones globales:
+  --trace <fichero>   Guarda una traza Chrome/Perfetto (trace-event JSON)
+  --timings           Muestra una tabla con el tiempo de cada fase
+  --parallel <n>      Operaciones de compose simultáneas (max_parallel, 4)
+  --pull-parallel <n> Descargas de imágenes simultáneas (max_parallel_pulls, 2)
+  --no-mem-check      No comprobar la memoria disponible antes de arrancar
+  --batch             up/down con un solo `docker compose -p stack -f ... -f ...`
+                      por lote de servicios (batch: true en stack.yaml)
 """
 from __future__ import annotations
 
+import contextlib
+import hashlib
 import json
 import os
+import queue
 import re
 import socket
+import sqlite3
 import subprocess
 import sys
 import threading
 import time
 import urllib.request
 import urllib.error
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timezone
 from pathlib import Path
 from typing import Optional
 
@@ -38,8 +64,43 @@ except ImportError:
     print("PyYAML no instalado. Ejecuta: pip install pyyaml")
     sys.exit(1)
 
+try:
+    from libs.docker import DockerError, container_name, get_client
+except ImportError:
+    get_client = None  # sin libs: se usa el CLI de docker
+
+try:
+    from libs.readiness import ContainerProbe, ReadinessCheck, probe_from_config, wait_until_ready
+except ImportError:
+    wait_until_ready = None  # sin libs: espera TCP secuencial
+
+try:
+    from libs.memory import (
+        AdmissionController, MemoryEstimate, PeakStore, compose_limits, estimate_containers,
+        format_size, parse_size, sample_usage,
+    )
+except ImportError:
+    AdmissionController = None  # sin libs: sin control de memoria
+
+try:
+    from libs.httppool import HttpPool
+except ImportError:
+    HttpPool = None  # sin libs: urllib, una conexión por petición
+
+try:
+    from libs.tracing import span, tracer
+except ImportError:
+    tracer = None  # sin libs: sin trazas
+
+    def span(*args, **kwargs):
+        return contextlib.nullcontext({})
+
 
 BASE_DIR = Path(__file__).parent
+FRAGMENTS_DIR = BASE_DIR / ".temp" / "stack"
+TIMINGS_DB = BASE_DIR / "logs" / "stack-timings.db"
+MEMORY_PEAKS = BASE_DIR / "logs" / "memory-peaks.json"
+CHECKPOINT_FILE = FRAGMENTS_DIR / "checkpoint.json"
 
 # -- ANSI colors (off on Windows without TERM set) ----------------------------
 _NO_COLOR = os.environ.get("NO_COLOR") or (
@@ -97,19 +158,126 @@ def tcp_wait(
     label = label or f"{host}:{port}"
     sys.stdout.write(f"  Esperando {C.BOLD}{label}{C.RESET}...")
     sys.stdout.flush()
-    while time.time() < deadline:
-        try:
-            with socket.create_connection((host, port), timeout=2):
-                print(f" {C.GREEN}listo{C.RESET}")
-                return True
-        except (OSError, ConnectionRefusedError):
-            sys.stdout.write(".")
-            sys.stdout.flush()
-            time.sleep(2)
+    with span(f"wait {label}", cat="wait"):
+        while time.time() < deadline:
+            try:
+                with socket.create_connection((host, port), timeout=2):
+                    print(f" {C.GREEN}listo{C.RESET}")
+                    return True
+            except (OSError, ConnectionRefusedError):
+                sys.stdout.write(".")
+                sys.stdout.flush()
+                time.sleep(2)
     print(f" {C.RED}TIMEOUT{C.RESET}")
     return False
 
 
+def wait_conditions_ready(conditions: list, timeout: int = 120) -> list:
+    """Wait for all (label, condition) pairs concurrently. Returns the labels not ready.
+
+    Each condition uses its `probe` (tcp, postgres, redis, mysql, http) and
+    retries with exponential backoff plus jitter under one shared deadline.
+    """
+    if not conditions:
+        return []
+    if wait_until_ready is None:
+        return [
+            label for label, wc in conditions
+            if not tcp_wait(wc["host"], wc["port"], timeout=timeout, label=label)
+        ]
+
+    checks = []
+    for label, wc in conditions:
+        try:
+            checks.append(ReadinessCheck(label, [probe_from_config(wc)]))
+        except (KeyError, ValueError) as e:
+            _warn(f"{label}: condición inválida ({e}) -- se ignora")
+    labels = ", ".join(c.name for c in checks)
+    print(f"  Esperando {C.BOLD}{labels}{C.RESET}...")
+    with span(f"wait {labels}", cat="wait"):
+        results = wait_until_ready(
+            checks, timeout,
+            on_ready=lambda r: print(f"    {C.GREEN}listo{C.RESET} {r.name} {C.DIM}({r.seconds:.1f}s){C.RESET}"),
+        )
+    for r in results:
+        if not r.ready:
+            print(f"    {C.RED}TIMEOUT{C.RESET} {r.name} {C.DIM}({r.detail}){C.RESET}")
+    return [r.name for r in results if not r.ready]
+
+
+# -- Timing store --------------------------------------------------------------
+
+_samples: list = []  # (service, phase, seconds, ok) of the running command
+_samples_lock = threading.Lock()
+
+
+def record_timing(service: str, phase: str, seconds: float, ok: bool = True) -> None:
+    """Remember one duration (phase: pull, up, ready, down) for this run."""
+    with _samples_lock:
+        _samples.append((service, phase, seconds, ok))
+
+
+class TimingStore:
+    """SQLite history of per-service compose and readiness durations."""
+
+    def __init__(self, path: Path = TIMINGS_DB):
+        self.path = path
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path)
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS runs (
+                id INTEGER PRIMARY KEY, started REAL, command TEXT, scope TEXT, elapsed REAL);
+            CREATE TABLE IF NOT EXISTS samples (
+                run_id INTEGER, service TEXT, phase TEXT, seconds REAL, ok INTEGER);
+            CREATE INDEX IF NOT EXISTS samples_service ON samples (service, phase);
+        """)
+        return conn
+
+    def save_run(self, command: str, scope: str, started: float, elapsed: float, samples: list) -> None:
+        with contextlib.closing(self._connect()) as conn, conn:
+            run_id = conn.execute(
+                "INSERT INTO runs (started, command, scope, elapsed) VALUES (?, ?, ?, ?)",
+                (started, command, scope, elapsed),
+            ).lastrowid
+            conn.executemany(
+                "INSERT INTO samples (run_id, service, phase, seconds, ok) VALUES (?, ?, ?, ?, ?)",
+                [(run_id, svc, phase, sec, int(ok)) for svc, phase, sec, ok in samples],
+            )
+
+    def history(self, limit: int = 50) -> dict:
+        """{(service, phase): [seconds, ...]} of successful samples, newest first."""
+        if not self.path.exists():
+            return {}
+        result: dict = {}
+        with contextlib.closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT service, phase, seconds FROM samples WHERE ok = 1 ORDER BY run_id DESC"
+            )
+            for service, phase, seconds in rows:
+                values = result.setdefault((service, phase), [])
+                if len(values) < limit:
+                    values.append(seconds)
+        return result
+
+
+def _percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))]
+
+
+def _save_timings(args: list, started: float) -> None:
+    if not _samples:
+        return
+    try:
+        TimingStore().save_run(args[0], args[1] if len(args) > 1 else "", started,
+                               time.time() - started, list(_samples))
+    except sqlite3.Error as e:
+        _warn(f"No se pudieron guardar los tiempos ({e})")
+
+
 # -- Docker Compose helpers ----------------------------------------------------
 
 def _compose(args: list, path: Path) -> subprocess.CompletedProcess:
@@ -129,7 +297,107 @@ def compose_down(path: Path) -> bool:
     return _compose(["down"], path).returncode == 0
 
 
+def compose_pull(path: Path) -> bool:
+    return _compose(["pull", "--quiet", "--ignore-buildable"], path).returncode == 0
+
+
+def _docker_api():
+    """Cliente de la API de Docker, o None para usar el CLI."""
+    return get_client() if get_client else None
+
+
+def missing_images(path: Path) -> list:
+    """Images of a compose project that are not present locally."""
+    r = _compose(["config", "--images"], path)
+    return _absent_images(r.stdout.split()) if r.returncode == 0 else []
+
+
+def _absent_images(images: list) -> list:
+    client = _docker_api()
+    missing = []
+    for image in sorted(set(images)):
+        if client:
+            try:
+                client.inspect_image(image)
+                continue
+            except DockerError:
+                pass
+        elif subprocess.run(["docker", "image", "inspect", image], capture_output=True).returncode == 0:
+            continue
+        missing.append(image)
+    return missing
+
+
+# -- Worker pool ---------------------------------------------------------------
+
+DEFAULT_MAX_PARALLEL = 4
+DEFAULT_MAX_PARALLEL_PULLS = 2
+
+
+class WorkerPool:
+    """Executor compartido para las operaciones de compose.
+
+    Como mucho `max_parallel` operaciones contra el daemon (up/down) y
+    `max_parallel_pulls` descargas de imágenes a la vez; cada grupo puede
+    fijar su propio `max_parallel`, más bajo.
+    """
+
+    def __init__(self, max_parallel: int, max_pulls: int, group_limits: Optional[dict] = None):
+        self.max_parallel = max(1, max_parallel)
+        self.max_pulls = max(1, max_pulls)
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.max_parallel + self.max_pulls, thread_name_prefix="stack",
+        )
+        self._daemon = threading.BoundedSemaphore(self.max_parallel)
+        self._pulls = threading.BoundedSemaphore(self.max_pulls)
+        self._groups = {
+            name: threading.BoundedSemaphore(max(1, int(limit)))
+            for name, limit in (group_limits or {}).items()
+        }
+
+    @classmethod
+    def from_stack(cls, stack: dict) -> "WorkerPool":
+        groups = stack.get("groups", {})
+        return cls(
+            int(stack.get("max_parallel", DEFAULT_MAX_PARALLEL)),
+            int(stack.get("max_parallel_pulls", DEFAULT_MAX_PARALLEL_PULLS)),
+            {n: g["max_parallel"] for n, g in groups.items() if g.get("max_parallel")},
+        )
+
+    def submit(self, fn, *args):
+        return self.executor.submit(fn, *args)
+
+    @contextlib.contextmanager
+    def slot(self, group: Optional[str] = None, pull: bool = False):
+        """Reserve a group slot (if limited) and then a daemon or pull slot."""
+        with self._groups.get(group) or contextlib.nullcontext():
+            with self._pulls if pull else self._daemon:
+                yield
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=True)
+
+
 def compose_ps(path: Path) -> list:
+    client = _docker_api()
+    if client:
+        label = f"com.docker.compose.project.working_dir={path.resolve()}"
+        try:
+            result = []
+            for c in client.containers(filters={"label": label}):
+                labels = c.get("Labels") or {}
+                result.append({
+                    "ID": c.get("Id", "")[:12],
+                    "Name": container_name(c),
+                    "Service": labels.get("com.docker.compose.service", ""),
+                    "Project": labels.get("com.docker.compose.project", ""),
+                    "Image": c.get("Image", ""),
+                    "State": c.get("State", ""),
+                    "Status": c.get("Status", ""),
+                })
+            return result
+        except DockerError:
+            pass
     r = _compose(["ps", "--format", "json"], path)
     if r.returncode != 0 or not r.stdout.strip():
         return []
@@ -143,6 +411,12 @@ def compose_ps(path: Path) -> list:
 
 
 def get_running_containers() -> set:
+    client = _docker_api()
+    if client:
+        try:
+            return {container_name(c) for c in client.containers()}
+        except DockerError:
+            pass
     r = subprocess.run(
         ["docker", "ps", "--format", "{{.Names}}"],
         capture_output=True,
@@ -153,74 +427,651 @@ def get_running_containers() -> set:
     return set(r.stdout.strip().splitlines())
 
 
-# -- Dependency resolution -----------------------------------------------------
+# -- Batched compose (one project, many -f) ------------------------------------
+
+DEFAULT_BATCH_PROJECT = "stack"
+COMPOSE_FILENAMES = ("compose.yaml", "compose.yml", "docker-compose.yml", "docker-compose.yaml")
+
+
+def _find_compose_file(path: Path) -> Optional[Path]:
+    return next((path / n for n in COMPOSE_FILENAMES if (path / n).exists()), None)
+
+
+def _absolute(value: str, base: Path) -> str:
+    if value == "." or value.startswith("./") or value.startswith("../"):
+        return str((base / value).resolve())
+    return value
+
+
+def normalize_fragment(compose: dict, base: Path) -> dict:
+    """Make a module's compose file independent of its directory.
+
+    Relative bind mounts, build contexts, env_file and config/secret files are
+    made absolute so the fragment can be merged with others via repeated -f.
+    """
+    compose.pop("name", None)
+    for svc in (compose.get("services") or {}).values():
+        volumes = []
+        for vol in svc.get("volumes") or []:
+            if isinstance(vol, str) and ":" in vol:
+                source, rest = vol.split(":", 1)
+                vol = f"{_absolute(source, base)}:{rest}"
+            elif isinstance(vol, dict) and vol.get("type") == "bind" and "source" in vol:
+                vol["source"] = _absolute(vol["source"], base)
+            volumes.append(vol)
+        if volumes:
+            svc["volumes"] = volumes
+        build = svc.get("build")
+        if isinstance(build, str):
+            svc["build"] = _absolute(build, base)
+        elif isinstance(build, dict) and "context" in build:
+            build["context"] = _absolute(build["context"], base)
+        env_file = svc.get("env_file")
+        if isinstance(env_file, str):
+            svc["env_file"] = _absolute(env_file, base)
+        elif isinstance(env_file, list):
+            svc["env_file"] = [
+                _absolute(e, base) if isinstance(e, str) else {**e, "path": _absolute(e["path"], base)}
+                for e in env_file
+            ]
+    for section in ("configs", "secrets"):
+        for item in (compose.get(section) or {}).values():
+            if isinstance(item, dict) and "file" in item:
+                item["file"] = _absolute(item["file"], base)
+    return compose
+
+
+# ${VAR}, ${VAR:-default}, $VAR -- but not the $$ escape
+_COMPOSE_VARIABLE = re.compile(r"(?<!\$)\$\{?([A-Za-z_][A-Za-z0-9_]*)")
+
+
+def read_env_file(path: Path) -> dict:
+    """KEY=VALUE pairs of a compose .env file (comments and blanks skipped)."""
+    env = {}
+    for line in path.read_text(encoding="utf-8", errors="replace").splitlines():
+        line = line.strip()
+        if not line or line.startswith("#") or "=" not in line:
+            continue
+        key, _, value = line.removeprefix("export ").partition("=")
+        value = value.strip()
+        if len(value) >= 2 and value[0] == value[-1] and value[0] in "'\"":
+            value = value[1:-1]
+        env[key.strip()] = value
+    return env
+
+
+def load_fragment(path: Path) -> Optional[tuple]:
+    """(fragment file, compose service names, interpolated variables) for a module.
+
+    The normalized fragment is cached by the content hash of the compose file
+    and BASE_DIR (it holds absolute paths, so a moved checkout gets new ones).
+    """
+    compose_file = _find_compose_file(path)
+    if compose_file is None:
+        return None
+    data = compose_file.read_bytes()
+    slug = path.relative_to(BASE_DIR).as_posix().replace("/", "__")
+    key = hashlib.sha256(str(BASE_DIR).encode() + b"\0" + data).hexdigest()
+    fragment_file = FRAGMENTS_DIR / f"{slug}.{key[:16]}.yml"
+    if fragment_file.exists():
+        compose = yaml.safe_load(fragment_file.read_text(encoding="utf-8")) or {}
+    else:
+        compose = normalize_fragment(yaml.safe_load(data) or {}, path.resolve())
+        FRAGMENTS_DIR.mkdir(parents=True, exist_ok=True)
+        for stale in FRAGMENTS_DIR.glob(f"{slug}.*.yml"):
+            stale.unlink(missing_ok=True)
+        fragment_file.write_text(yaml.safe_dump(compose, sort_keys=False), encoding="utf-8")
+    variables = set(_COMPOSE_VARIABLE.findall(data.decode("utf-8", errors="replace")))
+    return fragment_file, sorted(compose.get("services") or {}), variables
+
+
+def _parse_ps(stdout: str) -> list:
+    """`compose ps --format json`: a JSON array (older Compose) or one object per line."""
+    stdout = stdout.strip()
+    if stdout.startswith("["):
+        try:
+            return json.loads(stdout)
+        except json.JSONDecodeError:
+            return []
+    rows = []
+    for line in stdout.splitlines():
+        try:
+            rows.append(json.loads(line))
+        except json.JSONDecodeError:
+            pass
+    return rows
+
+
+class ComposeBatch:
+    """Run many module compose files as one `docker compose -p <project>` call.
+
+    Every batchable service contributes a normalized fragment (see
+    normalize_fragment) plus its .env, and one `up -d`/`down` covers all of
+    them. Per-service results come from the project's `ps`. A module keeps
+    its own `docker compose` call when:
+    - its compose service names clash with another module's;
+    - its compose file interpolates a variable that another module's .env
+      sets to a different value (the merged --env-file would change it);
+    - its group sets `max_parallel` below the number of its services, since
+      one batched call would start them all at once.
+    """
+
+    def __init__(self, project: str, selected: dict, group_limits: Optional[dict] = None):
+        self.project = project
+        self.fragments: dict = {}
+        owners: dict = {}
+        variables: dict = {}
+        envs: dict = {}
+        for name, (_, cfg) in selected.items():
+            path = BASE_DIR / cfg["path"]
+            loaded = load_fragment(path) if path.exists() else None
+            if loaded is None:
+                continue
+            env_file = path / ".env"
+            self.fragments[name] = (loaded[0], loaded[1], env_file if env_file.exists() else None)
+            variables[name] = loaded[2]
+            envs[name] = read_env_file(env_file) if env_file.exists() else {}
+            for svc in loaded[1]:
+                owners.setdefault(svc, set()).add(name)
+        excluded: set = set()
+        for svc, names in owners.items():
+            if len(names) > 1:
+                _warn(f"Servicio compose '{svc}' repetido en {', '.join(sorted(names))} -- sin batch")
+                excluded.update(names)
+        for name in sorted(self.fragments):
+            for other in sorted(self.fragments):
+                clash = sorted(v for v in variables[name] & set(envs[other])
+                               if envs[other][v] != envs[name].get(v))
+                if other != name and clash:
+                    _warn(f"{other}/.env cambia {', '.join(clash)} de {name} -- sin batch")
+                    excluded.update((name, other))
+        for name in excluded:
+            self.fragments.pop(name, None)
+        for group, limit in (group_limits or {}).items():
+            members = [n for n, (g, _) in selected.items() if g == group]
+            batched = [n for n in members if n in self.fragments]
+            # A batched call holds no group slot: only safe if it is the group's only call
+            if batched and (len(members) > int(limit) or len(batched) < len(members)):
+                _info(f"[{group}] max_parallel {limit} -- sin batch")
+                for name in batched:
+                    self.fragments.pop(name)
+
+    @classmethod
+    def from_stack(cls, stack: dict, selected: dict) -> Optional["ComposeBatch"]:
+        if not stack.get("batch"):
+            return None
+        groups = stack.get("groups", {})
+        limits = {n: g["max_parallel"] for n, g in groups.items() if g.get("max_parallel")}
+        return cls(stack.get("batch_project", DEFAULT_BATCH_PROJECT), selected, limits)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.fragments
+
+    def _compose(self, args: list, names: list) -> subprocess.CompletedProcess:
+        cmd = ["docker", "compose", "-p", self.project]
+        for name in names:
+            fragment_file, _, env_file = self.fragments[name]
+            cmd += ["-f", str(fragment_file)]
+            if env_file:
+                cmd += ["--env-file", str(env_file)]
+        with span(f"compose {args[0]} x{len(names)}", cat="compose", services=names):
+            return subprocess.run(cmd + args, cwd=BASE_DIR, capture_output=True, text=True)
+
+    def _states(self, names: list) -> dict:
+        r = self._compose(["ps", "--all", "--format", "json"], names)
+        return {row.get("Service"): row for row in _parse_ps(r.stdout)} if r.returncode == 0 else {}
+
+    def up(self, names: list, pool: WorkerPool) -> dict:
+        """`up -d` all names at once. Returns {name: started}."""
+        r = self._compose(["config", "--images"], names)
+        if r.returncode == 0 and _absent_images(r.stdout.split()):
+            with pool.slot(pull=True):
+                t0 = time.monotonic()
+                self._compose(["pull", "--quiet", "--ignore-buildable"], names)
+            for name in names:
+                record_timing(name, "pull", time.monotonic() - t0)
+        with pool.slot():
+            t0 = time.monotonic()
+            self._compose(["up", "-d"], names)
+        seconds = time.monotonic() - t0
+        states = self._states(names)
+
+        def _started(row: Optional[dict]) -> bool:
+            if not row:
+                return False
+            return row.get("State") == "running" or (row.get("State") == "exited" and row.get("ExitCode") == 0)
+
+        result = {n: all(_started(states.get(svc)) for svc in self.fragments[n][1]) for n in names}
+        for name, ok in result.items():
+            record_timing(name, "up", seconds, ok)
+        return result
+
+    def down(self, names: list, pool: WorkerPool) -> dict:
+        """`down` all names at once. Returns {name: stopped}."""
+        with pool.slot():
+            t0 = time.monotonic()
+            r = self._compose(["down"], names)
+        seconds = time.monotonic() - t0
+        states = self._states(names) if r.returncode != 0 else {}
+        result = {n: not any(svc in states for svc in self.fragments[n][1]) for n in names}
+        for name, ok in result.items():
+            record_timing(name, "down", seconds, ok)
+        return result
+
+
+# -- Memory admission ----------------------------------------------------------
+
+DEFAULT_OPTIONAL_WAIT = 600
+# How often `status --watch` samples container memory into MEMORY_PEAKS
+PEAK_SAMPLE_INTERVAL = 60
+
+
+class MemoryGate:
+    """Admission control for one `up`, from /proc/meminfo.
+
+    Required services are counted against the free memory as they start;
+    services of `optional` groups are queued until there is headroom (at
+    most `optional_wait` seconds). Estimates: `mem_limit` of the service in
+    stack.yaml, else mem_limit/deploy limits in its compose file, else the
+    peak seen by `docker stats`, else a default per container.
+    """
+
+    def __init__(self, controller, estimates: dict, optional: set, wait: float):
+        self.controller = controller
+        self.estimates = estimates
+        self.optional = optional
+        self.wait = wait
+        # Still to be started by required services: optional ones must leave it free
+        self.outstanding = sum(e.bytes for n, e in estimates.items() if n not in optional)
+
+    @classmethod
+    def from_stack(cls, stack: dict, selected: dict, running: set) -> Optional["MemoryGate"]:
+        if AdmissionController is None or not stack.get("mem_check", True):
+            return None
+        controller = AdmissionController(parse_size(stack.get("memory_reserve", "512m")))
+        if controller.available() is None:
+            return None  # no /proc/meminfo
+        groups = stack.get("groups", {})
+        peaks = PeakStore(MEMORY_PEAKS).load()
+        estimates = {}
+        for name, (group, cfg) in selected.items():
+            pending = [c for c in cfg.get("containers", [f"{name}-infra"]) if c not in running]
+            if not pending:
+                continue  # already running: its memory is not available anyway
+            if cfg.get("mem_limit"):
+                estimates[name] = MemoryEstimate(parse_size(cfg["mem_limit"]) or 0, "stack.yaml")
+                continue
+            compose_file = _find_compose_file(BASE_DIR / cfg["path"])
+            try:
+                limits = compose_limits(yaml.safe_load(compose_file.read_text(encoding="utf-8")) or {})
+            except (AttributeError, OSError, yaml.YAMLError):
+                limits = {}
+            estimates[name] = estimate_containers(pending, peaks, limits)
+        optional = {n for n, (group, _) in selected.items() if groups[group].get("optional")}
+        # Explicitly starting an optional group makes it the required part
+        if optional == set(selected):
+            optional = set()
+        return cls(controller, estimates, optional, float(stack.get("optional_wait", DEFAULT_OPTIONAL_WAIT)))
+
+    def required(self) -> list:
+        return [(n, e) for n, e in self.estimates.items() if n not in self.optional]
+
+    def fits(self) -> bool:
+        """Whether the required services can ever fit in the free memory."""
+        return self.controller.fits(self.required())
+
+    def table(self) -> list:
+        return self.controller.budget_table(self.required())
+
+    def is_optional(self, name: str) -> bool:
+        return name in self.optional and name in self.estimates
+
+    def admit_required(self, name: str) -> None:
+        if name not in self.estimates:
+            return
+        need = self.estimates[name].bytes
+        self.outstanding -= need
+        if not self.controller.try_admit(need):
+            _warn(f"{name}: necesita ~{format_size(need)} y la memoria libre no llega -- arrancando igualmente")
+            self.controller.admit(need)
+
+    def wait_optional(self, name: str) -> bool:
+        need = self.estimates[name].bytes
+        if self.controller.try_admit(need, self.outstanding):
+            return True
+        free = max(0, (self.controller.headroom() or 0) - self.outstanding)
+        _info(f"{name} en cola: necesita ~{format_size(need)}, libres {format_size(free)}")
+        with span(f"memory wait {name}", cat="wait"):
+            return self.controller.wait_admit(need, self.wait, keep=lambda: self.outstanding)
 
-def _needed_waits(group_cfg: dict, wait_conditions: dict) -> list:
-    """Return list of (label, condition) the group needs before starting."""
-    seen: dict = {}
-    for svc_cfg in group_cfg.get("services", {}).values():
-        for key in svc_cfg.get("wait_for", []):
-            if key in wait_conditions and key not in seen:
-                seen[key] = wait_conditions[key]
-    return list(seen.items())
 
+def record_memory_peaks(selected: dict) -> None:
+    """Sample `docker stats` of the selected containers into the peak store.
 
-# -- Group start / stop --------------------------------------------------------
+    The store keeps the highest value seen. Right after `up` a container is
+    far from its working set, so `status --watch` samples again periodically.
+    """
+    if AdmissionController is None:
+        return
+    running = get_running_containers()
+    containers = [c for name, (_, cfg) in selected.items()
+                  for c in cfg.get("containers", [f"{name}-infra"]) if c in running]
+    if containers:
+        PeakStore(MEMORY_PEAKS).update(sample_usage(containers))
 
-def _start_group(
-    group_name: str,
-    group_cfg: dict,
-    wait_conditions: dict,
-) -> bool:
-    services = group_cfg.get("services", {})
-    if not services:
-        return True
 
-    desc = group_cfg.get("description", "")
-    print(f"\n{C.BOLD}[{group_name}]{C.RESET}  {C.DIM}{desc}{C.RESET}")
+# -- Checkpoint / skip unchanged -----------------------------------------------
 
-    # 1. Wait for TCP conditions
-    for label, wc in _needed_waits(group_cfg, wait_conditions):
-        ok = tcp_wait(wc["host"], wc["port"], label=label)
-        if not ok:
-            _warn(f"No se pudo alcanzar {label} -- continuando de todos modos")
+def _live_containers() -> dict:
+    """{container: {state, health, service, hash}} for every container, running or not."""
+    client = _docker_api()
+    if client:
+        try:
+            live = {}
+            for c in client.containers(all=True):
+                labels = c.get("Labels") or {}
+                status = c.get("Status", "")
+                live[container_name(c)] = {
+                    "state": c.get("State", ""),
+                    "health": re.search(r"\((healthy|unhealthy|health: starting)\)", status),
+                    "service": labels.get("com.docker.compose.service", ""),
+                    "hash": labels.get("com.docker.compose.config-hash", ""),
+                }
+            for info in live.values():
+                info["health"] = info["health"].group(1) if info["health"] else ""
+            return live
+        except DockerError:
+            pass
+    fmt = "\t".join([
+        "{{.Names}}", "{{.State}}", "{{.Status}}",
+        '{{.Label "com.docker.compose.service"}}',
+        '{{.Label "com.docker.compose.config-hash"}}',
+    ])
+    r = subprocess.run(["docker", "ps", "-a", "--format", fmt], capture_output=True, text=True)
+    live = {}
+    for line in r.stdout.splitlines():
+        parts = line.split("\t")
+        if len(parts) == 5:
+            health = re.search(r"\((healthy|unhealthy|health: starting)\)", parts[2])
+            live[parts[0]] = {"state": parts[1], "health": health.group(1) if health else "",
+                              "service": parts[3], "hash": parts[4]}
+    return live
+
+
+def _config_digest(path: Path) -> Optional[str]:
+    """sha256 of what `docker compose` reads in a module: compose file and .env."""
+    compose_file = _find_compose_file(path)
+    if compose_file is None:
+        return None
+    digest = hashlib.sha256(compose_file.read_bytes())
+    env_file = path / ".env"
+    if env_file.exists():
+        digest.update(env_file.read_bytes())
+    return digest.hexdigest()
+
+
+def _desired_hashes(path: Path) -> Optional[dict]:
+    """Config hash Compose would stamp on each service of a module."""
+    r = _compose(["config", "--hash", "*"], path)
+    if r.returncode != 0:
+        return None
+    return dict(line.split() for line in r.stdout.splitlines() if len(line.split()) == 2)
+
+
+class Checkpoint:
+    """Progress of the last `up`, plus cached config hashes, in .temp/stack/.
+
+    services: {name: {"digest", "hashes", "done"}}. The digest covers the
+    module's compose file and .env, so cached hashes (and, with --resume,
+    completed services) are only trusted while those files are unchanged.
+    """
+
+    def __init__(self, path: Path = CHECKPOINT_FILE):
+        self.path = path
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            data = {}
+        self.scope = data.get("scope")
+        self.services: dict = data.get("services", {})
+
+    def start(self, scope: str, resume: bool) -> None:
+        """Begin a run; without resume (or for another scope) progress is reset."""
+        if not resume or scope != self.scope:
+            for entry in self.services.values():
+                entry["done"] = False
+        self.scope = scope
+        self.save()
+
+    def completed(self, name: str, digest: Optional[str]) -> bool:
+        entry = self.services.get(name, {})
+        return bool(entry.get("done")) and digest is not None and entry.get("digest") == digest
+
+    def hashes(self, name: str, digest: Optional[str], path: Path) -> Optional[dict]:
+        entry = self.services.get(name, {})
+        if digest and entry.get("digest") == digest and entry.get("hashes"):
+            return entry["hashes"]
+        hashes = _desired_hashes(path)
+        if hashes is not None and digest:
+            self.services[name] = {"digest": digest, "hashes": hashes, "done": False}
+        return hashes
+
+    def mark(self, name: str, ok: bool) -> None:
+        self.services.setdefault(name, {})["done"] = ok
+        self.save()
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"scope": self.scope, "services": self.services}, indent=1),
+                       encoding="utf-8")
+        tmp.replace(self.path)
+
+
+def unchanged_services(selected: dict, checkpoint: Checkpoint, resume: bool) -> set:
+    """Services that need no `docker compose up`.
+
+    Every container must be running and not (yet) unhealthy, and carry the
+    config-hash label Compose would stamp now. With resume, a service
+    completed in the checkpoint only needs its containers running.
+    """
+    live = _live_containers()
+    candidates = {}
+    for name, (_, cfg) in selected.items():
+        containers = cfg.get("containers", [f"{name}-infra"])
+        if all(live.get(c, {}).get("state") == "running" and live[c]["health"] in ("", "healthy")
+               for c in containers):
+            candidates[name] = containers
+
+    def _matches(name: str) -> bool:
+        path = BASE_DIR / selected[name][1]["path"]
+        digest = _config_digest(path) if path.exists() else None
+        if resume and checkpoint.completed(name, digest):
+            return True
+        hashes = checkpoint.hashes(name, digest, path)
+        return bool(hashes) and all(
+            hashes.get(live[c]["service"]) == live[c]["hash"] for c in candidates[name]
+        )
 
-    # 2. Start all services in parallel
-    results: list = []
-    lock = threading.Lock()
+    # `compose config --hash` is one process per module: resolve them in parallel
+    with ThreadPoolExecutor(max_workers=8, thread_name_prefix="hash") as executor:
+        matches = dict(zip(candidates, executor.map(_matches, candidates)))
+    return {name for name, ok in matches.items() if ok}
 
-    def _up(name: str, cfg: dict) -> None:
-        path = BASE_DIR / cfg["path"]
-        if not path.exists():
-            with lock:
-                results.append((name, False))
-                _warn(f"{name}: ruta no existe ({path})")
-            return
-        success = compose_up(path)
-        with lock:
-            results.append((name, success))
-
-    threads = [
-        threading.Thread(target=_up, args=(n, c))
-        for n, c in services.items()
-    ]
-    for t in threads:
-        t.start()
-    for t in threads:
-        t.join()
-
-    # 3. Report results
-    all_ok = True
-    for name, success in sorted(results):
-        if success:
-            _ok(name)
+
+# -- Service start (DAG) / group stop ------------------------------------------
+
+def _start_service(name: str, cfg: dict, group: str, pool: WorkerPool) -> bool:
+    path = BASE_DIR / cfg["path"]
+    if not path.exists():
+        _warn(f"{name}: ruta no existe ({path})")
+        return False
+    # Pulls are bandwidth-bound: they get their own, smaller limit
+    if missing_images(path):
+        with pool.slot(group, pull=True), span(f"pull {name}", cat="pull"):
+            t0 = time.monotonic()
+            ok = compose_pull(path)
+        record_timing(name, "pull", time.monotonic() - t0, ok)
+    with pool.slot(group), span(f"up {name}", cat="compose"):
+        t0 = time.monotonic()
+        ok = compose_up(path)
+    record_timing(name, "up", time.monotonic() - t0, ok)
+    return ok
+
+
+def _collect_services(groups: dict, target_group: Optional[str] = None,
+                      include_optional: bool = False) -> dict:
+    """{service: (group, cfg)} for one group, or for every non-optional group."""
+    selected = {}
+    for group_name, group_cfg in _sorted_groups(groups):
+        if target_group and group_name != target_group:
+            continue
+        if not target_group and not include_optional and group_cfg.get("optional"):
+            continue
+        for name, cfg in (group_cfg.get("services") or {}).items():
+            selected[name] = (group_name, cfg or {})
+    return selected
+
+
+def _start_dag(selected: dict, groups: dict, wait_conditions: dict, pool: WorkerPool,
+               batch: Optional[ComposeBatch] = None, memory: Optional[MemoryGate] = None,
+               unchanged: frozenset = frozenset(), on_done=None) -> list:
+    """Start services as soon as their own prerequisites are satisfied.
+
+    A service needs every key in its `wait_for`. A key is satisfied once all
+    selected services that `provide` it have been started and, if it is a
+    wait condition, its probe passes. Keys nobody selected provides only wait
+    for the probe. Among startable services, lower group `order` goes first.
+    With a batch, the batchable services that become startable together
+    share one `docker compose up`. With a memory gate, optional services
+    first wait for headroom. Services in `unchanged` are counted as started
+    without touching them, and conditions only they provide are not probed.
+    on_done(name, ok) is called as each service finishes. Returns the
+    services that failed to start.
+    """
+    needs = {
+        name: set(cfg.get("wait_for", [])) - set(cfg.get("provides", []))
+        for name, (_, cfg) in selected.items()
+    }
+    providers: dict = {}
+    for name, (_, cfg) in selected.items():
+        for key in cfg.get("provides", []):
+            providers.setdefault(key, set()).add(name)
+    provided_by = {key: set(names) for key, names in providers.items()}
+    finished_at: dict = {}
+
+    satisfied: set = set()
+    events: queue.Queue = queue.Queue()
+    running = 0
+    failed: list = []
+    started_at = time.monotonic()
+
+    def _launch(tag: tuple, fn, *args) -> None:
+        nonlocal running
+        running += 1
+
+        def _run() -> None:
+            result = False
+            try:
+                result = fn(*args)
+            finally:
+                events.put((tag, result))
+
+        if tag[0] in ("service", "batch"):
+            pool.submit(_run)
         else:
-            _err(name)
-            all_ok = False
-    return all_ok
+            # Probing is cheap and must not hold a compose slot
+            threading.Thread(target=_run, daemon=True).start()
+
+    def _key_ready(key: str) -> None:
+        started_by = provided_by.get(key)
+        if key in wait_conditions and not (started_by and started_by <= unchanged):
+            _launch(("key", key), wait_conditions_ready, [(key, wait_conditions[key])])
+        else:
+            satisfied.add(key)
+
+    for key in sorted(set().union(*needs.values()) if needs else set()):
+        if not providers.get(key):
+            if key not in wait_conditions:
+                _warn(f"Condición '{key}' sin definir ni proveedor -- se ignora")
+            _key_ready(key)
+
+    def _finished(name: str, ok: bool) -> None:
+        finished_at[name] = time.monotonic()
+        elapsed = finished_at[name] - started_at
+        group = selected[name][0]
+        if on_done:
+            on_done(name, ok)
+        if name in unchanged:
+            _ok(f"{name} {C.DIM}[{group}] sin cambios{C.RESET}")
+        elif ok:
+            _ok(f"{name} {C.DIM}[{group}] {elapsed:.1f}s{C.RESET}")
+        else:
+            _err(f"{name} {C.DIM}[{group}]{C.RESET}")
+            failed.append(name)
+        for key in selected[name][1].get("provides", []):
+            providers[key].discard(name)
+            if not providers[key]:
+                _key_ready(key)
+
+    pending = set(selected)
+    while pending or running:
+        startable = sorted(
+            (n for n in pending if needs[n] <= satisfied),
+            key=lambda n: (groups[selected[n][0]].get("order", 99), n),
+        )
+        skipped = [n for n in startable if n in unchanged]
+        if skipped:
+            pending.difference_update(skipped)
+            for name in skipped:
+                _finished(name, True)
+            continue
+        if memory:
+            for name in [n for n in startable if memory.is_optional(n)]:
+                startable.remove(name)
+                pending.discard(name)
+                _launch(("admit", name), memory.wait_optional, name)
+            for name in startable:
+                memory.admit_required(name)
+        batched = [n for n in startable if batch and n in batch]
+        if batched:
+            pending.difference_update(batched)
+            _launch(("batch", tuple(batched)), batch.up, batched, pool)
+        for name in startable:
+            if name in batched:
+                continue
+            pending.discard(name)
+            _launch(("service", name), _start_service, name, selected[name][1], selected[name][0], pool)
+        if not running:
+            _err(f"Dependencias circulares entre: {', '.join(sorted(pending))}")
+            return failed + sorted(pending)
+
+        (kind, item), result = events.get()
+        running -= 1
+        if kind == "admit":
+            if result:
+                _launch(("service", item), _start_service, item, selected[item][1], selected[item][0], pool)
+            else:
+                _warn(f"{item}: sin memoria libre tras {memory.wait:.0f}s -- no se arranca")
+                _finished(item, False)
+            continue
+        if kind == "key":
+            if result:
+                _warn(f"No se pudo alcanzar {item} -- continuando de todos modos")
+            # Readiness latency: from `up` returning to the probe passing
+            for name in provided_by.get(item, ()):
+                if name in finished_at:
+                    record_timing(name, "ready", time.monotonic() - finished_at[name], not result)
+            satisfied.add(item)
+            continue
+        outcomes = (result or {}) if kind == "batch" else {item: result}
+        for name in (item if kind == "batch" else (item,)):
+            _finished(name, outcomes.get(name, False))
+    return failed
 
 
-def _stop_group(group_name: str, group_cfg: dict) -> bool:
+def _stop_group(group_name: str, group_cfg: dict, pool: WorkerPool,
+                batch: Optional[ComposeBatch] = None) -> bool:
     services = group_cfg.get("services", {})
     if not services:
         return True
@@ -228,27 +1079,22 @@ def _stop_group(group_name: str, group_cfg: dict) -> bool:
     desc = group_cfg.get("description", "")
     print(f"\n{C.BOLD}[{group_name}]{C.RESET}  {C.DIM}{desc}{C.RESET}")
 
-    results: list = []
-    lock = threading.Lock()
-
-    def _down(name: str, cfg: dict) -> None:
+    def _down(name: str, cfg: dict) -> bool:
         path = BASE_DIR / cfg["path"]
         if not path.exists():
-            with lock:
-                results.append((name, False))
-            return
-        success = compose_down(path)
-        with lock:
-            results.append((name, success))
-
-    threads = [
-        threading.Thread(target=_down, args=(n, c))
-        for n, c in services.items()
-    ]
-    for t in threads:
-        t.start()
-    for t in threads:
-        t.join()
+            return False
+        with pool.slot(group_name), span(f"down {name}", cat="compose"):
+            t0 = time.monotonic()
+            ok = compose_down(path)
+        record_timing(name, "down", time.monotonic() - t0, ok)
+        return ok
+
+    batched = [n for n in services if batch and n in batch]
+    batch_future = pool.submit(batch.down, batched, pool) if batched else None
+    futures = {name: pool.submit(_down, name, cfg) for name, cfg in services.items() if name not in batched}
+    results = [(name, future.result()) for name, future in futures.items()]
+    if batch_future:
+        results += list(batch_future.result().items())
 
     all_ok = True
     for name, success in sorted(results):
@@ -278,11 +1124,16 @@ def _run_tiers(groups: dict, fn, reverse: bool = False) -> None:
     def _flush(t: list) -> None:
         if not t:
             return
-        ts = [threading.Thread(target=fn, args=(n, c)) for n, c in t]
-        for x in ts:
-            x.start()
-        for x in ts:
-            x.join()
+        ts = [threading.Thread(target=_traced, args=(n, c)) for n, c in t]
+        with span(f"tier {current_order}", cat="tier", groups=[n for n, _ in t]):
+            for x in ts:
+                x.start()
+            for x in ts:
+                x.join()
+
+    def _traced(name: str, cfg: dict) -> None:
+        with span(f"group {name}", cat="group"):
+            fn(name, cfg)
 
     for name, cfg in _sorted_groups(groups, reverse=reverse):
         order = cfg.get("order", 99)
@@ -297,23 +1148,49 @@ def _run_tiers(groups: dict, fn, reverse: bool = False) -> None:
 
 # -- Commands ------------------------------------------------------------------
 
-def cmd_up(stack: dict, target_group: Optional[str] = None) -> None:
+def cmd_up(stack: dict, target_group: Optional[str] = None, include_optional: bool = False,
+           resume: bool = False) -> None:
     wait_conditions = stack.get("wait_conditions", {})
     groups = stack.get("groups", {})
 
-    if target_group:
-        if target_group not in groups:
-            _err(f"Grupo '{target_group}' no encontrado en stack.yaml")
-            sys.exit(1)
-        _start_group(target_group, groups[target_group], wait_conditions)
-        return
+    if target_group and target_group not in groups:
+        _err(f"Grupo '{target_group}' no encontrado en stack.yaml")
+        sys.exit(1)
 
-    def _start(name: str, cfg: dict) -> None:
-        if not cfg.get("optional"):
-            _start_group(name, cfg, wait_conditions)
+    selected = _collect_services(groups, target_group, include_optional)
+    memory = MemoryGate.from_stack(stack, selected, get_running_containers())
+    if memory and not memory.fits():
+        _err("Los servicios no caben en la memoria disponible:")
+        for line in memory.table():
+            print(f"  {line}")
+        _info("Arranca menos grupos o usa --no-mem-check para arrancar igualmente")
+        sys.exit(1)
 
-    _run_tiers(groups, _start)
-    print(f"\n{C.GREEN}{C.BOLD}Stack arrancado.{C.RESET}")
+    scope = f"[{target_group}]" if target_group else "stack"
+    checkpoint = Checkpoint()
+    if resume and checkpoint.scope != f"{scope}{'+optional' if include_optional else ''}":
+        _info("No hay un `up` previo con este alcance: arranque completo")
+    checkpoint.start(f"{scope}{'+optional' if include_optional else ''}", resume)
+    with span("unchanged check", cat="phase"):
+        unchanged = unchanged_services(selected, checkpoint, resume)
+    checkpoint.save()
+
+    print(f"\n{C.BOLD}Arrancando {scope}{C.RESET}  {C.DIM}{len(selected)} servicios, "
+          f"{len(unchanged)} sin cambios{C.RESET}")
+    pool = WorkerPool.from_stack(stack)
+    batch = ComposeBatch.from_stack(stack, selected)
+    try:
+        failed = _start_dag(selected, groups, wait_conditions, pool, batch, memory,
+                            frozenset(unchanged), checkpoint.mark)
+    finally:
+        pool.shutdown()
+    record_memory_peaks(selected)
+
+    if failed:
+        print(f"\n{C.YELLOW}{C.BOLD}Fallaron: {', '.join(sorted(failed))}{C.RESET}")
+        _info("Corrige y reanuda con: python stack.py up --resume" + (f" {target_group}" if target_group else ""))
+    elif not target_group:
+        print(f"\n{C.GREEN}{C.BOLD}Stack arrancado.{C.RESET}")
 
 
 def cmd_down(stack: dict, target_group: Optional[str] = None) -> None:
@@ -323,13 +1200,142 @@ def cmd_down(stack: dict, target_group: Optional[str] = None) -> None:
         if target_group not in groups:
             _err(f"Grupo '{target_group}' no encontrado en stack.yaml")
             sys.exit(1)
-        _stop_group(target_group, groups[target_group])
+        pool = WorkerPool.from_stack(stack)
+        batch = ComposeBatch.from_stack(stack, _collect_services(groups, target_group))
+        try:
+            _stop_group(target_group, groups[target_group], pool, batch)
+        finally:
+            pool.shutdown()
         return
 
-    _run_tiers(groups, _stop_group, reverse=True)
+    pool = WorkerPool.from_stack(stack)
+    everything = {}
+    for group_name in groups:
+        everything.update(_collect_services(groups, group_name))
+    batch = ComposeBatch.from_stack(stack, everything)
+    try:
+        _run_tiers(groups, lambda name, cfg: _stop_group(name, cfg, pool, batch), reverse=True)
+    finally:
+        pool.shutdown()
     print(f"\n{C.GREEN}{C.BOLD}Stack detenido.{C.RESET}")
 
 
+def _rolling_levels(selected: dict) -> list:
+    """Services grouped by start level (wait_for/provides); dependencies first."""
+    providers: dict = {}
+    for name, (_, cfg) in selected.items():
+        for key in cfg.get("provides", []):
+            providers.setdefault(key, set()).add(name)
+    deps = {
+        name: {p for key in cfg.get("wait_for", []) for p in providers.get(key, ()) if p != name}
+        for name, (_, cfg) in selected.items()
+    }
+    levels, placed = [], set()
+    while len(placed) < len(deps):
+        level = sorted(n for n in deps if n not in placed and deps[n] <= placed)
+        if not level:  # cycle: restart the rest together
+            level = sorted(set(deps) - placed)
+        levels.append(level)
+        placed.update(level)
+    return levels
+
+
+def _changed_services(selected: dict) -> set:
+    """Services with a container missing or whose config-hash label is stale."""
+    live = _live_containers()
+    checkpoint = Checkpoint()
+    changed = set()
+    for name, (_, cfg) in selected.items():
+        path = BASE_DIR / cfg["path"]
+        containers = cfg.get("containers", [f"{name}-infra"])
+        if any(c not in live for c in containers):
+            changed.add(name)
+            continue
+        hashes = checkpoint.hashes(name, _config_digest(path), path) or {}
+        if any(hashes.get(live[c]["service"]) != live[c]["hash"] for c in containers):
+            changed.add(name)
+    checkpoint.save()
+    return changed
+
+
+def _wait_restarted(names: list, selected: dict, wait_conditions: dict, timeout: float) -> list:
+    """Wait until the containers of each service (and conditions it provides) are ready."""
+    if wait_until_ready is None:
+        keys = [(k, wait_conditions[k]) for n in names for k in selected[n][1].get("provides", [])
+                if k in wait_conditions]
+        return wait_conditions_ready(keys, timeout)
+    checks = []
+    for name in names:
+        cfg = selected[name][1]
+        probes = [ContainerProbe(c) for c in cfg.get("containers", [f"{name}-infra"])]
+        probes += [probe_from_config(wait_conditions[k]) for k in cfg.get("provides", []) if k in wait_conditions]
+        checks.append(ReadinessCheck(name, probes))
+    results = wait_until_ready(checks, timeout)
+    for r in results:
+        if r.ready:
+            record_timing(r.name, "ready", r.seconds)
+            _ok(f"{r.name} listo {C.DIM}({r.seconds:.1f}s){C.RESET}")
+        else:
+            _err(f"{r.name} no está listo {C.DIM}({r.detail}){C.RESET}")
+    return [r.name for r in results if not r.ready]
+
+
+def cmd_restart_rolling(stack: dict, target_group: str, batch_size: int = 1,
+                        only_changed: bool = False, timeout: float = 180) -> None:
+    """Restart a group a few services at a time, dependents before what they wait for.
+
+    Each batch is down+up'd and must be ready before the next one goes down;
+    the restart stops at the first batch that does not come back.
+    """
+    groups = stack.get("groups", {})
+    if target_group not in groups:
+        _err(f"Grupo '{target_group}' no encontrado en stack.yaml")
+        sys.exit(1)
+    selected = _collect_services(groups, target_group)
+    levels = _rolling_levels(selected)
+    if only_changed:
+        changed = _changed_services(selected)
+        levels = [[n for n in level if n in changed] for level in levels]
+        if not changed:
+            _ok(f"[{target_group}] sin cambios: nada que reiniciar")
+            return
+    batches = [level[i:i + batch_size] for level in reversed(levels) for i in range(0, len(level), batch_size)]
+    total = sum(len(b) for b in batches)
+    print(f"\n{C.BOLD}Reinicio escalonado [{target_group}]{C.RESET}  "
+          f"{C.DIM}{total} servicios, lotes de {batch_size}{C.RESET}")
+
+    wait_conditions = stack.get("wait_conditions", {})
+    pool = WorkerPool.from_stack(stack)
+
+    def _restart(name: str) -> bool:
+        path = BASE_DIR / selected[name][1]["path"]
+        with pool.slot(target_group), span(f"restart {name}", cat="compose"):
+            t0 = time.monotonic()
+            down_ok = compose_down(path)
+            record_timing(name, "down", time.monotonic() - t0, down_ok)
+            t0 = time.monotonic()
+            up_ok = compose_up(path)
+            record_timing(name, "up", time.monotonic() - t0, up_ok)
+        return down_ok and up_ok
+
+    try:
+        for i, batch in enumerate(batches, 1):
+            print(f"\n{C.BLUE}-- Lote {i}/{len(batches)}{C.RESET}  {', '.join(batch)}")
+            results = dict(zip(batch, pool.executor.map(_restart, batch)))
+            failed = [n for n, ok in results.items() if not ok]
+            with span(f"rolling wait {i}", cat="wait", services=batch):
+                failed += _wait_restarted([n for n in batch if results[n]], selected, wait_conditions, timeout)
+            if failed:
+                rest = [n for b in batches[i:] for n in b]
+                _err(f"Reinicio detenido: {', '.join(failed)} no ha vuelto")
+                if rest:
+                    _info(f"Sin reiniciar: {', '.join(rest)}")
+                sys.exit(1)
+    finally:
+        pool.shutdown()
+    print(f"\n{C.GREEN}{C.BOLD}[{target_group}] reiniciado.{C.RESET}")
+
+
 def cmd_restart(stack: dict, target_group: str) -> None:
     cmd_down(stack, target_group)
     cmd_up(stack, target_group)
@@ -395,6 +1401,224 @@ def cmd_status(stack: dict) -> None:
     )
 
 
+# -- Status watch --------------------------------------------------------------
+
+WATCH_EVENTS = ["create", "start", "restart", "die", "oom", "stop", "destroy", "health_status"]
+RESTART_LOOP = (3, 60)  # >= 3 restarts within 60 s
+
+
+def _parse_docker_time(value: str) -> Optional[float]:
+    """Docker RFC 3339 timestamp (nanosecond precision) to epoch seconds."""
+    if not value or value.startswith("0001-"):
+        return None
+    try:
+        return datetime.fromisoformat(value[:19]).replace(tzinfo=timezone.utc).timestamp()
+    except ValueError:
+        return None
+
+
+def _format_uptime(seconds: float) -> str:
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    if seconds < 86400:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    return f"{seconds // 86400}d{seconds % 86400 // 3600:02d}h"
+
+
+def _inspect_states(names: list) -> dict:
+    """{container: State dict + RestartCount} for the containers that exist."""
+    client = _docker_api()
+    states = {}
+    if client:
+        for name in names:
+            try:
+                info = client.inspect_container(name)
+            except DockerError:
+                continue
+            states[name] = {**info.get("State", {}), "RestartCount": info.get("RestartCount", 0)}
+        return states
+    r = subprocess.run(["docker", "inspect", *names], capture_output=True, text=True)
+    try:
+        for info in json.loads(r.stdout or "[]"):
+            states[info["Name"].lstrip("/")] = {**info.get("State", {}), "RestartCount": info.get("RestartCount", 0)}
+    except (ValueError, KeyError):
+        pass
+    return states
+
+
+def _stream_events(events: queue.Queue, since: float) -> None:
+    """Push container events to the queue; None when the stream ends."""
+    client = _docker_api()
+    if client:
+        try:
+            for event in client.events(since=since, filters={"type": ["container"], "event": WATCH_EVENTS}):
+                events.put(event)
+        except DockerError:
+            pass
+        events.put(None)
+        return
+    cmd = ["docker", "events", "--since", str(int(since)), "--format", "{{json .}}",
+           "--filter", "type=container"]
+    cmd += [arg for e in WATCH_EVENTS for arg in ("--filter", f"event={e}")]
+    try:
+        with subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True) as proc:
+            for line in proc.stdout:
+                try:
+                    events.put(json.loads(line))
+                except ValueError:
+                    pass
+    except OSError:
+        pass
+    events.put(None)
+
+
+class StatusTable:
+    """Per-container state kept up to date from Docker events."""
+
+    def __init__(self, groups: dict, since: float = 0.0):
+        self.since = since  # resubscribe from here: time of the last event applied
+        self._seen: set = set()  # events applied during second `since`
+        self.rows: list = []  # (group, service, container)
+        for group_name, group_cfg in _sorted_groups(groups):
+            for svc_name, svc_cfg in (group_cfg.get("services") or {}).items():
+                for container in svc_cfg.get("containers", [f"{svc_name}-infra"]):
+                    self.rows.append((group_name, svc_name, container))
+        self.state = {c: {"status": "-"} for _, _, c in self.rows}
+
+    def load(self, states: dict) -> None:
+        for name, st in states.items():
+            if name not in self.state:
+                continue
+            self.state[name] = {
+                "status": st.get("Status", "-"),
+                "health": (st.get("Health") or {}).get("Status", ""),
+                "restarts": st.get("RestartCount", 0),
+                "started": _parse_docker_time(st.get("StartedAt", "")),
+                "exit_code": st.get("ExitCode") if st.get("Status") == "exited" else None,
+                "dies": deque(maxlen=RESTART_LOOP[0]),
+            }
+
+    def apply(self, event: dict) -> None:
+        """Update the container of `event`; an event already applied is ignored.
+
+        Events carry whole seconds in "time", so resubscribing from `since`
+        replays that second: events are keyed by time, id and action.
+        """
+        key = (event.get("timeNano") or event.get("time"), event.get("id"), event.get("Action") or event.get("status"))
+        if key in self._seen:
+            return
+        second = event.get("time") or 0
+        if second > self.since:
+            self.since, self._seen = second, set()
+        self._seen.add(key)
+        attrs = (event.get("Actor") or {}).get("Attributes") or {}
+        name = attrs.get("name", "")
+        if name not in self.state:
+            return
+        st = self.state[name]
+        st.setdefault("dies", deque(maxlen=RESTART_LOOP[0]))
+        when = event.get("timeNano", 0) / 1e9 or event.get("time") or time.time()
+        action = event.get("Action") or event.get("status", "")
+        if action == "start":
+            if st.get("status") in ("exited", "dead", "restarting"):
+                st["restarts"] = st.get("restarts", 0) + 1
+            st.update(status="running", started=when, health="starting" if st.get("health") else "")
+        elif action == "die":
+            st.update(status="exited", started=None, exit_code=int(attrs.get("exitCode", 0)))
+            st["dies"].append(when)
+        elif action == "oom":
+            st["oom"] = True
+        elif action.startswith("health_status"):
+            st["health"] = action.split(":", 1)[1].strip()
+        elif action == "create":
+            st.update(status="created", restarts=0, exit_code=None)
+        elif action == "destroy":
+            self.state[name] = {"status": "-"}
+
+    def looping(self, name: str, now: float) -> bool:
+        dies = self.state[name].get("dies") or ()
+        return len(dies) >= RESTART_LOOP[0] and now - dies[0] <= RESTART_LOOP[1]
+
+    def render(self, index: int, now: float, uptime: bool = True) -> str:
+        group, service, container = self.rows[index]
+        st = self.state[container]
+        status = st.get("status", "-")
+        health = st.get("health") or ""
+        started = st.get("started")
+        uptime = _format_uptime(now - started) if uptime and status == "running" and started else ""
+        exit_code = st.get("exit_code")
+        exit_text = "" if exit_code is None else str(exit_code) + (" oom" if st.get("oom") else "")
+        if self.looping(container, now):
+            color, status = C.RED, "bucle"
+        elif status == "running" and health in ("", "healthy"):
+            color = C.GREEN
+        elif status == "running" or (status == "exited" and exit_code == 0):
+            color = C.YELLOW
+        elif status == "-":
+            color = C.DIM
+        else:
+            color = C.RED
+        return (
+            f"  {group:<12} {service:<16} {container:<28} {color}{status:<10}{C.RESET}"
+            f" {health:<10} {st.get('restarts', 0) if status != '-' else '':>3} {uptime:>8} {exit_text:>6}"
+        )
+
+
+def cmd_status_watch(stack: dict) -> None:
+    """Live status: one snapshot, then incremental updates from the events stream."""
+    table = StatusTable(stack.get("groups", {}), since=time.time())
+    events: queue.Queue = queue.Queue()
+    threading.Thread(target=_stream_events, args=(events, table.since), daemon=True).start()
+    table.load(_inspect_states([c for _, _, c in table.rows]))
+
+    # Redraw rows in place on a terminal; print changes as lines otherwise
+    in_place = sys.stdout.isatty() and not _NO_COLOR
+    now = time.time()
+    shown = [table.render(i, now, in_place) for i in range(len(table.rows))]
+    print(f"\n{C.BOLD}  {'GRUPO':<12} {'SERVICIO':<16} {'CONTENEDOR':<28} {'ESTADO':<10} "
+          f"{'SALUD':<10} {'RST':>3} {'UPTIME':>8} {'EXIT':>6}{C.RESET}")
+    for line in shown:
+        print(line)
+    print(f"{C.DIM}  Ctrl+C para salir{C.RESET}")
+    total = len(shown) + 1
+    everything = _collect_services(stack.get("groups", {}), include_optional=True)
+    next_sample = time.monotonic() + PEAK_SAMPLE_INTERVAL
+
+    try:
+        while True:
+            try:
+                event = events.get(timeout=1)
+            except queue.Empty:
+                event = False
+            if event is None:
+                # Stream closed (daemon restart?): resubscribe from where we were,
+                # the replayed events are skipped by table.apply()
+                time.sleep(2)
+                threading.Thread(target=_stream_events, args=(events, table.since), daemon=True).start()
+            elif event:
+                table.apply(event)
+            if time.monotonic() >= next_sample:
+                next_sample = time.monotonic() + PEAK_SAMPLE_INTERVAL
+                threading.Thread(target=record_memory_peaks, args=(everything,), daemon=True).start()
+            now = time.time()
+            for i in range(len(shown)):
+                line = table.render(i, now, in_place)
+                if line == shown[i]:
+                    continue
+                shown[i] = line
+                if in_place:
+                    up = total - i
+                    sys.stdout.write(f"\033[{up}A\r\033[2K{line}\033[{up}B\r")
+                else:
+                    print(f"{time.strftime('%H:%M:%S')} {line.strip()}")
+            sys.stdout.flush()
+    except KeyboardInterrupt:
+        print()
+
+
 def cmd_list(stack: dict) -> None:
     wait_conditions = stack.get("wait_conditions", {})
     groups = stack.get("groups", {})
@@ -476,6 +1700,125 @@ def cmd_deps(stack: dict, service_name: str) -> None:
     sys.exit(1)
 
 
+# -- Plan / stats (timing history) ---------------------------------------------
+
+DEFAULT_UP_ESTIMATE = 10.0  # seconds, for services without history
+
+
+def _predict(selected: dict, estimates: dict) -> tuple:
+    """Simulate the DAG start with unlimited parallelism.
+
+    estimates: {service: (up seconds, ready seconds)}. Returns
+    ({service: finish time incl. readiness}, {service: critical predecessor}).
+    """
+    providers: dict = {}
+    for name, (_, cfg) in selected.items():
+        for key in cfg.get("provides", []):
+            providers.setdefault(key, []).append(name)
+    done: dict = {}
+    pred: dict = {}
+
+    def _done(name: str, visiting: frozenset) -> float:
+        if name in done:
+            return done[name]
+        cfg = selected[name][1]
+        start, before = 0.0, None
+        for key in set(cfg.get("wait_for", [])) - set(cfg.get("provides", [])):
+            for provider in providers.get(key, []):
+                if provider in visiting:
+                    continue  # cycle: `up` reports it, the plan ignores the edge
+                t = _done(provider, visiting | {name})
+                if t > start:
+                    start, before = t, provider
+        up, ready = estimates[name]
+        done[name], pred[name] = start + up + ready, before
+        return done[name]
+
+    for name in selected:
+        _done(name, frozenset({name}))
+    return done, pred
+
+
+def cmd_plan(stack: dict, target_group: Optional[str] = None) -> None:
+    """Predicted critical path, ETA and bottlenecks from the timing history."""
+    groups = stack.get("groups", {})
+    if target_group and target_group not in groups:
+        _err(f"Grupo '{target_group}' no encontrado en stack.yaml")
+        sys.exit(1)
+    selected = _collect_services(groups, target_group)
+    if not selected:
+        _warn("No hay servicios que planificar")
+        return
+    history = TimingStore().history()
+    estimates = {}
+    known = 0
+    for name in selected:
+        ups = history.get((name, "up"))
+        readies = history.get((name, "ready"))
+        known += bool(ups)
+        estimates[name] = (
+            _percentile(ups, 50) if ups else DEFAULT_UP_ESTIMATE,
+            _percentile(readies, 50) if readies else 0.0,
+        )
+
+    done, pred = _predict(selected, estimates)
+    last = max(done, key=done.get)
+    eta = done[last]
+    path = []
+    while last:
+        path.append(last)
+        last = pred[last]
+
+    scope = f"[{target_group}]" if target_group else "stack"
+    print(f"\n{C.BOLD}Plan {scope}{C.RESET}  "
+          f"{C.DIM}{len(selected)} servicios, {known} con histórico (p50){C.RESET}")
+    print(f"\n{C.BOLD}Camino crítico{C.RESET}")
+    for name in reversed(path):
+        up, ready = estimates[name]
+        begin = done[name] - up - ready
+        guess = "" if history.get((name, "up")) else f"  {C.YELLOW}sin histórico{C.RESET}"
+        detail = f"up {up:.1f}s" + (f" + ready {ready:.1f}s" if ready else "")
+        print(f"  {begin:6.1f}s -> {done[name]:6.1f}s  {name:<18} {C.DIM}{detail}{C.RESET}{guess}")
+    print(f"\n{C.BOLD}ETA: {eta:.1f}s{C.RESET}  {C.DIM}(sin límite de max_parallel){C.RESET}")
+
+    # Bottleneck = how much the ETA would drop if the service were instant
+    savings = []
+    for name in selected:
+        trial = dict(estimates, **{name: (0.0, 0.0)})
+        saved = eta - max(_predict(selected, trial)[0].values())
+        if saved > 0:
+            savings.append((saved, name))
+    if savings:
+        print(f"\n{C.BOLD}Cuellos de botella{C.RESET}  {C.DIM}(ahorro si arrancara al instante){C.RESET}")
+        for saved, name in sorted(savings, reverse=True)[:5]:
+            print(f"  {name:<18} {saved:6.1f}s")
+
+
+def cmd_stats(stack: dict, service_name: Optional[str] = None) -> None:
+    """p50/p95 per service and phase; the last run is flagged when 20% above the earlier p95."""
+    history = TimingStore().history()
+    if service_name:
+        history = {k: v for k, v in history.items() if k[0] == service_name}
+    if not history:
+        _warn(f"Sin histórico de tiempos en {TIMINGS_DB.relative_to(BASE_DIR)} -- ejecuta `up` primero")
+        return
+
+    order = {name: i for i, name in enumerate(_collect_services(stack.get("groups", {})))}
+    phases = {"pull": 0, "up": 1, "ready": 2, "down": 3}
+    print(f"\n{C.BOLD}  {'SERVICIO':<18} {'FASE':<6} {'N':>4} {'P50':>8} {'P95':>8} {'ÚLTIMO':>8}{C.RESET}")
+    for (service, phase), values in sorted(
+        history.items(), key=lambda kv: (order.get(kv[0][0], len(order)), kv[0][0], phases.get(kv[0][1], 9)),
+    ):
+        last, previous = values[0], values[1:]
+        line = (f"  {service:<18} {phase:<6} {len(values):>4} {_percentile(values, 50):>7.1f}s"
+                f" {_percentile(values, 95):>7.1f}s {last:>7.1f}s")
+        # Regression: clearly above what earlier runs (at least 4) ever took
+        if len(previous) >= 4 and last > 1.2 * _percentile(previous, 95):
+            print(f"{C.YELLOW}{line}  > p95 anterior{C.RESET}")
+        else:
+            print(line)
+
+
 # -- HTTP test -----------------------------------------------------------------
 
 # Traefik port used in this setup
@@ -484,7 +1827,7 @@ _TRAEFIK_DOMAIN = "127.0.0.1.traefik.me"
 
 
 def _http_check(url: str, timeout: int = 5) -> tuple:
-    """Return (status_code, ms) or (-1, ms) on connection error."""
+    """Return (status_code, ms) or (-1, ms) on connection error. Follows redirects."""
     t0 = time.time()
     try:
         req = urllib.request.Request(url, method="HEAD")
@@ -505,98 +1848,119 @@ def _tcp_check(host: str, port: int, timeout: int = 3) -> bool:
         return False
 
 
-def cmd_test(stack: dict, target_group: Optional[str] = None) -> None:
-    """Health check solo de servicios que tienen contenedores corriendo."""
+TEST_CONCURRENCY = 16
+TEST_DEADLINE = 60
+
+
+def _run_check(check: dict, pool, deadline_at: float) -> tuple:
+    """(ok, detail, ms) for one tcp or http check; never runs past deadline_at.
+
+    HTTP checks follow redirects (pooled or through urllib) and judge the
+    final response.
+    """
+    t0 = time.perf_counter()
+    timeout = deadline_at - time.monotonic()
+    if timeout <= 0:
+        return False, "plazo agotado", None
+    if check["kind"] == "tcp":
+        ok = _tcp_check(check["host"], check["port"], timeout=min(3, timeout))
+        ms = int((time.perf_counter() - t0) * 1000)
+        return ok, f"tcp:{check['port']}" if ok else f"tcp:{check['port']} unreachable", ms
+    url = check["url"]
+    if pool:
+        result = pool.request(url, timeout=min(5, timeout), follow_redirects=True, total_timeout=min(5, timeout))
+        code, ms = result.status, int(result.ms)
+    else:
+        code, ms = _http_check(url, timeout=max(1, int(min(5, timeout))))
+    if code == -1:
+        return False, "no responde", ms
+    return code < 400, str(code), ms
+
+
+def cmd_test(stack: dict, target_group: Optional[str] = None,
+             concurrency: int = TEST_CONCURRENCY, deadline: float = TEST_DEADLINE) -> None:
+    """Health check solo de servicios que tienen contenedores corriendo.
+
+    Los checks corren en paralelo (como mucho `concurrency`) bajo un plazo
+    global; los HTTP comparten conexiones keep-alive por dirección (cada
+    `traefik_url` va a su propio esquema, host y puerto).
+    """
     groups = stack.get("groups", {})
     wait_conditions = stack.get("wait_conditions", {})
     running = get_running_containers()
 
-    passed = failed = 0
     print(f"\n{C.BOLD}Health Check{C.RESET}  "
           f"{C.DIM}(solo servicios desplegados){C.RESET}")
     print("=" * 60)
 
+    checks: list = []  # in group order, as printed
     for group_name, group_cfg in _sorted_groups(groups):
         if target_group and group_name != target_group:
             continue
-        services = group_cfg.get("services", {})
-        if not services:
-            continue
-
-        group_lines = []
-
-        for svc_name, svc_cfg in services.items():
+        for svc_name, svc_cfg in (group_cfg.get("services") or {}).items():
             expected = svc_cfg.get("containers", [f"{svc_name}-infra"])
             if not any(c in running for c in expected):
                 continue  # no desplegado, omitir
-
-            # TCP-only services (databases): check TCP port
+            check = {"group": group_name, "service": svc_name}
             if svc_cfg.get("skip_http"):
-                # find wait_condition port for this service or use provides
-                provides = svc_cfg.get("provides", [])
-                wc = None
-                for key in provides:
-                    if key in wait_conditions:
-                        wc = wait_conditions[key]
-                        break
+                # TCP-only services (databases): port of the condition they provide
+                wc = next((wait_conditions[k] for k in svc_cfg.get("provides", []) if k in wait_conditions), None)
                 if wc:
-                    ok = _tcp_check(wc["host"], wc["port"])
-                    if ok:
-                        group_lines.append(
-                            f"  {C.GREEN}OK{C.RESET} {svc_name}"
-                            f"  {C.DIM}tcp:{wc['port']}{C.RESET}"
-                        )
-                        passed += 1
-                    else:
-                        group_lines.append(
-                            f"  {C.RED}KO{C.RESET} {svc_name}"
-                            f"  {C.RED}tcp:{wc['port']} unreachable{C.RESET}"
-                        )
-                        failed += 1
+                    check.update(kind="tcp", host=wc["host"], port=wc["port"])
                 else:
-                    group_lines.append(
-                        f"  {C.GREEN}OK{C.RESET} {svc_name}"
-                        f"  {C.DIM}running (tcp-only){C.RESET}"
-                    )
-                    passed += 1
-                continue
-
-            # HTTP check via Traefik
-            traefik_url = svc_cfg.get(
-                "traefik_url",
-                f"http://{svc_name}.{_TRAEFIK_DOMAIN}:{_TRAEFIK_PORT}",
-            )
-            code, ms = _http_check(traefik_url)
-
-            if code == -1:
-                group_lines.append(
-                    f"  {C.RED}KO{C.RESET} {svc_name}"
-                    f"  {C.RED}no responde{C.RESET}"
-                    f"  {C.DIM}{traefik_url}{C.RESET}"
-                )
-                failed += 1
-            elif code < 400:
-                group_lines.append(
-                    f"  {C.GREEN}OK{C.RESET} {svc_name}"
-                    f"  {C.DIM}{code} ({ms}ms){C.RESET}"
-                )
-                passed += 1
+                    check.update(kind="running")
             else:
-                group_lines.append(
-                    f"  {C.RED}KO{C.RESET} {svc_name}"
-                    f"  {C.RED}{code}{C.RESET} ({ms}ms)"
-                    f"  {C.DIM}{traefik_url}{C.RESET}"
-                )
-                failed += 1
+                check.update(kind="http", url=svc_cfg.get(
+                    "traefik_url",
+                    f"http://{svc_name}.{_TRAEFIK_DOMAIN}:{_TRAEFIK_PORT}",
+                ))
+            checks.append(check)
+
+    started = time.perf_counter()
+    deadline_at = time.monotonic() + deadline
+    pool = HttpPool(concurrency) if HttpPool else None
+    executor = ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="check")
+    futures = {}
+    for i, check in enumerate(checks):
+        if check["kind"] != "running":
+            futures[i] = executor.submit(_run_check, check, pool, deadline_at)
+    with span("health checks", cat="test", checks=len(futures)):
+        wait(futures.values(), timeout=deadline)
+    # Running checks end by deadline_at on their own: let them finish before closing the pool
+    executor.shutdown(wait=True, cancel_futures=True)
+    if pool:
+        pool.close()
 
-        if group_lines:
-            print(f"\n{C.BOLD}[{group_name}]{C.RESET}")
-            for line in group_lines:
-                print(line)
+    passed = failed = 0
+    current_group = None
+    for i, check in enumerate(checks):
+        if check["group"] != current_group:
+            current_group = check["group"]
+            print(f"\n{C.BOLD}[{current_group}]{C.RESET}")
+        name = check["service"]
+        if check["kind"] == "running":
+            print(f"  {C.GREEN}OK{C.RESET} {name}  {C.DIM}running (tcp-only){C.RESET}")
+            passed += 1
+            continue
+        future = futures[i]
+        if future.cancelled():
+            ok, detail, ms = False, f"sin respuesta en {deadline:g}s", None
+        else:
+            ok, detail, ms = future.result()
+        latency = f" ({ms}ms)" if ms is not None else ""
+        target = f"  {C.DIM}{check['url']}{C.RESET}" if check["kind"] == "http" and not ok else ""
+        if ok:
+            print(f"  {C.GREEN}OK{C.RESET} {name}  {C.DIM}{detail}{latency}{C.RESET}")
+            passed += 1
+        else:
+            print(f"  {C.RED}KO{C.RESET} {name}  {C.RED}{detail}{C.RESET}{latency}{target}")
+            failed += 1
 
+    elapsed = time.perf_counter() - started
     print("\n" + "=" * 60)
     color = C.GREEN if failed == 0 else C.RED
-    print(f"{color}{C.BOLD}Passed: {passed}  Failed: {failed}{C.RESET}\n")
+    print(f"{color}{C.BOLD}Passed: {passed}  Failed: {failed}{C.RESET}"
+          f"  {C.DIM}{elapsed:.1f}s{C.RESET}\n")
 
 
 # -- Add service ---------------------------------------------------------------
@@ -832,26 +2196,97 @@ def cmd_remove(stack: dict, service_name: str) -> None:
 
 # -- Main ----------------------------------------------------------------------
 
+def _pop_option(args: list, name: str, has_value: bool = False):
+    """Remove a global option from args. Returns its value, True, or None."""
+    if name not in args:
+        return None
+    i = args.index(name)
+    if not has_value:
+        del args[i]
+        return True
+    if i + 1 >= len(args):
+        _err(f"{name} requiere un valor")
+        sys.exit(1)
+    value = args[i + 1]
+    del args[i:i + 2]
+    return value
+
+
 def main() -> None:
     args = sys.argv[1:]
+    trace_file = _pop_option(args, "--trace", has_value=True)
+    timings = _pop_option(args, "--timings")
+    parallel = _pop_option(args, "--parallel", has_value=True)
+    pull_parallel = _pop_option(args, "--pull-parallel", has_value=True)
+    batch = _pop_option(args, "--batch")
     if not args:
         print(__doc__)
         sys.exit(0)
 
+    if tracer and (trace_file or timings):
+        tracer.enable(trace_file)
+
+    started = time.time()
+    try:
+        with span(f"stack.py {args[0]}", cat="command"):
+            _dispatch(args, parallel, pull_parallel, batch)
+    finally:
+        _save_timings(args, started)
+        if tracer and tracer.enabled:
+            if tracer.write():
+                _info(f"Traza guardada en {tracer.output}")
+            if timings:
+                print()
+                for line in tracer.timings_table():
+                    print(f"  {line}")
+
+
+def _dispatch(args: list, parallel: Optional[str] = None, pull_parallel: Optional[str] = None,
+              batch: bool = False) -> None:
     stack = load_stack()
     cmd = args[0]
+    if batch:
+        stack["batch"] = True
+    for key, flag, value in (("max_parallel", "--parallel", parallel),
+                             ("max_parallel_pulls", "--pull-parallel", pull_parallel)):
+        if value is not None:
+            if not value.isdigit() or int(value) < 1:
+                _err(f"{flag} requiere un entero >= 1")
+                sys.exit(1)
+            stack[key] = int(value)
+
+    if _pop_option(args, "--no-mem-check"):
+        stack["mem_check"] = False
 
     if cmd == "up":
-        cmd_up(stack, args[1] if len(args) > 1 else None)
+        include_optional = bool(_pop_option(args, "--with-optional"))
+        resume = bool(_pop_option(args, "--resume"))
+        cmd_up(stack, args[1] if len(args) > 1 else None, include_optional, resume)
     elif cmd == "down":
         cmd_down(stack, args[1] if len(args) > 1 else None)
     elif cmd == "restart":
+        rolling = _pop_option(args, "--rolling")
+        batch_size = _pop_option(args, "--batch-size", has_value=True)
+        only_changed = bool(_pop_option(args, "--only-changed"))
         if len(args) < 2:
             _err("restart requiere un grupo. Ej: python stack.py restart data")
             sys.exit(1)
-        cmd_restart(stack, args[1])
+        if not rolling and (batch_size is not None or only_changed):
+            _err("--batch-size y --only-changed solo valen con --rolling")
+            sys.exit(1)
+        if rolling:
+            batch_size = batch_size or "1"
+            if not batch_size.isdigit() or int(batch_size) < 1:
+                _err("--batch-size requiere un entero >= 1")
+                sys.exit(1)
+            cmd_restart_rolling(stack, args[1], int(batch_size), only_changed)
+        else:
+            cmd_restart(stack, args[1])
     elif cmd == "status":
-        cmd_status(stack)
+        if "--watch" in args[1:]:
+            cmd_status_watch(stack)
+        else:
+            cmd_status(stack)
     elif cmd == "list":
         cmd_list(stack)
     elif cmd == "deps":
@@ -859,8 +2294,20 @@ def main() -> None:
             _err("deps requiere un servicio. Ej: python stack.py deps backstage")
             sys.exit(1)
         cmd_deps(stack, args[1])
+    elif cmd == "plan":
+        cmd_plan(stack, args[1] if len(args) > 1 else None)
+    elif cmd == "stats":
+        cmd_stats(stack, args[1] if len(args) > 1 else None)
     elif cmd == "test":
-        cmd_test(stack, args[1] if len(args) > 1 else None)
+        concurrency = _pop_option(args, "--concurrency", has_value=True)
+        deadline = _pop_option(args, "--deadline", has_value=True)
+        try:
+            concurrency = int(concurrency or TEST_CONCURRENCY)
+            deadline = float(deadline or TEST_DEADLINE)
+        except ValueError:
+            _err("--concurrency y --deadline requieren un número")
+            sys.exit(1)
+        cmd_test(stack, args[1] if len(args) > 1 else None, concurrency, deadline)
     elif cmd == "add":
         if len(args) < 2:
             _err("add requiere un path. Ej: python stack.py add modules/data/superset")
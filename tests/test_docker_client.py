@@ -0,0 +1,203 @@
+"""DockerClient against a fake Docker daemon on a unix socket.
+
+Run: python -m unittest discover tests
+"""
+
+import asyncio
+import json
+import os
+import socketserver
+import struct
+import sys
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, str(Path(__file__).parent.parent.resolve()))
+
+from libs.docker import AsyncDockerClient, DockerClient, DockerError, image_rows, network_row, ps_row, volume_row
+
+CONTAINER = {
+    "Id": "0123456789abcdef0123", "Names": ["/web-1"], "Image": "nginx:latest", "Command": "nginx",
+    "State": "running", "Status": "Up 2 minutes", "Labels": {"com.docker.compose.project": "infra"},
+    "Ports": [{"IP": "0.0.0.0", "PrivatePort": 80, "PublicPort": 8080, "Type": "tcp"}],
+}
+IMAGE = {
+    "Id": "sha256:fedcba9876543210ffff", "RepoTags": ["nginx:latest", "registry:5000/web/nginx:1.27"],
+    "RepoDigests": ["nginx@sha256:aaaa"], "Created": 1700000000, "Size": 187400000,
+}
+NETWORK = {"Id": "abcdef0123456789", "Name": "infra", "Driver": "bridge", "Scope": "local",
+           "EnableIPv6": False, "Internal": False, "Labels": {}}
+VOLUME = {"Name": "pgdata", "Driver": "local", "Scope": "local",
+          "Mountpoint": "/var/lib/docker/volumes/pgdata/_data", "Labels": {"keep": "1"}}
+
+
+def _frame(stream: int, data: bytes) -> bytes:
+    return struct.pack(">BxxxI", stream, len(data)) + data
+
+
+class FakeDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Answers a few Engine API endpoints over HTTP/1.1 keep-alive."""
+
+    daemon_threads = True
+
+    def __init__(self, path: str):
+        self.connections = 0
+        self.requests = []
+        self.drop_next = False  # close the connection after the next response, without notice
+        super().__init__(path, FakeHandler)
+
+
+class FakeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def address_string(self):
+        return "fake"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str = "application/json") -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        if self.server.drop_next:
+            self.server.drop_next = False
+            self.close_connection = True
+
+    def _json(self, data, status: int = 200) -> None:
+        self._send(status, json.dumps(data).encode())
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        self.server.requests.append((self.command, url.path, query))
+        if url.path == "/_ping":
+            self._send(200, b"OK", "text/plain")
+        elif url.path == "/containers/json":
+            self._json([CONTAINER] if "all" in query or "filters" in query else [])
+        elif url.path == "/containers/web-1/logs":
+            self._send(200, _frame(1, b"out line\n") + _frame(2, b"err line\n"), "application/octet-stream")
+        elif url.path == "/images/json":
+            self._json([IMAGE])
+        elif url.path == "/networks":
+            self._json([NETWORK])
+        elif url.path == "/volumes":
+            self._json({"Volumes": [VOLUME], "Warnings": None})
+        else:
+            self._json({"message": f"No such container: {url.path.split('/')[2]}"}, 404)
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        self.server.requests.append((self.command, url.path, parse_qs(url.query)))
+        self._send(204, b"")
+
+
+class DockerClientTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.socket_path = os.path.join(self.tmp.name, "docker.sock")
+        self.server = FakeDaemon(self.socket_path)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.client = DockerClient(self.socket_path, timeout=5)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+
+    def test_available_pings_the_daemon(self):
+        self.assertTrue(self.client.available())
+        self.assertFalse(DockerClient(os.path.join(self.tmp.name, "missing.sock")).available())
+
+    def test_requests_reuse_one_connection(self):
+        for _ in range(5):
+            self.client.ping()
+        self.client.containers(all=True)
+        self.assertEqual(self.server.connections, 1)
+
+    def test_encodes_query_parameters(self):
+        self.client.containers(all=True, filters={"label": "com.docker.compose.project=infra"})
+        _, path, query = self.server.requests[-1]
+        self.assertEqual(path, "/containers/json")
+        self.assertEqual(query["all"], ["1"])
+        self.assertEqual(json.loads(query["filters"][0]), {"label": ["com.docker.compose.project=infra"]})
+        self.client.containers()
+        self.assertEqual(self.server.requests[-1][2], {})
+
+    def test_error_response_raises_docker_error(self):
+        with self.assertRaises(DockerError) as ctx:
+            self.client.inspect_container("ghost")
+        self.assertEqual(ctx.exception.status, 404)
+        self.assertIn("No such container: ghost", str(ctx.exception))
+
+    def test_retries_once_when_the_daemon_drops_a_kept_alive_connection(self):
+        self.client.ping()
+        self.server.drop_next = True
+        self.client.ping()  # answered, then the server closes the socket
+        self.assertEqual(self.client.images(), [IMAGE])
+        self.assertEqual(self.server.connections, 2)
+
+    def test_empty_body_and_demuxed_logs(self):
+        self.assertIsNone(self.client.restart_container("web-1", timeout=1))
+        self.assertEqual(self.server.requests[-1][2], {"t": ["1"]})
+        self.assertEqual(self.client.container_logs("web-1"), "out line\nerr line\n")
+
+    def test_unreachable_socket_raises_docker_error(self):
+        with self.assertRaises(DockerError):
+            DockerClient(os.path.join(self.tmp.name, "missing.sock")).version()
+
+    def test_async_client_matches_sync_client(self):
+        api = AsyncDockerClient(self.socket_path, timeout=5)
+
+        async def main():
+            return await asyncio.gather(api.containers(all=True), api.networks(), api.volumes())
+
+        containers, networks, volumes = asyncio.run(main())
+        self.assertEqual(containers, [CONTAINER])
+        self.assertEqual(networks, [NETWORK])
+        self.assertEqual(volumes, [VOLUME])
+
+
+class CliRowsTest(unittest.TestCase):
+    """API entries shaped like the `docker ... --format json` lines of the CLI fallback."""
+
+    def test_ps_row(self):
+        row = ps_row(CONTAINER)
+        self.assertEqual(row["ID"], "0123456789ab")
+        self.assertEqual(row["Names"], "web-1")
+        self.assertEqual(row["Ports"], "0.0.0.0:8080->80/tcp")
+        self.assertEqual(row["Labels"], "com.docker.compose.project=infra")
+
+    def test_image_rows_one_per_tag(self):
+        rows = image_rows(IMAGE)
+        self.assertEqual([(r["Repository"], r["Tag"]) for r in rows],
+                         [("nginx", "latest"), ("registry:5000/web/nginx", "1.27")])
+        self.assertEqual(rows[0]["ID"], "fedcba987654")
+        self.assertEqual(rows[0]["Digest"], "sha256:aaaa")
+        self.assertEqual(rows[0]["Size"], "187MB")
+        self.assertEqual(image_rows({"Id": "sha256:00", "RepoTags": None})[0]["Repository"], "<none>")
+
+    def test_network_and_volume_rows(self):
+        self.assertEqual(network_row(NETWORK), {
+            "ID": "abcdef012345", "Name": "infra", "Driver": "bridge", "Scope": "local",
+            "IPv6": "false", "Internal": "false", "Labels": "",
+        })
+        self.assertEqual(volume_row(VOLUME), {
+            "Name": "pgdata", "Driver": "local", "Scope": "local",
+            "Mountpoint": "/var/lib/docker/volumes/pgdata/_data", "Labels": "keep=1",
+        })
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+"""Open-loop load generator against a local stub HTTP server.
+
+Run: python -m unittest discover tests
+"""
+
+import sys
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.resolve()))
+
+from libs.testing import E2ETest
+from libs.testing.load import LatencyHistogram, Route, resolve_routes, run_load
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # no delayed-ACK stalls on small keep-alive responses
+
+    def do_GET(self):
+        if self.path == "/stall" and not self.server.stalled.is_set():
+            self.server.stalled.set()
+            time.sleep(self.server.stall)
+        status = 500 if self.path == "/err" else 200
+        body = b"ok" if status == 200 else b"boom"
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _serve(server_class, stall: float = 0.0):
+    server = server_class(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    server.stall = stall
+    server.stalled = threading.Event()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+class RunLoadTest(unittest.TestCase):
+    def setUp(self):
+        self.server, self.base = _serve(ThreadingHTTPServer)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_achieves_the_target_rate(self):
+        report = run_load([Route("ok", f"{self.base}/ok")], rate=100, duration=1, max_in_flight=16)
+        self.assertEqual(report.completed, 100)
+        self.assertEqual(report.errors, 0)
+        self.assertEqual(report.routes[0].codes, {200: 100})
+        self.assertGreater(report.achieved_rps, 80)
+        self.assertLess(report.achieved_rps, 120)
+
+    def test_counts_http_and_connection_errors_per_route(self):
+        dead, dead_url = _serve(ThreadingHTTPServer)
+        dead.shutdown()
+        dead.server_close()  # nothing listens there any more
+        routes = [Route("ok", f"{self.base}/ok", 2), Route("err", f"{self.base}/err", 1),
+                  Route("dead", dead_url, 1)]
+        report = run_load(routes, rate=200, duration=1, max_in_flight=16, timeout=2, seed=7)
+        ok, err, down = report.routes
+        self.assertEqual(sum(r.sent for r in report.routes), 200)
+        self.assertEqual(report.completed, 200)
+        self.assertEqual((ok.errors, ok.codes), (0, {200: ok.sent}))
+        self.assertEqual((err.errors, err.codes), (err.sent, {500: err.sent}))
+        self.assertEqual(down.errors, down.sent)
+        self.assertNotIn(200, down.codes)
+        self.assertEqual(report.errors, err.sent + down.sent)
+        # Weighted draw: about half the requests go to the weight-2 route
+        self.assertGreater(ok.sent, 70)
+        self.assertLess(ok.sent, 130)
+
+
+class CoordinatedOmissionTest(unittest.TestCase):
+    """One request stalls a single-connection path: what queued behind it counts."""
+
+    def test_latency_counts_from_the_scheduled_send_time(self):
+        server, base = _serve(HTTPServer, stall=0.5)  # one request at a time
+        try:
+            report = run_load([Route("stall", f"{base}/stall")], rate=50, duration=1, max_in_flight=1)
+        finally:
+            server.shutdown()
+            server.server_close()
+        latency, service = report.latency(), report.latency(service_time=True)
+        self.assertEqual(report.completed, 50)
+        # ~25 requests were due while the first one stalled; they waited for it
+        self.assertGreaterEqual(latency.max, 450_000)
+        self.assertGreater(latency.percentile(80), 100_000)
+        self.assertGreaterEqual(report.max_lag_ms, 400)
+        # Measured from the actual send, only the stalled request itself is slow
+        self.assertLess(service.percentile(80), 50_000)
+        self.assertGreaterEqual(service.max, 450_000)
+        self.assertGreater(latency.mean, 3 * service.mean)
+
+
+class HistogramTest(unittest.TestCase):
+    def test_percentiles_keep_relative_precision(self):
+        hist = LatencyHistogram(digits=2)
+        for value in range(1, 100_001):
+            hist.record(value)
+        for pct in (50, 90, 99, 99.9):
+            exact = pct / 100 * 100_000
+            self.assertLess(abs(hist.percentile(pct) - exact) / exact, 0.01)
+        self.assertEqual((hist.min, hist.max, hist.percentile(100)), (1, 100_000, 100_000))
+
+
+class ResolveRoutesTest(unittest.TestCase):
+    def test_weights(self):
+        tester = E2ETest()
+        routes = resolve_routes(tester, ["http://grafana.example.test/=3", "http://127.0.0.1:8080/api"])
+        self.assertEqual([(r.name, r.weight) for r in routes], [("grafana", 3.0), ("127.0.0.1:8080/api", 1.0)])
+        for spec in ("http://a.test/=0", "http://a.test/=-2", "http://a.test/=nan", "http://a.test/=x"):
+            with self.assertRaises(ValueError):
+                resolve_routes(tester, [spec])
+
+
+if __name__ == "__main__":
+    unittest.main()
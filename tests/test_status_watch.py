@@ -0,0 +1,47 @@
+"""StatusTable fed from a replayed Docker events stream.
+
+Run: python -m unittest discover tests
+"""
+
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.resolve()))
+
+from stack import StatusTable
+
+GROUPS = {"data": {"order": 1, "services": {"postgres": {"containers": ["postgres-infra"]}}}}
+
+
+def _event(action: str, second: int, nano: int = 0, **attrs) -> dict:
+    return {"id": "c0ffee", "Action": action, "time": second, "timeNano": second * 10**9 + nano,
+            "Actor": {"Attributes": {"name": "postgres-infra", **attrs}}}
+
+
+class StatusTableTest(unittest.TestCase):
+    def test_replayed_events_are_applied_once(self):
+        table = StatusTable(GROUPS, since=1000.5)
+        table.load({"postgres-infra": {"Status": "running", "RestartCount": 0}})
+        stream = [_event("die", 1001, exitCode="1"), _event("start", 1001, 5)]
+        for event in stream:
+            table.apply(event)
+        # The stream drops and is resubscribed from table.since: second 1001 comes again
+        self.assertEqual(table.since, 1001)
+        for event in stream + [_event("die", 1002, exitCode="1")]:
+            table.apply(event)
+        st = table.state["postgres-infra"]
+        self.assertEqual(len(st["dies"]), 2)
+        self.assertEqual(st["restarts"], 1)
+        self.assertFalse(table.looping("postgres-infra", 1003))
+
+    def test_restart_loop_is_still_detected(self):
+        table = StatusTable(GROUPS)
+        for second in (10, 20, 30):
+            table.apply(_event("die", second, exitCode="1"))
+            table.apply(_event("start", second, 5))
+        self.assertTrue(table.looping("postgres-infra", 40))
+
+
+if __name__ == "__main__":
+    unittest.main()